@@ -0,0 +1,147 @@
+# Agricultural Reference Data for AgroMitra
+# Chatbot topic knowledge base and the seasonal crop calendar, importable
+# without Flask (used by chatbot.py, ai_recommendations.py and the
+# retrieval index in knowledge_index.py)
+
+# Agricultural knowledge base for chatbot
+AGRICULTURE_KB = {
+    'disease': {
+        'keywords': ['disease', 'pest', 'infection', 'spots', 'yellowing', 'wilting'],
+        'local_keywords': {
+            'hi': ['रोग', 'बीमारी', 'कीट', 'कीड़े', 'धब्बे', 'पीलापन', 'मुरझा', 'संक्रमण'],
+            'ta': ['நோய்', 'பூச்சி', 'புள்ளி', 'மஞ்சள்', 'வாடல்'],
+            'translit': ['rog', 'bimari', 'keet', 'keeda', 'dhabba', 'noi', 'poochi']
+        },
+        'responses': {
+            'en': 'I can help you identify plant diseases. Please upload a photo of the affected plant using our disease detection feature. Common diseases include blight, rust, and fungal infections.',
+            'hi': 'मैं पौधों की बीमारियों की पहचान करने में आपकी मदद कर सकता हूं। कृपया हमारे रोग पहचान सुविधा का उपयोग करके प्रभावित पौधे की तस्वीर अपलोड करें।',
+            'ta': 'செடி நோய்களை அடையாளம் காண நான் உங்களுக்கு உதவ முடியும். எங்கள் நோய் கண்டறிதல் அம்சத்தைப் பயன்படுத்தி பாதிக்கப்பட்ட செடியின் புகைப்படத்தை பதிவேற்றவும்.'
+        }
+    },
+    'price': {
+        'keywords': ['price', 'rate', 'market', 'sell', 'value', 'cost'],
+        'local_keywords': {
+            'hi': ['कीमत', 'भाव', 'दाम', 'मंडी', 'बाजार', 'बेचना'],
+            'ta': ['விலை', 'சந்தை', 'விற்க'],
+            'translit': ['keemat', 'kimat', 'bhav', 'daam', 'mandi', 'bazaar', 'vilai', 'sandhai']
+        },
+        'responses': {
+            'en': 'I can help you check current market prices and predict future prices. Visit the Price Prediction section for detailed price analysis of various crops.',
+            'hi': 'मैं आपको वर्तमान बाजार मूल्य जांचने और भविष्य की कीमतों का अनुमान लगाने में मदद कर सकता हूं। विभिन्न फसलों के विस्तृत मूल्य विश्लेषण के लिए मूल्य पूर्वानुमान अनुभाग देखें।',
+            'ta': 'தற்போதைய சந்தை விலைகளை சரிபார்க்கவும் எதிர்கால விலைகளை கணிக்கவும் நான் உங்களுக்கு உதவ முடியும். பல்வேறு பயிர்களின் விரிவான விலை பகுப்பாய்வுக்கு விலை முன்னறிவிப்பு பிரிவைப் பார்வையிடவும்.'
+        }
+    },
+    'irrigation': {
+        'keywords': ['water', 'irrigation', 'drip', 'watering', 'rainfall'],
+        'local_keywords': {
+            'hi': ['सिंचाई', 'पानी', 'ड्रिप', 'बारिश'],
+            'ta': ['பாசனம்', 'நீர்', 'தண்ணீர்', 'சொட்டு'],
+            'translit': ['sinchai', 'paani', 'pani', 'thanni']
+        },
+        'responses': {
+            'en': 'For water management, consider drip irrigation for efficient water use. Water crops early morning or evening. Check soil moisture before watering. The PMKSY scheme provides support for irrigation.',
+            'hi': 'जल प्रबंधन के लिए, कुशल पानी उपयोग के लिए ड्रिप सिंचाई पर विचार करें। सुबह जल्दी या शाम को फसलों को पानी दें। पानी देने से पहले मिट्टी की नमी जांचें।',
+            'ta': 'நீர் மேலாண்மைக்கு, திறமையான நீர் பயன்பாட்டிற்கு சொட்டு நீர் பாசனத்தை பரிசீலிக்கவும். காலை அல்லது மாலை பயிர்களுக்கு நீர் பாய்ச்சவும்.'
+        }
+    },
+    'fertilizer': {
+        'keywords': ['fertilizer', 'manure', 'nutrients', 'nitrogen', 'organic'],
+        'local_keywords': {
+            'hi': ['खाद', 'उर्वरक', 'यूरिया', 'पोषक', 'गोबर'],
+            'ta': ['உரம்', 'யூரியா', 'ஊட்டச்சத்து'],
+            'translit': ['khad', 'urvarak', 'urea', 'gobar', 'uram']
+        },
+        'responses': {
+            'en': 'Use soil health cards to determine nutrient requirements. Apply fertilizers based on soil test reports. Organic options include compost, vermicompost, and green manure. NPK ratios depend on crop type.',
+            'hi': 'पोषक तत्वों की आवश्यकता निर्धारित करने के लिए मृदा स्वास्थ्य कार्ड का उपयोग करें। मिट्टी परीक्षण रिपोर्ट के आधार पर उर्वरक लागू करें। जैविक विकल्पों में खाद, वर्मीकम्पोस्ट शामिल हैं।',
+            'ta': 'ஊட்டச்சத்து தேவைகளை தீர்மானிக்க மண் ஆரோக்கிய அட்டைகளைப் பயன்படுத்தவும். மண் சோதனை அறிக்கைகளின் அடிப்படையில் உரங்களைப் பயன்படுத்தவும்.'
+        }
+    },
+    'schemes': {
+        'keywords': ['scheme', 'subsidy', 'government', 'loan', 'support', 'yojana'],
+        'local_keywords': {
+            'hi': ['योजना', 'सब्सिडी', 'सरकारी', 'ऋण', 'लोन', 'अनुदान'],
+            'ta': ['திட்டம்', 'மானியம்', 'அரசு', 'கடன்'],
+            'translit': ['yojana', 'sarkari', 'anudan', 'thittam', 'maniyam', 'kadan']
+        },
+        'responses': {
+            'en': 'Check the Schemes section for government programs like PM-KISAN (₹6000/year), PMFBY (crop insurance), KCC (credit card), and more. I can help you check eligibility.',
+            'hi': 'पीएम-किसान (₹6000/वर्ष), पीएमएफबीवाई (फसल बीमा), केसीसी (क्रेडिट कार्ड) जैसी सरकारी योजनाओं के लिए योजना अनुभाग देखें।',
+            'ta': 'PM-KISAN (₹6000/ஆண்டு), PMFBY (பயிர் காப்பீடு), KCC (கடன் அட்டை) போன்ற அரசாங்க திட்டங்களுக்கு திட்டங்கள் பிரிவைச் சரிபார்க்கவும்.'
+        }
+    },
+    'weather': {
+        'keywords': ['weather', 'rain', 'temperature', 'climate', 'season'],
+        'local_keywords': {
+            'hi': ['मौसम', 'बारिश', 'तापमान', 'जलवायु'],
+            'ta': ['வானிலை', 'மழை', 'வெப்பநிலை'],
+            'translit': ['mausam', 'barish', 'mazhai']
+        },
+        'responses': {
+            'en': 'Monitor local weather forecasts regularly. Different crops require different climate conditions. Kharif crops need good monsoon rainfall, while Rabi crops need cooler temperatures.',
+            'hi': 'स्थानीय मौसम पूर्वानुमानों की नियमित निगरानी करें। विभिन्न फसलों को अलग-अलग जलवायु परिस्थितियों की आवश्यकता होती है।',
+            'ta': 'உள்ளூர் வானிலை முன்னறிவிப்புகளை தவறாமல் கண்காணிக்கவும். வெவ்வேறு பயிர்களுக்கு வெவ்வேறு காலநிலை நிலைமைகள் தேவை.'
+        }
+    },
+    'seed': {
+        'keywords': ['seed', 'variety', 'hybrid', 'planting', 'sowing'],
+        'local_keywords': {
+            'hi': ['बीज', 'किस्म', 'बुवाई', 'रोपाई'],
+            'ta': ['விதை', 'ரகம்', 'விதைப்பு'],
+            'translit': ['beej', 'kism', 'buvai', 'vidhai']
+        },
+        'responses': {
+            'en': 'Always use certified seeds from authorized dealers. Choose varieties suitable for your region. Hybrid seeds offer better yield but require proper care. Check seed treatment requirements before sowing.',
+            'hi': 'हमेशा अधिकृत डीलरों से प्रमाणित बीज का उपयोग करें। अपने क्षेत्र के लिए उपयुक्त किस्मों का चयन करें।',
+            'ta': 'அங்கீகரிக்கப்பட்ட விற்பனையாளர்களிடமிருந்து எப்போதும் சான்றளிக்கப்பட்ட விதைகளைப் பயன்படுத்தவும்.'
+        }
+    },
+    'organic': {
+        'keywords': ['organic', 'natural', 'chemical-free', 'bio'],
+        'local_keywords': {
+            'hi': ['जैविक', 'प्राकृतिक'],
+            'ta': ['இயற்கை', 'அங்கக'],
+            'translit': ['jaivik', 'prakritik', 'iyarkai']
+        },
+        'responses': {
+            'en': 'Organic farming is supported by PKVY scheme (₹50,000/hectare). Use organic manure, biopesticides, and natural farming methods. Certification required for organic label. Market premium available.',
+            'hi': 'जैविक खेती PKVY योजना (₹50,000/हेक्टेयर) द्वारा समर्थित है। जैविक खाद, जैव कीटनाशकों का उपयोग करें।',
+            'ta': 'இயற்கை விவசாயம் PKVY திட்டத்தால் ஆதரிக்கப்படுகிறது (₹50,000/ஹெக்டேர்).'
+        }
+    }
+}
+
+# Greetings in every supported language (checked only when no topic matches)
+GREETING_KEYWORDS = ['hello', 'hi', 'hey', 'namaste', 'namaskar', 'vanakkam',
+                     'नमस्ते', 'नमस्कार', 'வணக்கம்']
+
+# Basic seasonal calendar (can be enhanced with AI)
+SEASONAL_CALENDAR = {
+    'kharif_season': {
+        'months': 'June-October',
+        'crops': ['Rice', 'Cotton', 'Sugarcane', 'Pulses'],
+        'activities': [
+            'Sowing: June-July',
+            'Weeding: July-August', 
+            'Harvesting: September-October'
+        ]
+    },
+    'rabi_season': {
+        'months': 'November-April',
+        'crops': ['Wheat', 'Barley', 'Peas', 'Gram'],
+        'activities': [
+            'Sowing: November-December',
+            'Irrigation: January-February',
+            'Harvesting: March-April'
+        ]
+    },
+    'zaid_season': {
+        'months': 'April-June',
+        'crops': ['Fodder', 'Vegetables', 'Watermelon'],
+        'activities': [
+            'Sowing: April',
+            'Intensive irrigation needed',
+            'Harvesting: June'
+        ]
+    }
+}
@@ -21,20 +21,155 @@ AI_CONFIG = {
     'gemini': {
         'api_key': os.getenv('GEMINI_API_KEY'),
         'model': 'gemini-pro',
+        'max_output_tokens': 2048,  # The model's completion cap
         'enabled': True  # Set to True when you have API key
     },
     
     # Local AI Configuration (Free alternatives)
     'local': {
-        'provider': 'ollama',  # or 'huggingface'
-        'model': 'llama2',
-        'endpoint': 'http://localhost:11434/api/generate',
+        'provider': os.getenv('LOCAL_AI_PROVIDER', 'ollama'),  # or 'huggingface'
+        'model': os.getenv('LOCAL_AI_MODEL', 'llama2'),
+        'endpoint': os.getenv('LOCAL_AI_URL', 'http://localhost:11434').rstrip('/') + '/api/generate',
+        'hf_model': os.getenv('LOCAL_HF_MODEL', 'Qwen/Qwen2.5-0.5B-Instruct'),  # For 'huggingface'
+        'local_files_only': True,  # Never download weights at request time
+        'quantize': True,          # int8 dynamic quantisation on CPU
+        'max_new_tokens': 512,
+        'temperature': 0.7,
+        'timeout': 120,
+        'max_concurrency': int(os.getenv('LOCAL_AI_MAX_CONCURRENCY', 1)),  # Batches generated at once
+        'max_batch_size': 8,       # Prompts packed into one generation call
+        'batch_window_ms': 20,     # How long to wait for more prompts to batch
         'enabled': True  # Enable for demo mode
     },
     
+    # Simulated provider for load tests (see ai_simulator.py). Enabling it
+    # routes every AI call to it; AI_SIMULATED=true does so from the environment.
+    'simulated': {
+        'model': 'simulated-1',
+        'seed': 42,
+        'latency': {
+            'distribution': 'lognormal',  # 'fixed', 'uniform' or 'lognormal'
+            'median_ms': float(os.getenv('AI_SIMULATED_MEDIAN_MS', 800)),
+            'sigma': 0.5,                 # Lognormal spread (tail heaviness)
+            'min_ms': 200,                # Uniform lower bound
+            'max_ms': 10000               # Cap for every distribution
+        },
+        'error_rate': float(os.getenv('AI_SIMULATED_ERROR_RATE', 0.0)),
+        'stream_chunk_chars': 40,         # 0 returns the response in one chunk
+        'first_chunk_share': 0.4,         # Fraction of latency before the first chunk
+        'enabled': os.getenv('AI_SIMULATED', 'False').lower() == 'true'
+    },
+    
     # Default provider to use
     'default_provider': 'gemini',  # Change to 'openai' or 'gemini' when you have API keys
     
+    # Latency-aware routing across providers (see ai_router.py)
+    'routing': {
+        'providers': ['gemini', 'openai', 'local', 'simulated'],  # Only enabled ones are used
+        'window_size': 50,            # Calls kept per provider for rolling stats
+        'window_seconds': 300,        # Samples older than this are forgotten
+        'ewma_alpha': 0.3,            # Weight of the newest latency sample
+        'prior_latency': 2.0,         # Assumed latency (seconds) before any samples
+        'error_penalty': 4.0,         # Score multiplier per unit of error rate
+        'failure_threshold': 5,       # Consecutive failures that open the breaker
+        'error_rate_threshold': 0.5,  # Error rate over the window that opens it
+        'min_calls_for_rate': 10,     # Samples needed before the rate is trusted
+        'cooldown_seconds': 30        # Open breaker waits this long before a probe
+    },
+    
+    # Single-flight coalescing of identical in-flight requests (see singleflight.py)
+    'coalescing': {
+        'enabled': True,
+        'cross_process': True,   # Share results between gunicorn workers via lock files
+        'lock_dir': os.getenv('AI_SINGLEFLIGHT_DIR'),  # Defaults to <tmp>/agromitra_singleflight
+        'wait_timeout': 60,      # Seconds a follower waits before calling upstream itself
+        'result_ttl': 30         # Seconds a finished result is reused by late workers
+    },
+    
+    # Shared conversation memory for the chatbot (see conversation_store.py)
+    'conversation_store': {
+        'max_users': 1000,       # Users kept in memory per worker (LRU)
+        'max_turns': 10,         # Turns kept per user (ring buffer)
+        'refresh_seconds': 30,   # Re-read a user's turns from chat_history after this
+        'flush_size': 20,        # Pending turns that trigger a bulk insert
+        'flush_interval': 5      # Max seconds a turn waits before a background bulk insert
+    },
+    
+    # Pack concurrent disease requests into one LLM call (see prompt_packing.py)
+    'batching': {
+        'enabled': os.getenv('AI_DISEASE_BATCHING', 'False').lower() == 'true',
+        'window_ms': 50,           # How long to collect requests before sending
+        'max_items': 8,            # Cases packed into one prompt, at most
+        'item_completion_tokens': 350,  # Reply tokens per case; the provider's completion cap bounds max_items
+        'max_concurrency': 2,      # Packed calls in flight at once
+        'fallback_concurrency': 4, # Parallel per-item retries when a reply is unusable
+        'timeout': 120
+    },
+    
+    # Bulk crop advice for cooperatives (POST /api/ai/crop-advice/bulk)
+    'bulk_crop_advice': {
+        'max_rows': 1000,          # Farmers accepted per request
+        'concurrency': 8,          # LLM calls in flight across all bulk requests
+        'deadline_seconds': 300    # Rows still pending after this get rule-based advice
+    },
+    
+    # Crop advice reused across farmers with the same bucketed profile (see crop_advice_cache.py)
+    'crop_advice_cache': {
+        'enabled': True,
+        'ttl_seconds': 6 * 3600,   # Advice older than this is regenerated
+        'max_entries': 5000,       # Least recently used buckets are dropped beyond this
+        # Profile fields that form the key; remove one to share advice more widely
+        'key_fields': ['state', 'district', 'season', 'farm_size', 'irrigation', 'soil_type'],
+        'farm_size_edges': [2.5, 5, 10, 25]  # Acre boundaries of the farm-size bands
+    },
+    
+    # Precomputed disease recommendations (see disease_warm_cache.py)
+    'warm_cache': {
+        'enabled': True,
+        'directory': os.getenv('DISEASE_CACHE_DIR', 'cache'),
+        'version': 1,             # Bump to invalidate every cached entry
+        'languages': ['en', 'hi', 'ta'],
+        'climates': ['any', 'tropical', 'subtropical', 'arid', 'temperate'],
+        'farm_size_bands': ['any', 'marginal', 'small', 'medium', 'large'],
+        'reload_check_seconds': 60  # How often workers look for a rebuilt file
+    },
+    
+    # BM25 retrieval over the app's reference data (see knowledge_index.py)
+    'retrieval': {
+        'enabled': True,
+        'top_k': 3,                 # Passages added to the chatbot prompt
+        'passage_chars': 350,       # Each passage is cut to this in the prompt
+        'k1': 1.5,                  # BM25 term-frequency saturation
+        'b': 0.75,                  # BM25 length normalisation
+        'answer_directly': True,    # Reply from the best passage alone when it clearly fits
+        'direct_min_score': 5.0,    # ... its BM25 score is at least this
+        'direct_min_coverage': 0.7, # ... it contains this share of the query terms
+        'direct_min_margin': 1.2    # ... and beats a runner-up of the same kind by this factor
+    },
+    
+    # Local intent classifier in front of the chatbot LLM (see intent_router.py)
+    'intent_router': {
+        'enabled': True,
+        'min_confidence': 0.5,      # Below this the message goes to the LLM
+        'model_path': os.getenv('INTENT_MODEL_PATH', 'models/intent_router.npz'),
+        'hash_dimension': 2 ** 16,  # Hashed feature space (must match a saved model)
+        'epochs': 40,
+        'learning_rate': 0.5
+    },
+    
+    # Prompt token budgets per feature (see prompt_budget.py)
+    'token_budget': {
+        'max_prompt_tokens': {
+            'chatbot': 1200,
+            'disease': 600,
+            'disease_batch': 2400,  # Shared instructions once plus up to max_items cases
+            'crop': 600
+        },
+        'recent_turns': 3,       # Turns kept verbatim, older ones are summarised
+        'summary_chars': 400,    # Length of the rolling summary of older turns
+        'turn_chars': 600        # Bot replies in recent turns are cut to this
+    },
+    
     # Feature flags
     'features': {
         'ai_disease_recommendations': True,
@@ -45,6 +180,11 @@ AI_CONFIG = {
     }
 }
 
+# Load testing: the simulated provider replaces all real ones when enabled
+if AI_CONFIG['simulated']['enabled']:
+    AI_CONFIG['default_provider'] = 'simulated'
+    AI_CONFIG['routing']['providers'] = ['simulated']
+
 def get_ai_provider():
     """Get the configured AI provider"""
     provider = AI_CONFIG['default_provider']
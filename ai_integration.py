@@ -5,10 +5,86 @@ import openai
 import google.generativeai as genai
 import os
 from typing import Dict, List, Optional, Any
+import hashlib
 import json
 import logging
+import threading
+import time
 from datetime import datetime
 
+from ai_config import AI_CONFIG, is_ai_feature_enabled
+from ai_router import provider_router
+from conversation_store import conversation_store
+from ai_simulator import simulated_provider
+from disease_warm_cache import disease_warm_cache
+from intent_router import intent_router
+from knowledge_index import retrieve
+from local_llm import get_local_llm
+from prompt_budget import build_prompt, split_conversation, summarize_turns, usage_report
+from singleflight import SingleFlight
+
+LANGUAGE_NAMES = {"en": "English", "hi": "Hindi", "ta": "Tamil"}
+
+# Instruction blocks are sent on every call, so they are kept terse
+DISEASE_INSTRUCTIONS = (
+    "Return structured JSON with: immediate_actions (24-48h), treatment_plan "
+    "(fungicides/pesticides with dosages), cultural_practices, prevention, "
+    "organic_alternatives, cost_estimate, recovery_timeline, monitoring_checklist, "
+    "extension_contacts, follow_up. Favour locally available, affordable treatments "
+    "for small farmers, low environmental impact and resistance management."
+)
+
+CROP_INSTRUCTIONS = (
+    "Return JSON with: top 5 crops with reasons, expected yield and profit margin, "
+    "water needs and irrigation tips, market demand, risks and mitigation, seed "
+    "varieties and suppliers, timeline of key activities."
+)
+
+CHATBOT_SYSTEM_PROMPT = (
+    "You are AgriBot, the agricultural assistant of the AgroMitra app for Indian farmers: "
+    "crop planning, disease diagnosis and treatment, irrigation, fertilizers, market prices, "
+    "government schemes, weather and organic farming. Be practical, empathetic and "
+    "cost-conscious, use locally available resources and give step-by-step guidance when useful."
+)
+
+
+def _format_fields(fields: List) -> str:
+    """Render (label, value) pairs one per line, skipping unknown values"""
+    return "\n".join(
+        f"- {label}: {value}" for label, value in fields
+        if value not in (None, "", "Unknown", "None", [])
+    )
+
+
+_batching_config = AI_CONFIG.get('batching', {})
+_disease_batcher = None
+_disease_batcher_lock = threading.Lock()
+
+
+def get_disease_batcher():
+    """Shared per worker process; started on first batched request"""
+    global _disease_batcher
+    if _disease_batcher is None:
+        with _disease_batcher_lock:
+            if _disease_batcher is None:
+                from prompt_packing import DiseaseRequestBatcher
+                _disease_batcher = DiseaseRequestBatcher(_batching_config)
+    return _disease_batcher
+
+
+def disease_batcher_status() -> Optional[Dict]:
+    """Packing statistics, or None when batching was never used"""
+    return _disease_batcher.status() if _disease_batcher is not None else None
+
+
+_coalescing_config = AI_CONFIG.get('coalescing', {})
+request_coalescer = SingleFlight(
+    lock_dir=_coalescing_config.get('lock_dir'),
+    wait_timeout=_coalescing_config.get('wait_timeout', 60),
+    result_ttl=_coalescing_config.get('result_ttl', 30),
+    cross_process=_coalescing_config.get('cross_process', True)
+)
+
 class AIRecommendationEngine:
     """
     Generative AI-powered recommendation engine for agricultural advice
@@ -18,18 +94,95 @@ class AIRecommendationEngine:
     def __init__(self, provider="openai", api_key=None):
         self.provider = provider
         self.api_key = api_key or os.getenv(f"{provider.upper()}_API_KEY")
+        self.last_provider = provider
+        self.last_usage = None
+        self._provider_usage = None
+        self._ready_providers = set()
         self.setup_ai_client()
         
     def setup_ai_client(self):
         """Initialize AI client based on provider"""
-        if self.provider == "openai":
-            openai.api_key = self.api_key
-        elif self.provider == "gemini":
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-pro')
-        elif self.provider == "local":
+        self._setup_provider(self.provider, self.api_key)
+    
+    def _setup_provider(self, provider: str, api_key: str = None):
+        """Initialize the client for one provider, once per engine"""
+        if provider in self._ready_providers:
+            return
+        api_key = api_key or os.getenv(f"{provider.upper()}_API_KEY")
+        if provider == "openai":
+            openai.api_key = api_key
+        elif provider == "gemini":
+            genai.configure(api_key=api_key)
+            self.model = genai.GenerativeModel(AI_CONFIG['gemini'].get('model', 'gemini-pro'))
+        elif provider == "local":
             # For local models like Ollama, Hugging Face Transformers
             pass
+        self._ready_providers.add(provider)
+    
+    def _call_provider(self, provider: str, prompt: str) -> str:
+        """Send a prompt to one specific provider"""
+        self._setup_provider(provider)
+        if provider == "openai":
+            return self._call_openai(prompt)
+        elif provider == "gemini":
+            return self._call_gemini(prompt)
+        elif provider == "simulated":
+            return self._call_simulated(prompt)
+        return self._call_local_model(prompt)
+    
+    def _generate(self, prompt: str) -> str:
+        """
+        Send a prompt to the fastest healthy provider, failing over down the
+        router's ranking. Raises when every provider fails or is circuit-broken.
+        """
+        last_error = None
+        for provider in provider_router.candidates(self.provider):
+            if not provider_router.acquire(provider):
+                continue
+            start = time.perf_counter()
+            self._provider_usage = None
+            try:
+                response = self._call_provider(provider, prompt)
+            except Exception as e:
+                provider_router.record_failure(provider, time.perf_counter() - start, e)
+                logging.warning(f"AI provider '{provider}' failed, trying next: {e}")
+                last_error = e
+                continue
+            provider_router.record_success(provider, time.perf_counter() - start)
+            self.last_provider = provider
+            self.last_usage = usage_report(prompt, response, provider, self._provider_usage)
+            self.last_usage["estimated_cost"] = round(
+                self.last_usage["total_tokens"] * AI_PROVIDERS_CONFIG.get(provider, {}).get("cost_per_token", 0), 6
+            )
+            return response
+        raise Exception(f"No healthy AI provider available: {last_error or 'none configured or all circuits open'}")
+    
+    def _cache_key(self, feature: str, prompt: str) -> str:
+        """Stable key for a feature/prompt pair, shared by caches and coalescing"""
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return f"{feature}:{digest}"
+    
+    def _coalesced_generate(self, feature: str, prompt: str, parse) -> Dict:
+        """
+        Generate and parse a response, letting concurrent identical requests
+        share one upstream call. Errors propagate to every waiting caller.
+        """
+        def run():
+            result = parse(self._generate(prompt))
+            if isinstance(result, dict):
+                result["usage"] = self.last_usage
+            return result
+        
+        return self._coalesce(feature, prompt, run)
+    
+    def _coalesce(self, feature: str, prompt: str, run) -> Dict:
+        """Run once for all concurrent callers whose feature/prompt key matches"""
+        if not _coalescing_config.get('enabled', False):
+            return run()
+        result, shared = request_coalescer.do(self._cache_key(feature, prompt), run)
+        if shared and isinstance(result, dict):
+            result = {**result, "coalesced": True}
+        return result
             
     def generate_disease_recommendations(self, disease_info: Dict, farmer_context: Dict = None) -> Dict:
         """
@@ -46,14 +199,11 @@ class AIRecommendationEngine:
         prompt = self._build_disease_prompt(disease_info, farmer_context)
         
         try:
-            if self.provider == "openai":
-                response = self._call_openai(prompt)
-            elif self.provider == "gemini":
-                response = self._call_gemini(prompt)
-            else:
-                response = self._call_local_model(prompt)
-                
-            return self._parse_disease_response(response)
+            if _batching_config.get('enabled', False):
+                # Peak-hour mode: pack with other pending requests into one call
+                return self._coalesce("disease", prompt,
+                                      lambda: get_disease_batcher().recommend(disease_info, farmer_context))
+            return self._coalesced_generate("disease", prompt, self._parse_disease_response)
             
         except Exception as e:
             logging.error(f"AI recommendation generation failed: {e}")
@@ -72,91 +222,65 @@ class AIRecommendationEngine:
             Personalized crop recommendations
         """
         
-        prompt = f"""
-        As an expert agricultural advisor, provide crop recommendations for:
-        
-        Farmer Profile:
-        - Farm Size: {farmer_profile.get('farm_size', 'Unknown')} acres
-        - Location: {farmer_profile.get('location', 'Unknown')}
-        - Experience: {farmer_profile.get('experience', 'Unknown')}
-        - Previous Crops: {farmer_profile.get('crops_grown', 'Unknown')}
-        
-        Current Season: {season}
-        Location Details: {location}
-        
-        Provide:
-        1. Top 5 recommended crops with reasons
-        2. Expected yield and profit margins
-        3. Water requirements and irrigation tips
-        4. Market demand analysis
-        5. Risk factors and mitigation strategies
-        6. Seed varieties and suppliers
-        7. Timeline and key farming activities
-        
-        Format as JSON with detailed explanations.
-        """
+        profile_lines = _format_fields([
+            ("Farm size (acres)", farmer_profile.get('farm_size')),
+            ("Location", farmer_profile.get('location')),
+            ("Experience", farmer_profile.get('experience')),
+            ("Previous crops", farmer_profile.get('crops_grown')),
+            ("Soil", farmer_profile.get('soil_type')),
+            ("Irrigation", farmer_profile.get('irrigation_access')),
+            ("Budget", farmer_profile.get('budget')),
+            ("Season", season),
+        ] + [(key.replace('_', ' ').capitalize(), value) for key, value in (location or {}).items()])
+        
+        prompt = build_prompt([
+            ("As an expert agricultural advisor, recommend crops for this Indian farmer.", 0),
+            (profile_lines, 1),
+            (CROP_INSTRUCTIONS, 0),
+        ], "crop", self.provider)
         
         try:
-            if self.provider == "openai":
-                response = self._call_openai(prompt)
-            elif self.provider == "gemini":
-                response = self._call_gemini(prompt)
-            else:
-                response = self._call_local_model(prompt)
-                
-            return self._parse_crop_response(response)
+            return self._coalesced_generate("crop", prompt, self._parse_crop_response)
             
         except Exception as e:
             logging.error(f"Crop recommendation generation failed: {e}")
             return self._fallback_crop_recommendations()
     
     def _build_disease_prompt(self, disease_info: Dict, farmer_context: Dict = None) -> str:
-        """Build comprehensive prompt for disease recommendations"""
-        
-        base_prompt = f"""
-        As an expert plant pathologist and agricultural advisor, provide comprehensive treatment recommendations for:
-        
-        Disease Detected: {disease_info.get('disease', 'Unknown')}
-        Plant/Crop: {disease_info.get('plant', 'Unknown')}
-        Confidence Level: {disease_info.get('confidence', 0)}%
-        Severity: {disease_info.get('severity', 'Unknown')}
-        
-        """
-        
+        """Build a compact disease-treatment prompt within the disease token budget"""
+        predicted_class = disease_info.get('predicted_class', '')
+        plant = disease_info.get('plant') or predicted_class.split('___')[0].replace('_', ' ') or None
+        
+        detection = _format_fields([
+            ("Disease", disease_info.get('disease') or disease_info.get('disease_name')),
+            ("Crop", plant),
+            ("Confidence (%)", disease_info.get('confidence')),
+            ("Severity", disease_info.get('severity')),
+        ])
+        
+        farmer = ""
         if farmer_context:
-            base_prompt += f"""
-        Farmer Context:
-        - Location: {farmer_context.get('location', 'Unknown')}
-        - Farm Size: {farmer_context.get('farm_size', 'Unknown')}
-        - Climate Zone: {farmer_context.get('climate', 'Unknown')}
-        - Previous Treatments: {farmer_context.get('treatment_history', 'None')}
-        
-        """
-        
-        base_prompt += """
-        Please provide:
-        1. **Immediate Actions** (next 24-48 hours)
-        2. **Treatment Plan** (specific fungicides/pesticides with dosages)
-        3. **Cultural Practices** (pruning, spacing, sanitation)
-        4. **Prevention Strategies** (future occurrences)
-        5. **Organic Alternatives** (if farmer prefers)
-        6. **Cost Estimation** (treatment costs)
-        7. **Timeline** (expected recovery period)
-        8. **Monitoring Checklist** (signs of improvement/worsening)
-        9. **Emergency Contacts** (local agricultural extension)
-        10. **Follow-up Recommendations** (post-treatment care)
-        
-        Consider:
-        - Local availability of treatments
-        - Cost-effectiveness for small farmers
-        - Environmental impact
-        - Resistance management
-        - Integration with other crops
-        
-        Format as structured JSON with clear action items.
-        """
-        
-        return base_prompt
+            farmer = _format_fields([
+                ("Location", farmer_context.get('location')),
+                ("Farm size", farmer_context.get('farm_size')),
+                ("Climate zone", farmer_context.get('climate')),
+                ("Previous treatments", farmer_context.get('treatment_history')),
+            ])
+            if farmer:
+                farmer = "Farmer context:\n" + farmer
+        
+        language = (farmer_context or {}).get('language', 'en')
+        language_line = ""
+        if language != 'en':
+            language_line = f"Write all text values in {LANGUAGE_NAMES.get(language, language)}; keep JSON keys in English."
+        
+        return build_prompt([
+            ("As an expert plant pathologist, give treatment recommendations for:", 0),
+            (detection, 0),
+            (farmer, 2),
+            (DISEASE_INSTRUCTIONS, 0),
+            (language_line, 0),
+        ], "disease", self.provider)
     
     def _call_openai(self, prompt: str) -> str:
         """Call OpenAI GPT API"""
@@ -170,6 +294,12 @@ class AIRecommendationEngine:
                 max_tokens=2000,
                 temperature=0.7
             )
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                self._provider_usage = {
+                    "prompt_tokens": getattr(usage, "prompt_tokens", None),
+                    "completion_tokens": getattr(usage, "completion_tokens", None)
+                }
             return response.choices[0].message.content
         except Exception as e:
             raise Exception(f"OpenAI API call failed: {e}")
@@ -178,15 +308,36 @@ class AIRecommendationEngine:
         """Call Google Gemini API"""
         try:
             response = self.model.generate_content(prompt)
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None:
+                self._provider_usage = {
+                    "prompt_tokens": getattr(usage, "prompt_token_count", None),
+                    "completion_tokens": getattr(usage, "candidates_token_count", None)
+                }
             return response.text
         except Exception as e:
             raise Exception(f"Gemini API call failed: {e}")
     
     def _call_local_model(self, prompt: str) -> str:
-        """Call local AI model (Ollama, Hugging Face, etc.)"""
-        # Placeholder for local model integration
-        # You can integrate with Ollama, Hugging Face Transformers, etc.
-        return "Local model response placeholder"
+        """Call local AI model (Ollama or in-process Hugging Face Transformers)"""
+        try:
+            result = get_local_llm().generate(prompt)
+        except Exception as e:
+            raise Exception(f"Local model call failed: {e}")
+        self._provider_usage = {
+            "prompt_tokens": result.get("prompt_tokens"),
+            "completion_tokens": result.get("completion_tokens")
+        }
+        return result["text"]
+    
+    def _call_simulated(self, prompt: str) -> str:
+        """Call the built-in simulated provider (load testing, no API quota)"""
+        result = simulated_provider.generate(prompt)
+        self._provider_usage = {
+            "prompt_tokens": result["prompt_tokens"],
+            "completion_tokens": result["completion_tokens"]
+        }
+        return result["text"]
     
     def _parse_disease_response(self, response: str) -> Dict:
         """Parse AI response for disease recommendations"""
@@ -200,7 +351,7 @@ class AIRecommendationEngine:
                     "ai_recommendations": response,
                     "generated_at": datetime.now().isoformat(),
                     "confidence": "high",
-                    "source": f"AI_{self.provider}"
+                    "source": f"AI_{self.last_provider}"
                 }
         except Exception as e:
             return {
@@ -218,7 +369,7 @@ class AIRecommendationEngine:
                 return {
                     "crop_recommendations": response,
                     "generated_at": datetime.now().isoformat(),
-                    "source": f"AI_{self.provider}"
+                    "source": f"AI_{self.last_provider}"
                 }
         except Exception as e:
             return {
@@ -264,7 +415,7 @@ class AIEnhancedChatbot:
     
     def __init__(self, ai_engine: AIRecommendationEngine):
         self.ai_engine = ai_engine
-        self.conversation_history = {}
+        self.conversation_store = conversation_store
         self.agricultural_context = self._load_agricultural_context()
     
     def _load_agricultural_context(self) -> Dict:
@@ -298,108 +449,115 @@ class AIEnhancedChatbot:
         # Build conversation context
         conversation_context = self._get_conversation_context(user_id)
         
-        # Create enhanced prompt
-        prompt = self._build_chatbot_prompt(message, language, context, conversation_context)
+        # Greetings, reference, scheme and price questions are answered
+        # locally; only the rest need an LLM call
+        local = intent_router.answer_locally(message, language)
+        if local:
+            self._update_conversation_history(user_id, message, local['response'], language)
+            return {
+                "response": local['response'],
+                "language": language,
+                "conversation_turn": len(conversation_context),
+                "answered_from": local['answered_from'],
+                "intent": local['intent'],
+                "sources": local.get('sources', []),
+                "generated_at": datetime.now().isoformat(),
+                "ai_powered": False
+            }
+        
+        # Create enhanced prompt, grounded in the best matching reference passages
+        knowledge = [passage for _, passage in retrieve(message, language)]
+        prompt = self._build_chatbot_prompt(message, language, context, conversation_context, knowledge)
         
         try:
-            if self.ai_engine.provider == "openai":
-                response = self.ai_engine._call_openai(prompt)
-            elif self.ai_engine.provider == "gemini":
-                response = self.ai_engine._call_gemini(prompt)
-            else:
-                response = self.ai_engine._call_local_model(prompt)
+            response = self.ai_engine._generate(prompt)
             
             # Update conversation history
-            self._update_conversation_history(user_id, message, response)
+            self._update_conversation_history(user_id, message, response, language)
             
             return {
                 "response": response,
                 "language": language,
                 "context_used": bool(context),
                 "conversation_turn": len(conversation_context),
+                "sources": [passage.to_dict() for passage in knowledge],
+                "provider": self.ai_engine.last_provider,
+                "usage": self.ai_engine.last_usage,
                 "generated_at": datetime.now().isoformat(),
                 "ai_powered": True
             }
             
         except Exception as e:
             logging.error(f"AI chatbot response generation failed: {e}")
-            return self._fallback_response(message, language)
+            fallback = self._fallback_response(message, language)
+            self._update_conversation_history(user_id, message, fallback['response'], language)
+            return fallback
     
-    def _build_chatbot_prompt(self, message: str, language: str, context: Dict, conversation: List) -> str:
-        """Build comprehensive chatbot prompt"""
-        
-        system_prompt = f"""
-        You are AgriBot, an expert agricultural assistant for AgroMitra app. You help farmers with:
-        - Crop selection and planning
-        - Disease diagnosis and treatment
-        - Irrigation and water management
-        - Fertilizer recommendations
-        - Market prices and selling advice
-        - Government schemes and subsidies
-        - Weather and climate guidance
-        - Organic farming practices
-        
-        Response Language: {language} ({'English' if language == 'en' else 'Hindi' if language == 'hi' else 'Tamil'})
-        
-        Guidelines:
-        - Be practical and actionable
-        - Consider Indian farming conditions
-        - Suggest cost-effective solutions
-        - Include local resource availability
-        - Be empathetic to farmer challenges
-        - Provide step-by-step guidance when needed
-        
-        """
-        
-        if context:
-            system_prompt += f"""
-        Farmer Context:
-        - Location: {context.get('location', 'Unknown')}
-        - Farm Size: {context.get('farm_size', 'Unknown')}
-        - Main Crops: {context.get('crops', 'Unknown')}
-        - Experience: {context.get('experience', 'Unknown')}
-        
+    def _build_chatbot_prompt(self, message: str, language: str, context: Dict, conversation: List,
+                              knowledge: List = None) -> str:
         """
-        
-        if conversation:
-            system_prompt += """
-        Previous Conversation:
+        Build the chatbot prompt within the chatbot token budget: retrieved
+        reference notes, recent turns verbatim, older turns folded into a
+        rolling summary
         """
-            for turn in conversation[-3:]:  # Last 3 turns for context
-                system_prompt += f"User: {turn['user']}\nBot: {turn['bot']}\n"
-        
-        user_prompt = f"""
-        Farmer's Question: {message}
+        budget_config = AI_CONFIG.get('token_budget', {})
+        passage_chars = AI_CONFIG.get('retrieval', {}).get('passage_chars', 350)
+        language_name = LANGUAGE_NAMES.get(language, language)
         
-        Please provide a helpful, practical response in {language} language.
-        If the question is about:
-        - Disease: Suggest using the disease detection feature
-        - Prices: Refer to price prediction tool
-        - Schemes: Direct to government schemes section
-        - General advice: Provide detailed guidance
+        farmer = ""
+        if context:
+            farmer = _format_fields([
+                ("Location", context.get('location')),
+                ("Farm size", context.get('farm_size')),
+                ("Main crops", context.get('crops')),
+                ("Experience", context.get('experience')),
+            ])
+            if farmer:
+                farmer = "Farmer context:\n" + farmer
+        
+        older, recent = split_conversation(conversation or [], budget_config.get('recent_turns', 3))
+        summary = ""
+        if older:
+            summary = "Earlier conversation (summary): " + summarize_turns(older, budget_config.get('summary_chars', 400))
+        
+        history = ""
+        if recent:
+            turn_chars = budget_config.get('turn_chars', 600)
+            history = "Recent conversation:\n" + "\n".join(
+                f"User: {turn['user']}\nBot: {str(turn['bot'])[:turn_chars]}" for turn in recent
+            )
         
-        Keep response conversational but informative.
-        """
+        notes = ""
+        if knowledge:
+            notes = "Reference notes (use them when relevant):\n" + "\n".join(
+                f"- {passage.text[:passage_chars]}" for passage in knowledge
+            )
         
-        return system_prompt + user_prompt
+        question = f"Farmer's question: {message}\nAnswer in {language_name}, conversational but informative."
+        if not knowledge:
+            question += (" Point disease questions to the disease detection feature, prices to the "
+                         "price prediction tool and schemes to the government schemes section.")
+        
+        return build_prompt([
+            (CHATBOT_SYSTEM_PROMPT, 0),
+            (notes, 2),
+            (farmer, 2),
+            (summary, 3),
+            (history, 1, True),
+            (question, 0),
+        ], "chatbot", self.ai_engine.provider)
     
     def _get_conversation_context(self, user_id: str) -> List:
         """Get recent conversation history for context"""
-        return self.conversation_history.get(user_id, [])
+        if not is_ai_feature_enabled('conversation_memory'):
+            return []
+        return self.conversation_store.get(user_id)
     
-    def _update_conversation_history(self, user_id: str, user_message: str, bot_response: str):
-        """Update conversation history"""
-        if user_id not in self.conversation_history:
-            self.conversation_history[user_id] = []
-        
-        self.conversation_history[user_id].append({
-            "user": user_message,
-            "bot": bot_response,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        # Keep only last 10 turns
-        self.conversation_history[user_id] = self.conversation_history[user_id][-10:]
+    def _update_conversation_history(self, user_id: str, user_message: str, bot_response: str, language: str = "en"):
+        """Record the turn (bounded ring buffer, persisted write-behind); every
+        turn is kept for chat history, conversation_memory only controls whether
+        it is fed back into prompts"""
+        self.conversation_store.append(user_id, user_message, bot_response, language)
     
     def _fallback_response(self, message: str, language: str) -> Dict:
         """Fallback response when AI fails"""
@@ -430,16 +588,21 @@ AI_PROVIDERS_CONFIG = {
         "api_key_env": "GEMINI_API_KEY",
         "cost_per_token": 0.00025
     },
+    "simulated": {
+        "model": AI_CONFIG['simulated']['model'],
+        "cost_per_token": 0
+    },
     "local": {
-        "model": "llama2",
-        "endpoint": "http://localhost:11434/api/generate",
+        "model": AI_CONFIG['local']['model'],
+        "endpoint": AI_CONFIG['local']['endpoint'],
         "cost_per_token": 0  # Free for local
     }
 }
 
 # Usage example functions
-def initialize_ai_system(provider="gemini"):
+def initialize_ai_system(provider=None):
     """Initialize AI system with preferred provider"""
+    provider = provider or AI_CONFIG['default_provider']
     try:
         ai_engine = AIRecommendationEngine(provider=provider)
         chatbot = AIEnhancedChatbot(ai_engine)
@@ -449,13 +612,21 @@ def initialize_ai_system(provider="gemini"):
         return None, None
 
 def enhance_disease_detection_with_ai(disease_result: Dict, farmer_context: Dict = None):
-    """Enhance disease detection results with AI recommendations"""
+    """
+    Enhance disease detection results with AI recommendations. Precomputed
+    warm-cache entries are served first; the LLM is only called for
+    contexts the cache does not cover.
+    """
+    cached = disease_warm_cache.lookup(disease_result.get('predicted_class', ''), farmer_context)
+    if cached is not None:
+        return {**disease_result, "ai_recommendations": cached}
+    
     ai_engine, _ = initialize_ai_system()
     if ai_engine:
         enhanced_recommendations = ai_engine.generate_disease_recommendations(
             disease_result, farmer_context
         )
-        return {**disease_result, "ai_enhanced": enhanced_recommendations}
+        return {**disease_result, "ai_recommendations": enhanced_recommendations}
     return disease_result
 
 def get_ai_crop_advice(farmer_profile: Dict, season: str, location: Dict):
@@ -1,6 +1,14 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from datetime import datetime
+import csv
+import io
+import itertools
 import json
+import time
+
+from agriculture_kb import SEASONAL_CALENDAR
+from crop_suitability import recommend_crops, recommend_crops_batch
 
 # Import AI integration module
 try:
@@ -10,19 +18,48 @@ except ImportError:
     AI_RECOMMENDATIONS_AVAILABLE = False
     print("AI recommendations module not available - using basic advice")
 
+try:
+    from ai_router import provider_router
+except ImportError:
+    provider_router = None
+
+try:
+    from ai_integration import request_coalescer, disease_batcher_status
+    from local_llm import local_llm_status
+    from disease_warm_cache import disease_warm_cache
+except ImportError:
+    request_coalescer = None
+    disease_batcher_status = None
+    local_llm_status = None
+    disease_warm_cache = None
+
+try:
+    from crop_advice_cache import crop_advice_cache, representative_request
+except ImportError:
+    crop_advice_cache = None
+
+try:
+    from intent_router import intent_router
+except ImportError:
+    intent_router = None
+
+try:
+    from ai_config import AI_CONFIG
+    _bulk_config = AI_CONFIG.get('bulk_crop_advice', {})
+except ImportError:
+    _bulk_config = {}
+
 ai_recommendations_bp = Blueprint('ai_recommendations', __name__)
 
-@ai_recommendations_bp.route('/crop-advice', methods=['POST'])
-def get_crop_recommendations():
+# Shared by all bulk requests in this worker, so concurrent uploads together
+# never exceed the configured number of in-flight LLM calls
+_bulk_pool = ThreadPoolExecutor(max_workers=_bulk_config.get('concurrency', 8),
+                                thread_name_prefix='bulk-crop-advice')
+
+def extract_crop_request(data):
     """
-    Get AI-powered crop selection recommendations
+    Split a request body (or one CSV row) into farmer profile, season and location
     """
-    data = request.get_json()
-    
-    if not data:
-        return jsonify({'success': False, 'error': 'Request data is required'}), 400
-    
-    # Extract farmer profile information
     farmer_profile = {
         'farm_size': data.get('farm_size', 'Unknown'),
         'location': data.get('location', 'Unknown'),
@@ -41,37 +78,202 @@ def get_crop_recommendations():
         'rainfall': data.get('average_rainfall', 'Unknown'),
         'temperature': data.get('average_temperature', 'Unknown')
     }
+    return farmer_profile, season, location_details
+
+def advise_crops(farmer_profile, season, location_details):
+    """
+    Crop advice for one farmer: cached advice for the farmer's profile
+    bucket, else AI (asked about the bucket, so the answer can be cached),
+    else rule-based. Returns (recommendations, source) with source 'cache',
+    'ai' or 'rule_based'.
+    """
+    bucket = crop_advice_cache.bucket(farmer_profile, season, location_details) if crop_advice_cache else None
+    if bucket is not None:
+        cached = crop_advice_cache.get(bucket)
+        if cached is not None:
+            return cached, 'cache'
     
-    # Try AI-powered recommendations first
     if AI_RECOMMENDATIONS_AVAILABLE:
         try:
-            ai_advice = get_ai_crop_advice(farmer_profile, season, location_details)
-            if not ai_advice.get('error'):
-                return jsonify({
-                    'success': True,
-                    'recommendations': ai_advice,
-                    'ai_powered': True,
-                    'farmer_profile': farmer_profile,
-                    'season': season,
-                    'location': location_details,
-                    'generated_at': datetime.now().isoformat()
-                }), 200
+            ai_request = representative_request(bucket) if bucket is not None else \
+                (farmer_profile, season, location_details)
+            ai_advice = get_ai_crop_advice(*ai_request)
+            if not ai_advice.get('error') and ai_advice.get('source') != 'fallback_system':
+                if bucket is not None:
+                    crop_advice_cache.put(bucket, ai_advice)
+                return ai_advice, 'ai'
         except Exception as e:
             print(f"AI crop recommendations error: {e}")
     
-    # Fallback to basic recommendations
-    basic_recommendations = get_basic_crop_recommendations(farmer_profile, season, location_details)
+    return get_basic_crop_recommendations(farmer_profile, season, location_details), 'rule_based'
+
+@ai_recommendations_bp.route('/crop-advice', methods=['POST'])
+def get_crop_recommendations():
+    """
+    Get AI-powered crop selection recommendations
+    """
+    data = request.get_json()
     
-    return jsonify({
+    if not data:
+        return jsonify({'success': False, 'error': 'Request data is required'}), 400
+    
+    # Extract farmer profile information
+    farmer_profile, season, location_details = extract_crop_request(data)
+    
+    # Try AI-powered recommendations first, basic recommendations as fallback
+    recommendations, source = advise_crops(farmer_profile, season, location_details)
+    
+    response = {
         'success': True,
-        'recommendations': basic_recommendations,
-        'ai_powered': False,
-        'fallback_used': True,
+        'recommendations': recommendations,
+        'ai_powered': source != 'rule_based',
+        'cached': source == 'cache',
         'farmer_profile': farmer_profile,
         'season': season,
         'location': location_details,
         'generated_at': datetime.now().isoformat()
-    }), 200
+    }
+    if source == 'rule_based':
+        response['fallback_used'] = True
+    return jsonify(response), 200
+
+def _read_bulk_rows(max_rows):
+    """
+    Farmer rows from a CSV upload ('file' field), a text/csv body, or JSON
+    (a list, or {"farmers": [...]}). Returns (rows, error_message).
+    CSV is read as a stream and stops one row past max_rows, which is
+    enough for the caller to reject an oversized file.
+    """
+    if request.mimetype == 'text/csv':
+        stream = request.stream
+    else:
+        upload = request.files.get('file')
+        stream = upload.stream if upload is not None else None
+    if stream is not None:
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+        # Blank cells mean "not given", so the defaults in extract_crop_request apply
+        rows = [{key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+                for row in itertools.islice(csv.DictReader(text), max_rows + 1)]
+        return rows, None
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('farmers')
+    if not isinstance(data, list):
+        return None, 'Send a JSON list of farmer profiles, {"farmers": [...]}, or a CSV file'
+    return data, None
+
+def _profile_key(farmer_profile, season, location_details):
+    """Identical profiles (ignoring case and surrounding spaces) share one answer"""
+    def normalise(value):
+        return str(value).strip().lower()
+    return json.dumps([
+        {key: normalise(value) for key, value in farmer_profile.items()},
+        normalise(season),
+        {key: normalise(value) for key, value in location_details.items()}
+    ], sort_keys=True)
+
+@ai_recommendations_bp.route('/crop-advice/bulk', methods=['POST'])
+def get_bulk_crop_recommendations():
+    """
+    Crop advice for many farmers at once (e.g. an FPO member list).
+    Identical profiles are answered once, unique ones are sent to the AI
+    provider with bounded concurrency, and one NDJSON line is streamed per
+    input row as soon as its answer is ready. Rows that fail, or are still
+    pending when the deadline passes, get rule-based advice.
+    """
+    max_rows = _bulk_config.get('max_rows', 1000)
+    rows, error = _read_bulk_rows(max_rows)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    
+    if len(rows) > max_rows:
+        return jsonify({'success': False, 'error': f'At most {max_rows} farmers per request'}), 413
+    
+    # Group row indices by profile so each unique profile is advised once
+    groups = {}
+    invalid = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            invalid.append(index)
+            continue
+        request_parts = extract_crop_request(row)
+        key = _profile_key(*request_parts)
+        if key not in groups:
+            groups[key] = {'request': request_parts, 'rows': []}
+        groups[key]['rows'].append((index, row.get('member_id', row.get('id'))))
+    
+    def result_lines(group, recommendations, source):
+        farmer_profile, season, location_details = group['request']
+        first_index = group['rows'][0][0]
+        for index, member_id in group['rows']:
+            line = {
+                'type': 'result',
+                'index': index,
+                'member_id': member_id,
+                'success': True,
+                'recommendations': recommendations,
+                'source': source,
+                'ai_powered': source != 'rule_based',
+                'season': season,
+                'location': location_details
+            }
+            if index != first_index:
+                line['duplicate_of'] = first_index
+            yield json.dumps(line, ensure_ascii=False) + '\n'
+    
+    def stream():
+        start = time.time()
+        counts = {'ai': 0, 'cache': 0, 'rule_based': 0}
+        yield json.dumps({
+            'type': 'start',
+            'rows': len(rows),
+            'unique_profiles': len(groups),
+            'invalid_rows': len(invalid)
+        }) + '\n'
+        
+        for index in invalid:
+            yield json.dumps({'type': 'result', 'index': index, 'success': False,
+                              'error': 'Farmer profile must be an object'}) + '\n'
+        
+        pending = {_bulk_pool.submit(advise_crops, *group['request']): group for group in groups.values()}
+        try:
+            for future in as_completed(pending, timeout=_bulk_config.get('deadline_seconds', 300)):
+                group = pending.pop(future)
+                try:
+                    recommendations, source = future.result()
+                except Exception as e:
+                    print(f"Bulk crop advice error: {e}")
+                    recommendations, source = get_basic_crop_recommendations(*group['request']), 'rule_based'
+                counts[source] += len(group['rows'])
+                yield from result_lines(group, recommendations, source)
+        except FuturesTimeoutError:
+            print(f"Bulk crop advice deadline reached, {len(pending)} profiles answered rule-based")
+        finally:
+            # Also runs when the client disconnects: drop queued work it no longer needs
+            for future in pending:
+                future.cancel()
+        
+        # Score every unanswered profile in one vectorised pass
+        late_groups = list(pending.values())
+        late_answers = recommend_crops_batch([group['request'] for group in late_groups])
+        for group, recommendations in zip(late_groups, late_answers):
+            counts['rule_based'] += len(group['rows'])
+            yield from result_lines(group, recommendations, 'rule_based')
+        
+        yield json.dumps({
+            'type': 'done',
+            'rows': len(rows),
+            'unique_profiles': len(groups),
+            'ai_powered': counts['ai'],
+            'cached': counts['cache'],
+            'rule_based': counts['rule_based'],
+            'failed': len(invalid),
+            'elapsed_seconds': round(time.time() - start, 2),
+            'generated_at': datetime.now().isoformat()
+        }) + '\n'
+    
+    return Response(stream(), mimetype='application/x-ndjson')
 
 @ai_recommendations_bp.route('/seasonal-calendar', methods=['POST'])
 def get_seasonal_calendar():
@@ -83,40 +285,9 @@ def get_seasonal_calendar():
     location = data.get('location', 'India')
     crops = data.get('crops', ['rice', 'wheat'])
     
-    # Basic seasonal calendar (can be enhanced with AI)
-    calendar = {
-        'kharif_season': {
-            'months': 'June-October',
-            'crops': ['Rice', 'Cotton', 'Sugarcane', 'Pulses'],
-            'activities': [
-                'Sowing: June-July',
-                'Weeding: July-August', 
-                'Harvesting: September-October'
-            ]
-        },
-        'rabi_season': {
-            'months': 'November-April',
-            'crops': ['Wheat', 'Barley', 'Peas', 'Gram'],
-            'activities': [
-                'Sowing: November-December',
-                'Irrigation: January-February',
-                'Harvesting: March-April'
-            ]
-        },
-        'zaid_season': {
-            'months': 'April-June',
-            'crops': ['Fodder', 'Vegetables', 'Watermelon'],
-            'activities': [
-                'Sowing: April',
-                'Intensive irrigation needed',
-                'Harvesting: June'
-            ]
-        }
-    }
-    
     return jsonify({
         'success': True,
-        'seasonal_calendar': calendar,
+        'seasonal_calendar': SEASONAL_CALENDAR,
         'location': location,
         'ai_enhanced': False,
         'generated_at': datetime.now().isoformat()
@@ -148,55 +319,33 @@ def get_personalized_tips():
         'generated_at': datetime.now().isoformat()
     }), 200
 
-def get_basic_crop_recommendations(farmer_profile, season, location):
+@ai_recommendations_bp.route('/providers/status', methods=['GET'])
+def get_provider_status():
     """
-    Basic crop recommendations when AI is not available
+    Diagnostics: per-provider latency, error rate and circuit state, plus coalescing counters
     """
+    if provider_router is None:
+        return jsonify({'success': False, 'error': 'Provider router not available'}), 503
     
-    farm_size = farmer_profile.get('farm_size', 'Unknown')
-    state = location.get('state', 'Unknown').lower()
-    
-    # Basic recommendations based on common patterns
-    recommendations = {
-        'top_crops': [],
-        'reasoning': [],
-        'market_potential': 'Moderate',
-        'investment_required': 'Medium',
-        'risk_level': 'Medium'
-    }
-    
-    # Season-based recommendations
-    if season.lower() in ['kharif', 'monsoon']:
-        recommendations['top_crops'] = ['Rice', 'Cotton', 'Sugarcane', 'Maize', 'Pulses']
-        recommendations['reasoning'].append('Monsoon season suitable for water-intensive crops')
-    elif season.lower() in ['rabi', 'winter']:
-        recommendations['top_crops'] = ['Wheat', 'Barley', 'Gram', 'Peas', 'Mustard']
-        recommendations['reasoning'].append('Winter season ideal for grain crops')
-    elif season.lower() in ['zaid', 'summer']:
-        recommendations['top_crops'] = ['Fodder crops', 'Vegetables', 'Watermelon', 'Cucumber']
-        recommendations['reasoning'].append('Summer season requires heat-tolerant crops')
-    else:
-        recommendations['top_crops'] = ['Rice', 'Wheat', 'Vegetables', 'Pulses']
-        recommendations['reasoning'].append('Year-round suitable crops')
-    
-    # State-specific adjustments
-    if 'punjab' in state or 'haryana' in state:
-        recommendations['top_crops'].extend(['Wheat', 'Rice'])
-        recommendations['reasoning'].append('Punjab/Haryana: Wheat-Rice belt')
-    elif 'maharashtra' in state:
-        recommendations['top_crops'].extend(['Cotton', 'Sugarcane', 'Onion'])
-        recommendations['reasoning'].append('Maharashtra: Cotton and horticulture state')
-    elif 'kerala' in state or 'tamil nadu' in state:
-        recommendations['top_crops'].extend(['Rice', 'Coconut', 'Spices'])
-        recommendations['reasoning'].append('South India: Rice and plantation crops')
-    
-    # Farm size adjustments
-    if 'small' in str(farm_size).lower() or ('2' in str(farm_size) and 'acre' in str(farm_size).lower()):
-        recommendations['top_crops'] = ['Vegetables', 'Pulses', 'Spices', 'Flowers']
-        recommendations['reasoning'].append('Small farms: High-value crops recommended')
-        recommendations['investment_required'] = 'Low to Medium'
-    
-    return recommendations
+    return jsonify({
+        'success': True,
+        'routing': provider_router.status(),
+        'coalescing': request_coalescer.status() if request_coalescer else None,
+        'local_llm': local_llm_status() if local_llm_status else None,
+        'disease_warm_cache': disease_warm_cache.status() if disease_warm_cache else None,
+        'disease_batching': disease_batcher_status() if disease_batcher_status else None,
+        'crop_advice_cache': crop_advice_cache.status() if crop_advice_cache else None,
+        'intent_router': intent_router.status() if intent_router else None,
+        'generated_at': datetime.now().isoformat()
+    }), 200
+
+def get_basic_crop_recommendations(farmer_profile, season, location):
+    """
+    Basic crop recommendations when AI is not available: every crop is scored
+    against the profile (season, region, soil, water, budget, farm size,
+    experience) and the best ranked, with the reasons for each
+    """
+    return recommend_crops(farmer_profile, season, location)
 
 def generate_basic_farming_tips(farmer_data):
     """
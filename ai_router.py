@@ -0,0 +1,264 @@
+# Provider Router for AgroMitra
+# Keeps rolling latency / error statistics per AI provider and model, trips a
+# circuit breaker on failure bursts and orders providers for each request
+
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from ai_config import AI_CONFIG
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker: closed -> open on a failure burst,
+    open -> half_open after the cooldown, half_open -> closed on one success
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def available(self, now: float) -> bool:
+        """Return True if a request could be sent now, without claiming a probe"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            return now - self.opened_at >= self.cooldown_seconds
+        return not self.probe_in_flight
+
+    def allow(self, now: float) -> bool:
+        """Return True if a request may be sent, claiming the half-open probe slot"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if now - self.opened_at < self.cooldown_seconds:
+                return False
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+        # Half-open: let exactly one probe through
+        if self.probe_in_flight:
+            return False
+        self.probe_in_flight = True
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def record_failure(self, now: float, force_open: bool = False):
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if (force_open or self.state == self.HALF_OPEN
+                or self.consecutive_failures >= self.failure_threshold):
+            self.state = self.OPEN
+            self.opened_at = now
+
+    def to_dict(self, now: float) -> Dict:
+        retry_in = None
+        if self.state == self.OPEN:
+            retry_in = round(max(0.0, self.cooldown_seconds - (now - self.opened_at)), 2)
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'retry_in_seconds': retry_in
+        }
+
+
+class ProviderStats:
+    """Rolling latency and error-rate statistics for one provider/model pair"""
+
+    def __init__(self, window_size: int, ewma_alpha: float, window_seconds: float):
+        self.samples = deque(maxlen=window_size)  # (timestamp, latency, ok)
+        self.ewma_alpha = ewma_alpha
+        self.window_seconds = window_seconds
+        self.ewma_latency = None
+        self.total_calls = 0
+        self.total_failures = 0
+        self.last_error = None
+
+    def record(self, now: float, latency: float, ok: bool, error: Optional[str] = None):
+        self.samples.append((now, latency, ok))
+        self.total_calls += 1
+        if ok:
+            # Only successful calls say anything about how fast a provider answers
+            if self.ewma_latency is None:
+                self.ewma_latency = latency
+            else:
+                self.ewma_latency += self.ewma_alpha * (latency - self.ewma_latency)
+        else:
+            self.total_failures += 1
+            self.last_error = error
+
+    def prune(self, now: float):
+        """Forget samples older than the window so old failures stop counting"""
+        cutoff = now - self.window_seconds
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+
+    @property
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, _, ok in self.samples if not ok) / len(self.samples)
+
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        latencies = sorted(latency for _, latency, ok in self.samples if ok)
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(round(pct / 100.0 * (len(latencies) - 1))))
+        return latencies[index]
+
+    def to_dict(self) -> Dict:
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            'window_calls': len(self.samples),
+            'error_rate': round(self.error_rate, 3),
+            'ewma_latency_ms': ms(self.ewma_latency),
+            'p50_latency_ms': ms(self.latency_percentile(50)),
+            'p95_latency_ms': ms(self.latency_percentile(95)),
+            'total_calls': self.total_calls,
+            'total_failures': self.total_failures,
+            'last_error': self.last_error
+        }
+
+
+class ProviderRouter:
+    """
+    Routes each AI request to the provider that is currently fastest and healthy.
+    One instance is shared per worker process so statistics survive across requests.
+    """
+
+    def __init__(self, config: Dict = None):
+        self.config = config or AI_CONFIG
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._breakers = {}
+
+    @property
+    def settings(self) -> Dict:
+        return self.config.get('routing', {})
+
+    def model_for(self, provider: str) -> str:
+        return self.config.get(provider, {}).get('model', 'default')
+
+    def _key(self, provider: str) -> str:
+        return f"{provider}:{self.model_for(provider)}"
+
+    def _get(self, provider: str):
+        key = self._key(provider)
+        if key not in self._stats:
+            self._stats[key] = ProviderStats(
+                self.settings.get('window_size', 50),
+                self.settings.get('ewma_alpha', 0.3),
+                self.settings.get('window_seconds', 300)
+            )
+            self._breakers[key] = CircuitBreaker(
+                self.settings.get('failure_threshold', 5),
+                self.settings.get('cooldown_seconds', 30)
+            )
+        return self._stats[key], self._breakers[key]
+
+    def is_configured(self, provider: str) -> bool:
+        """A provider is routable when it is enabled and, for cloud APIs, has a key"""
+        config = self.config.get(provider, {})
+        if not config.get('enabled', False):
+            return False
+        if 'api_key' in config and not config.get('api_key'):
+            return False
+        return True
+
+    def _score(self, stats: ProviderStats) -> float:
+        latency = stats.ewma_latency
+        if latency is None:
+            latency = self.settings.get('prior_latency', 2.0)
+        return latency * (1.0 + self.settings.get('error_penalty', 4.0) * stats.error_rate)
+
+    def candidates(self, preferred: Optional[str] = None) -> List[str]:
+        """
+        Return routable providers ordered best first. Providers that have
+        answered rank ahead of ones that never have, so a slow but working
+        provider is not passed over for one that may not even be running.
+        Providers whose breaker is open are skipped; call acquire() before
+        actually sending a request.
+        """
+        preferred = preferred or self.config.get('default_provider')
+        now = time.monotonic()
+        ranked = []
+        with self._lock:
+            for provider in self.settings.get('providers', [preferred]):
+                if not self.is_configured(provider):
+                    continue
+                stats, breaker = self._get(provider)
+                stats.prune(now)
+                if not breaker.available(now):
+                    continue
+                # Preferred provider wins ties so routing is stable without samples
+                ranked.append((stats.ewma_latency is None, self._score(stats),
+                               provider != preferred, provider))
+        ranked.sort()
+        return [ranked_provider[-1] for ranked_provider in ranked]
+
+    def acquire(self, provider: str) -> bool:
+        """Claim permission to call a provider (takes the probe slot if half-open)"""
+        with self._lock:
+            _, breaker = self._get(provider)
+            return breaker.allow(time.monotonic())
+
+    def record_success(self, provider: str, latency: float):
+        now = time.monotonic()
+        with self._lock:
+            stats, breaker = self._get(provider)
+            stats.record(now, latency, True)
+            breaker.record_success()
+
+    def record_failure(self, provider: str, latency: float, error: Exception = None):
+        now = time.monotonic()
+        settings = self.settings
+        with self._lock:
+            stats, breaker = self._get(provider)
+            stats.prune(now)
+            stats.record(now, latency, False, str(error) if error else None)
+            # A high error rate over a full enough window also counts as a burst
+            burst = (len(stats.samples) >= settings.get('min_calls_for_rate', 10)
+                     and stats.error_rate >= settings.get('error_rate_threshold', 0.5))
+            breaker.record_failure(now, force_open=burst)
+
+    def status(self) -> Dict:
+        """Diagnostics snapshot of every provider the router knows about"""
+        now = time.monotonic()
+        preferred = self.config.get('default_provider')
+        providers = {}
+        with self._lock:
+            for provider in self.settings.get('providers', [preferred]):
+                stats, breaker = self._get(provider)
+                stats.prune(now)
+                providers[provider] = {
+                    'model': self.model_for(provider),
+                    'configured': self.is_configured(provider),
+                    'score': round(self._score(stats), 4),
+                    'circuit': breaker.to_dict(now),
+                    **stats.to_dict()
+                }
+        return {
+            'default_provider': preferred,
+            'providers': providers,
+            'routing_order': self.candidates(preferred)
+        }
+
+
+# Shared per worker process
+provider_router = ProviderRouter()
@@ -0,0 +1,136 @@
+# Simulated AI Provider for AgroMitra
+# Deterministic canned responses with configurable latency, error rate and
+# stream chunking, for load tests and benchmarks without spending API quota
+
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from typing import Dict, Iterator
+
+from ai_config import AI_CONFIG
+from prompt_budget import count_tokens
+
+
+class SimulatedProviderError(Exception):
+    """Injected upstream failure"""
+
+
+CANNED_DISEASE = {
+    "immediate_actions": ["Remove and destroy infected leaves", "Stop overhead irrigation"],
+    "treatment_plan": [{"product": "Mancozeb 75% WP", "dosage": "2.5 g per litre", "interval_days": 7}],
+    "cultural_practices": ["Widen plant spacing", "Sanitise tools between plants"],
+    "prevention": ["Rotate crops for two seasons", "Use certified disease-free seed"],
+    "organic_alternatives": ["Neem oil 3 ml per litre", "Trichoderma soil application"],
+    "cost_estimate": "₹800-1500 per acre",
+    "recovery_timeline": "2-3 weeks",
+    "monitoring_checklist": ["New lesions on upper leaves", "Spread to neighbouring plants"],
+    "extension_contacts": ["Nearest Krishi Vigyan Kendra", "Kisan Call Centre 1800-180-1551"],
+    "follow_up": ["Re-inspect after 7 days", "Apply balanced NPK after recovery"]
+}
+
+CANNED_CROP = {
+    "top_crops": [
+        {"crop": "Wheat", "reason": "Suited to the season and assured irrigation"},
+        {"crop": "Mustard", "reason": "Low water need, good oilseed prices"},
+        {"crop": "Gram", "reason": "Fixes nitrogen, low input cost"},
+        {"crop": "Onion", "reason": "High value for small holdings"},
+        {"crop": "Peas", "reason": "Short duration, strong local demand"}
+    ],
+    "expected_profit_margin": "20-35%",
+    "water_requirements": "3-5 irrigations for wheat, 1-2 for mustard and gram",
+    "market_demand": "Stable MSP support for wheat and gram",
+    "risks": ["Terminal heat stress", "Aphids on mustard"],
+    "timeline": ["Sowing: November", "Harvest: March-April"]
+}
+
+CANNED_CHAT = (
+    "Namaste! For most crops, water early in the morning and check soil moisture "
+    "a few centimetres below the surface before irrigating. Drip irrigation saves "
+    "30-50% water and the PMKSY scheme subsidises the installation. Tell me your "
+    "crop and district for more specific advice."
+)
+
+
+class SimulatedProvider:
+    """
+    Stands in for an LLM API. Latency is drawn per call from a fixed, uniform
+    or lognormal distribution using an RNG seeded from (seed, prompt, call
+    number), so a sequential benchmark run is reproducible.
+    """
+
+    def __init__(self, config: Dict = None):
+        self.config = config or AI_CONFIG.get('simulated', {})
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def _rng(self, prompt: str) -> random.Random:
+        with self._lock:
+            self._counter += 1
+            call_number = self._counter
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+        return random.Random(f"{self.config.get('seed', 42)}:{digest}:{call_number}")
+
+    def _latency(self, rng: random.Random) -> float:
+        """Total response time in seconds"""
+        latency = self.config.get('latency', {})
+        distribution = latency.get('distribution', 'lognormal')
+        median_ms = latency.get('median_ms', 800)
+        if distribution == 'fixed':
+            value = median_ms
+        elif distribution == 'uniform':
+            value = rng.uniform(latency.get('min_ms', 0), latency.get('max_ms', 2 * median_ms))
+        else:
+            value = rng.lognormvariate(math.log(max(median_ms, 1e-3)), latency.get('sigma', 0.5))
+        return min(value, latency.get('max_ms', float('inf'))) / 1000.0
+
+    @staticmethod
+    def _canned(prompt: str) -> str:
+        lowered = prompt.lower()
+        if 'respond with a json array' in lowered:
+            # Packed disease prompt: one object per "[id]" case
+            ids = re.findall(r'^\[(\w+)\]$', prompt, re.MULTILINE)
+            return json.dumps([{'id': case_id, **CANNED_DISEASE} for case_id in ids], ensure_ascii=False)
+        if 'plant pathologist' in lowered:
+            return json.dumps(CANNED_DISEASE, ensure_ascii=False)
+        if 'recommend crops' in lowered:
+            return json.dumps(CANNED_CROP, ensure_ascii=False)
+        return CANNED_CHAT
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Yield the response in chunks. Time to first chunk plus the inter-chunk
+        delays add up to the sampled latency, as with a streaming API.
+        """
+        rng = self._rng(prompt)
+        total = self._latency(rng)
+        if rng.random() < self.config.get('error_rate', 0.0):
+            time.sleep(total * rng.random())
+            raise SimulatedProviderError("Simulated provider error")
+
+        text = self._canned(prompt)
+        chunk_chars = max(1, self.config.get('stream_chunk_chars', 0) or len(text))
+        chunks = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)] or ['']
+        first_share = self.config.get('first_chunk_share', 0.4) if len(chunks) > 1 else 1.0
+        time.sleep(total * first_share)
+        yield chunks[0]
+        delay = total * (1 - first_share) / max(1, len(chunks) - 1)
+        for chunk in chunks[1:]:
+            time.sleep(delay)
+            yield chunk
+
+    def generate(self, prompt: str) -> Dict:
+        """Blocking call shaped like the local backend: text plus token counts"""
+        text = ''.join(self.stream(prompt))
+        return {
+            'text': text,
+            'prompt_tokens': count_tokens(prompt, 'gemini'),
+            'completion_tokens': count_tokens(text, 'gemini')
+        }
+
+
+# Shared per worker process
+simulated_provider = SimulatedProvider()
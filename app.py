@@ -86,6 +86,13 @@ try:
 except Exception as e:
     print(f"⚠️ FarmStories routes not available: {e}")
 
+try:
+    from backend.routes.ai_recommendations import ai_recommendations_bp
+    app.register_blueprint(ai_recommendations_bp, url_prefix='/api/ai')
+    print("✅ AI recommendation routes loaded successfully")
+except Exception as e:
+    print(f"⚠️ AI recommendation routes not available: {e}")
+
 # Add placeholder for disease detection if it's not available
 try:
     from backend.routes.disease_detection import disease_bp
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+AI Load Benchmark for AgroMitra
+Drives the chatbot, crop-advice and disease-enhancement paths concurrently and
+reports throughput and tail latency under simulated LLM timing.
+
+Offline, in-process Flask app with the simulated provider:
+    python bench_ai.py --requests 500 --concurrency 32 --median-ms 800
+
+Against a running server (start it with AI_SIMULATED=true):
+    python bench_ai.py --url http://localhost:5000 --requests 2000 --concurrency 64
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+CHAT_MESSAGES = [
+    'How often should I irrigate wheat?',
+    'What fertilizer is best for paddy in kharif?',
+    'My tomato leaves have brown spots',
+    'How do I apply for PM-KISAN?',
+    'Which crop gives best profit on 2 acres?',
+    'When should I sow mustard in Rajasthan?',
+    'Is drip irrigation worth it for onion?',
+    'How to control aphids organically?'
+]
+
+CROP_PROFILES = [
+    {'farm_size': 2, 'state': 'Maharashtra', 'district': 'Nashik', 'season': 'rabi', 'irrigation': 'drip'},
+    {'farm_size': 8, 'state': 'Punjab', 'district': 'Ludhiana', 'season': 'kharif', 'irrigation': 'canal'},
+    {'farm_size': 1, 'state': 'Tamil Nadu', 'district': 'Salem', 'season': 'zaid', 'irrigation': 'rainfed'},
+    {'farm_size': 4, 'state': 'Bihar', 'district': 'Gaya', 'season': 'rabi', 'irrigation': 'borewell'}
+]
+
+DISEASE_RESULTS = [
+    {'predicted_class': 'Tomato___Late_blight', 'disease_name': 'Late Blight', 'confidence': 94.1, 'severity': 'High'},
+    {'predicted_class': 'Potato___Early_blight', 'disease_name': 'Early Blight', 'confidence': 88.7, 'severity': 'Moderate'},
+    {'predicted_class': 'Corn_(maize)___Common_rust', 'disease_name': 'Common Rust', 'confidence': 91.3, 'severity': 'Moderate'}
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def build_local_app():
+    """Minimal Flask app with the AI blueprints, mounted as in app.py
+
+    An in-memory database stands in for agromitra.db so signed-in chat turns
+    are flushed to chat_history as they would be on a server.
+    """
+    from flask import Flask
+    from models import db
+    from chatbot import chatbot_bp
+    from ai_recommendations import ai_recommendations_bp
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    app.register_blueprint(chatbot_bp, url_prefix='/api/chatbot')
+    app.register_blueprint(ai_recommendations_bp, url_prefix='/api/ai')
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def make_poster(args):
+    """Return post(path, payload, headers=None) -> (status_code, json_body)"""
+    if args.url:
+        import requests
+        session = requests.Session()
+
+        def post(path, payload, headers=None):
+            response = session.post(args.url.rstrip('/') + path, json=payload, headers=headers,
+                                    timeout=args.timeout)
+            return response.status_code, response.json()
+        return post
+
+    app = build_local_app()
+
+    def post(path, payload, headers=None):
+        response = app.test_client().post(path, json=payload, headers=headers)
+        return response.status_code, response.get_json()
+    return post
+
+
+def user_headers(args):
+    """Authorization headers for args.users bench users, signed as profile.py signs logins
+
+    Chat only remembers turns for the token's user, and only numeric (users.id)
+    ids, so each simulated user gets a token for args.first_user_id + n.
+    --users 0 sends every chat anonymously.
+    """
+    if args.users <= 0:
+        return [None]
+    import jwt
+    from datetime import datetime, timedelta
+    secret = args.jwt_secret
+    if secret is None:
+        from profile import SECRET_KEY as secret
+    expires = datetime.utcnow() + timedelta(days=1)
+    return [{'Authorization': 'Bearer ' + jwt.encode({'user_id': args.first_user_id + n, 'exp': expires},
+                                                      secret, algorithm='HS256')}
+            for n in range(args.users)]
+
+
+def outcome(body):
+    """'ai' for an LLM answer, 'local' for one the intent router served, else 'fallback'"""
+    if not body:
+        return 'fallback'
+    if body.get('ai_powered'):
+        return 'ai'
+    if body.get('answered_from') and not body.get('fallback_used'):
+        return 'local'
+    return 'fallback'
+
+
+def run_scenario(name, task, args):
+    latencies = []
+    failures = 0
+    outcomes = {'ai': 0, 'local': 0, 'fallback': 0}
+
+    def one(i):
+        start = time.perf_counter()
+        try:
+            ok, result = task(i)
+        except Exception:
+            ok, result = False, 'fallback'
+        return time.perf_counter() - start, ok, result
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for latency, ok, result in pool.map(one, range(args.requests)):
+            latencies.append(latency)
+            if not ok:
+                failures += 1
+            else:
+                outcomes[result] += 1
+    wall = time.perf_counter() - wall_start
+
+    def ms(value):
+        return f"{value * 1000:8.1f}" if value is not None else '       -'
+
+    print(f"{name:<10} {args.requests / wall:8.1f} req/s  "
+          f"p50 {ms(percentile(latencies, 50))} ms  p90 {ms(percentile(latencies, 90))} ms  "
+          f"p99 {ms(percentile(latencies, 99))} ms  max {ms(max(latencies))} ms  "
+          f"errors {failures}  local {outcomes['local']}  fallback {outcomes['fallback']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark AgroMitra AI endpoints under simulated LLM latency')
+    parser.add_argument('--url', help='Base URL of a running server; default runs the app in-process')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--users', type=int, default=50,
+                        help='Distinct signed-in chat users; 0 chats anonymously')
+    parser.add_argument('--first-user-id', type=int, default=900000,
+                        help='users.id of the first bench user; ids run upwards from it')
+    parser.add_argument('--jwt-secret',
+                        help="Secret the server signs tokens with; default profile.py's SECRET_KEY")
+    parser.add_argument('--scenarios', default='chat,crop,disease')
+    parser.add_argument('--median-ms', type=float, help='Simulated median latency (in-process only)')
+    parser.add_argument('--error-rate', type=float, help='Simulated error rate (in-process only)')
+    parser.add_argument('--timeout', type=float, default=120)
+    args = parser.parse_args()
+
+    if not args.url:
+        # Must be set before ai_config is imported
+        os.environ['AI_SIMULATED'] = 'true'
+        if args.median_ms is not None:
+            os.environ['AI_SIMULATED_MEDIAN_MS'] = str(args.median_ms)
+        if args.error_rate is not None:
+            os.environ['AI_SIMULATED_ERROR_RATE'] = str(args.error_rate)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    post = make_poster(args)
+    headers = user_headers(args)
+
+    def chat(i):
+        status, body = post('/api/chatbot/chat', {
+            'message': CHAT_MESSAGES[i % len(CHAT_MESSAGES)],
+            'language': ('en', 'hi', 'ta')[i % 3]
+        }, headers[i % len(headers)])
+        return status == 200, outcome(body)
+
+    def crop(i):
+        status, body = post('/api/ai/crop-advice', CROP_PROFILES[i % len(CROP_PROFILES)])
+        return status == 200, outcome(body)
+
+    def disease(i):
+        from ai_integration import enhance_disease_detection_with_ai
+        result = enhance_disease_detection_with_ai(dict(DISEASE_RESULTS[i % len(DISEASE_RESULTS)]),
+                                                   {'location': f"District {i % 20}"})
+        enhanced = result.get('ai_recommendations', {})
+        return True, 'fallback' if enhanced.get('source') == 'fallback_system' else 'ai'
+
+    scenarios = {'chat': chat, 'crop': crop, 'disease': disease}
+    print(f"AgroMitra AI benchmark: {args.requests} requests/scenario, concurrency {args.concurrency}, "
+          f"{'server ' + args.url if args.url else 'in-process, simulated provider'}")
+    for name in args.scenarios.split(','):
+        name = name.strip()
+        if name == 'disease' and args.url:
+            print("disease    skipped (needs image upload against a server)")
+            continue
+        run_scenario(name, scenarios[name], args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 import json
 from datetime import datetime
+from functools import wraps
 
 # Import AI integration module
 try:
@@ -11,85 +12,46 @@ except ImportError as e:
     AI_CHATBOT_AVAILABLE = False
     print(f"AI chatbot module not available - using rule-based responses. Error: {e}")
 
-chatbot_bp = Blueprint('chatbot', __name__)
+try:
+    from conversation_store import conversation_store
+except ImportError:
+    conversation_store = None
 
-# Agricultural knowledge base for chatbot
-AGRICULTURE_KB = {
-    'disease': {
-        'keywords': ['disease', 'pest', 'infection', 'spots', 'yellowing', 'wilting'],
-        'responses': {
-            'en': 'I can help you identify plant diseases. Please upload a photo of the affected plant using our disease detection feature. Common diseases include blight, rust, and fungal infections.',
-            'hi': 'मैं पौधों की बीमारियों की पहचान करने में आपकी मदद कर सकता हूं। कृपया हमारे रोग पहचान सुविधा का उपयोग करके प्रभावित पौधे की तस्वीर अपलोड करें।',
-            'ta': 'செடி நோய்களை அடையாளம் காண நான் உங்களுக்கு உதவ முடியும். எங்கள் நோய் கண்டறிதல் அம்சத்தைப் பயன்படுத்தி பாதிக்கப்பட்ட செடியின் புகைப்படத்தை பதிவேற்றவும்.'
-        }
-    },
-    'price': {
-        'keywords': ['price', 'rate', 'market', 'sell', 'value', 'cost'],
-        'responses': {
-            'en': 'I can help you check current market prices and predict future prices. Visit the Price Prediction section for detailed price analysis of various crops.',
-            'hi': 'मैं आपको वर्तमान बाजार मूल्य जांचने और भविष्य की कीमतों का अनुमान लगाने में मदद कर सकता हूं। विभिन्न फसलों के विस्तृत मूल्य विश्लेषण के लिए मूल्य पूर्वानुमान अनुभाग देखें।',
-            'ta': 'தற்போதைய சந்தை விலைகளை சரிபார்க்கவும் எதிர்கால விலைகளை கணிக்கவும் நான் உங்களுக்கு உதவ முடியும். பல்வேறு பயிர்களின் விரிவான விலை பகுப்பாய்வுக்கு விலை முன்னறிவிப்பு பிரிவைப் பார்வையிடவும்.'
-        }
-    },
-    'irrigation': {
-        'keywords': ['water', 'irrigation', 'drip', 'watering', 'rainfall'],
-        'responses': {
-            'en': 'For water management, consider drip irrigation for efficient water use. Water crops early morning or evening. Check soil moisture before watering. The PMKSY scheme provides support for irrigation.',
-            'hi': 'जल प्रबंधन के लिए, कुशल पानी उपयोग के लिए ड्रिप सिंचाई पर विचार करें। सुबह जल्दी या शाम को फसलों को पानी दें। पानी देने से पहले मिट्टी की नमी जांचें।',
-            'ta': 'நீர் மேலாண்மைக்கு, திறமையான நீர் பயன்பாட்டிற்கு சொட்டு நீர் பாசனத்தை பரிசீலிக்கவும். காலை அல்லது மாலை பயிர்களுக்கு நீர் பாய்ச்சவும்.'
-        }
-    },
-    'fertilizer': {
-        'keywords': ['fertilizer', 'manure', 'nutrients', 'nitrogen', 'organic'],
-        'responses': {
-            'en': 'Use soil health cards to determine nutrient requirements. Apply fertilizers based on soil test reports. Organic options include compost, vermicompost, and green manure. NPK ratios depend on crop type.',
-            'hi': 'पोषक तत्वों की आवश्यकता निर्धारित करने के लिए मृदा स्वास्थ्य कार्ड का उपयोग करें। मिट्टी परीक्षण रिपोर्ट के आधार पर उर्वरक लागू करें। जैविक विकल्पों में खाद, वर्मीकम्पोस्ट शामिल हैं।',
-            'ta': 'ஊட்டச்சத்து தேவைகளை தீர்மானிக்க மண் ஆரோக்கிய அட்டைகளைப் பயன்படுத்தவும். மண் சோதனை அறிக்கைகளின் அடிப்படையில் உரங்களைப் பயன்படுத்தவும்.'
-        }
-    },
-    'schemes': {
-        'keywords': ['scheme', 'subsidy', 'government', 'loan', 'support', 'yojana'],
-        'responses': {
-            'en': 'Check the Schemes section for government programs like PM-KISAN (₹6000/year), PMFBY (crop insurance), KCC (credit card), and more. I can help you check eligibility.',
-            'hi': 'पीएम-किसान (₹6000/वर्ष), पीएमएफबीवाई (फसल बीमा), केसीसी (क्रेडिट कार्ड) जैसी सरकारी योजनाओं के लिए योजना अनुभाग देखें।',
-            'ta': 'PM-KISAN (₹6000/ஆண்டு), PMFBY (பயிர் காப்பீடு), KCC (கடன் அட்டை) போன்ற அரசாங்க திட்டங்களுக்கு திட்டங்கள் பிரிவைச் சரிபார்க்கவும்.'
-        }
-    },
-    'weather': {
-        'keywords': ['weather', 'rain', 'temperature', 'climate', 'season'],
-        'responses': {
-            'en': 'Monitor local weather forecasts regularly. Different crops require different climate conditions. Kharif crops need good monsoon rainfall, while Rabi crops need cooler temperatures.',
-            'hi': 'स्थानीय मौसम पूर्वानुमानों की नियमित निगरानी करें। विभिन्न फसलों को अलग-अलग जलवायु परिस्थितियों की आवश्यकता होती है।',
-            'ta': 'உள்ளூர் வானிலை முன்னறிவிப்புகளை தவறாமல் கண்காணிக்கவும். வெவ்வேறு பயிர்களுக்கு வெவ்வேறு காலநிலை நிலைமைகள் தேவை.'
-        }
-    },
-    'seed': {
-        'keywords': ['seed', 'variety', 'hybrid', 'planting', 'sowing'],
-        'responses': {
-            'en': 'Always use certified seeds from authorized dealers. Choose varieties suitable for your region. Hybrid seeds offer better yield but require proper care. Check seed treatment requirements before sowing.',
-            'hi': 'हमेशा अधिकृत डीलरों से प्रमाणित बीज का उपयोग करें। अपने क्षेत्र के लिए उपयुक्त किस्मों का चयन करें।',
-            'ta': 'அங்கீகரிக்கப்பட்ட விற்பனையாளர்களிடமிருந்து எப்போதும் சான்றளிக்கப்பட்ட விதைகளைப் பயன்படுத்தவும்.'
-        }
-    },
-    'organic': {
-        'keywords': ['organic', 'natural', 'chemical-free', 'bio'],
-        'responses': {
-            'en': 'Organic farming is supported by PKVY scheme (₹50,000/hectare). Use organic manure, biopesticides, and natural farming methods. Certification required for organic label. Market premium available.',
-            'hi': 'जैविक खेती PKVY योजना (₹50,000/हेक्टेयर) द्वारा समर्थित है। जैविक खाद, जैव कीटनाशकों का उपयोग करें।',
-            'ta': 'இயற்கை விவசாயம் PKVY திட்டத்தால் ஆதரிக்கப்படுகிறது (₹50,000/ஹெக்டேர்).'
-        }
-    }
-}
+from agriculture_kb import AGRICULTURE_KB
+from keyword_matcher import GREETING_TOPIC, topic_matcher
+
+# Through the app package where possible: a bare 'profile' is the stdlib
+# profiler once cProfile (or profile) has been imported
+try:
+    try:
+        from backend.routes.profile import token_required, token_user_id
+    except ImportError:
+        from profile import token_required, token_user_id
+    AUTH_AVAILABLE = True
+except ImportError as e:
+    AUTH_AVAILABLE = False
+    print(f"Sign-in not available to the chatbot - chat runs without memory. Error: {e}")
+
+    def token_user_id():
+        return None
+
+    def token_required(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            return jsonify({'success': False, 'error': 'Sign-in is not available'}), 503
+        return decorated
+
+chatbot_bp = Blueprint('chatbot', __name__)
 
 def get_chatbot_response(message, language='en'):
     """
     Generate chatbot response based on message and language
     """
-    message_lower = message.lower()
+    # One pass over the message scores every topic (English, Hindi, Tamil, transliterated)
+    topic = topic_matcher.best_topic(message)
     
-    # Check for greetings
-    greetings = ['hello', 'hi', 'hey', 'namaste', 'vanakkam']
-    if any(greeting in message_lower for greeting in greetings):
+    # Greetings only when the message is not about a topic
+    if topic == GREETING_TOPIC:
         responses = {
             'en': 'Hello! I am your agricultural assistant. I can help you with crop diseases, market prices, government schemes, and farming advice. How can I assist you today?',
             'hi': 'नमस्ते! मैं आपका कृषि सहायक हूं। मैं फसल रोगों, बाजार मूल्यों, सरकारी योजनाओं और खेती सलाह में आपकी मदद कर सकता हूं।',
@@ -97,10 +59,10 @@ def get_chatbot_response(message, language='en'):
         }
         return responses.get(language, responses['en'])
     
-    # Check knowledge base
-    for topic, data in AGRICULTURE_KB.items():
-        if any(keyword in message_lower for keyword in data['keywords']):
-            return data['responses'].get(language, data['responses']['en'])
+    # Best matching knowledge base topic
+    if topic:
+        responses = AGRICULTURE_KB[topic]['responses']
+        return responses.get(language, responses['en'])
     
     # Default response
     default_responses = {
@@ -122,7 +84,10 @@ def chat():
     
     message = data['message']
     language = data.get('language', 'en')
-    user_id = data.get('user_id', 'anonymous')
+    # Only a signed-in caller has remembered turns; the body's user_id is not trusted
+    user_id = token_user_id()
+    if user_id is None and AUTH_AVAILABLE and request.headers.get('Authorization'):
+        return jsonify({'success': False, 'error': 'Token is invalid'}), 401
     
     # Get farmer context for personalized responses
     farmer_context = {
@@ -143,6 +108,9 @@ def chat():
                     'response': ai_response['response'],
                     'language': language,
                     'ai_powered': ai_response.get('ai_powered', True),
+                    'answered_from': ai_response.get('answered_from', 'llm'),
+                    'intent': ai_response.get('intent'),
+                    'sources': ai_response.get('sources', []),
                     'conversation_turn': ai_response.get('conversation_turn', 1),
                     'timestamp': str(datetime.now())
                 }), 200
@@ -151,6 +119,8 @@ def chat():
     
     # Fallback to rule-based response
     response = get_chatbot_response(message, language)
+    if conversation_store:
+        conversation_store.append(user_id, message, response, language)
     
     return jsonify({
         'success': True,
@@ -162,6 +132,32 @@ def chat():
         'timestamp': str(datetime.now())
     }), 200
 
+@chatbot_bp.route('/history/<user_id>', methods=['GET'])
+@token_required
+def get_history(current_user, user_id):
+    """
+    Paginated chat history of the signed-in user, newest first
+    """
+    if current_user is None or str(current_user.id) != user_id:
+        return jsonify({'success': False, 'error': 'Not allowed to read this chat history'}), 403
+    if not conversation_store:
+        return jsonify({'success': False, 'error': 'Chat history not available'}), 503
+    
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    
+    try:
+        history = conversation_store.history(user_id, page, per_page)
+    except Exception as e:
+        print(f"Chat history error: {e}")
+        return jsonify({'success': False, 'error': 'Could not load chat history'}), 500
+    
+    return jsonify({
+        'success': True,
+        'user_id': user_id,
+        **history
+    }), 200
+
 @chatbot_bp.route('/topics', methods=['GET'])
 def get_topics():
     """
@@ -0,0 +1,304 @@
+# Conversation Memory Store for AgroMitra
+# Bounded, shared chat memory: LRU over users, a ring buffer of turns per user,
+# backed by the chat_history table with write-behind batched inserts
+
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from ai_config import AI_CONFIG
+
+CHAT_HISTORY_INDEX = 'ix_chat_history_user_created'
+
+
+class _Conversation:
+    """Recent turns for one user plus when they were last read from the database"""
+
+    def __init__(self, max_turns: int):
+        self.turns = deque(maxlen=max_turns)
+        self.loaded_at = 0.0
+
+
+class ConversationStore:
+    """
+    Process-wide conversation memory.
+
+    RAM is bounded by max_users x max_turns. Turns for registered (numeric)
+    users are queued and bulk-inserted into chat_history: by the request that
+    fills the queue to flush_size, otherwise by a daemon thread every
+    flush_interval seconds, and once more when the worker exits. Entries
+    older than refresh_seconds are re-read with one indexed query (merged
+    with the turns still queued), so turns written by other gunicorn workers
+    become visible without the read waiting on a flush. Callers without
+    a registered id (anonymous chat) are neither remembered nor replayed, so
+    one caller's turns can never reach another's prompt.
+    """
+
+    def __init__(self, max_users: int = 1000, max_turns: int = 10, refresh_seconds: float = 30.0,
+                 flush_size: int = 20, flush_interval: float = 5.0):
+        self.max_users = max_users
+        self.max_turns = max_turns
+        self.refresh_seconds = refresh_seconds
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._users = OrderedDict()
+        self._pending = []
+        self._flushing = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._app = None
+        self._index_checked = False
+        self._flusher = None
+        self._stopping = threading.Event()
+        self.stats = {'flushes': 0, 'rows_written': 0, 'failed_flushes': 0}
+
+    @staticmethod
+    def _persistent_id(user_id) -> Optional[int]:
+        """chat_history.user_id references users.id, so only numeric ids are stored"""
+        user_id = str(user_id)
+        return int(user_id) if user_id.isdigit() else None
+
+    def get(self, user_id) -> List[Dict]:
+        """Return the user's recent turns, oldest first"""
+        if user_id is None or self._persistent_id(user_id) is None:
+            return []
+        key = str(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(key)
+            if entry is not None:
+                self._users.move_to_end(key)
+                if now - entry.loaded_at < self.refresh_seconds:
+                    return list(entry.turns)
+
+        rows = self._load(user_id)
+        with self._lock:
+            entry = self._users.get(key)
+            if entry is None:
+                entry = self._remember(key)
+            if rows is not None:
+                # The database has everything but our queued turns; a batch
+                # that was being flushed during the read may be in either
+                stored = {(row['timestamp'], row['user']) for row in rows}
+                entry.turns.clear()
+                entry.turns.extend(rows)
+                entry.turns.extend(turn for turn in self._pending_turns(user_id)
+                                   if (turn['timestamp'], turn['user']) not in stored)
+            entry.loaded_at = now
+            return list(entry.turns)
+
+    def append(self, user_id, message: str, response: str, language: str = 'en'):
+        """Record one turn in memory and queue it for the database"""
+        persistent_id = self._persistent_id(user_id) if user_id is not None else None
+        if persistent_id is None:
+            return
+        created_at = datetime.utcnow()
+        self._capture_app()
+        turn = {'user': message, 'bot': response, 'timestamp': created_at.isoformat()}
+        with self._lock:
+            key = str(user_id)
+            entry = self._users.get(key)
+            if entry is None:
+                entry = self._remember(key)
+                # Nothing loaded yet: force a database read on next get()
+                entry.loaded_at = 0.0
+            else:
+                self._users.move_to_end(key)
+            entry.turns.append(turn)
+            self._pending.append({
+                'user_id': persistent_id,
+                'message': message,
+                'response': response,
+                'language': language,
+                'created_at': created_at
+            })
+            self._start_flusher()
+            # Time-based flushes are the flusher thread's job
+            due = len(self._pending) >= self.flush_size
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        """Bulk-insert all pending turns; returns the number of rows written"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+                self._flushing = rows
+                self._last_flush = time.monotonic()
+            if not rows:
+                return 0
+            try:
+                with self._app_context():
+                    db, table = self._db_table()
+                    db.session.execute(table.insert(), rows)
+                    db.session.commit()
+                with self._lock:
+                    self._flushing = []
+                    self.stats['flushes'] += 1
+                    self.stats['rows_written'] += len(rows)
+                return len(rows)
+            except Exception as e:
+                logging.error(f"Chat history flush failed, keeping {len(rows)} turns queued: {e}")
+                with self._lock:
+                    self._flushing = []
+                    self.stats['failed_flushes'] += 1
+                    # Bound the backlog if the database stays unavailable
+                    self._pending = (rows + self._pending)[-self.flush_size * 50:]
+                return 0
+
+    def history(self, user_id, page: int = 1, per_page: int = 20) -> Dict:
+        """
+        One page of a registered user's stored turns, newest first. Pending
+        turns are flushed first so the page includes the latest messages.
+        """
+        page, per_page = max(1, page), max(1, per_page)
+        persistent_id = self._persistent_id(user_id) if user_id is not None else None
+        if persistent_id is None:
+            return {'turns': [], 'page': page, 'per_page': per_page, 'total': 0, 'has_more': False,
+                    'persisted': False}
+
+        self.flush()
+        with self._app_context():
+            db, table = self._db_table()
+            # Both queries are served by the (user_id, created_at) index
+            total = db.session.execute(
+                db.select(db.func.count()).select_from(table).where(table.c.user_id == persistent_id)
+            ).scalar()
+            rows = db.session.execute(
+                table.select()
+                .where(table.c.user_id == persistent_id)
+                .order_by(table.c.created_at.desc(), table.c.id.desc())
+                .limit(per_page)
+                .offset((page - 1) * per_page)
+            ).mappings().all()
+        return {
+            'turns': [
+                {
+                    'id': row['id'],
+                    'message': row['message'],
+                    'response': row['response'],
+                    'language': row['language'],
+                    'created_at': row['created_at'].isoformat() if row['created_at'] else None
+                }
+                for row in rows
+            ],
+            'page': page, 'per_page': per_page, 'total': total,
+            'has_more': page * per_page < total, 'persisted': True
+        }
+
+    def _start_flusher(self):
+        """Start the background flush thread on the first queued turn (lock held)"""
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._flush_loop, name='chat-history-flusher', daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._stopping.wait(self.flush_interval):
+            with self._lock:
+                due = (self._pending
+                       and time.monotonic() - self._last_flush >= self.flush_interval)
+            if due:
+                self.flush()
+
+    def close(self):
+        """Stop the flush thread and write whatever is still queued"""
+        self._stopping.set()
+        written = self.flush()
+        if written:
+            logging.info(f"Flushed {written} chat turns on shutdown")
+
+    def _remember(self, key: str) -> _Conversation:
+        entry = _Conversation(self.max_turns)
+        self._users[key] = entry
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+        return entry
+
+    def _pending_turns(self, user_id) -> List[Dict]:
+        persistent_id = self._persistent_id(user_id)
+        return [
+            {'user': row['message'], 'bot': row['response'], 'timestamp': row['created_at'].isoformat()}
+            for row in self._flushing + self._pending if row['user_id'] == persistent_id
+        ]
+
+    def _load(self, user_id) -> Optional[List[Dict]]:
+        """Read the last max_turns turns in one query on (user_id, created_at)"""
+        persistent_id = self._persistent_id(user_id)
+        if persistent_id is None:
+            return None
+        try:
+            with self._app_context():
+                db, table = self._db_table()
+                query = (table.select()
+                         .where(table.c.user_id == persistent_id)
+                         .order_by(table.c.created_at.desc(), table.c.id.desc())
+                         .limit(self.max_turns))
+                rows = db.session.execute(query).mappings().all()
+        except Exception as e:
+            logging.warning(f"Chat history unavailable, using in-memory context: {e}")
+            return None
+        return [
+            {
+                'user': row['message'],
+                'bot': row['response'],
+                'timestamp': row['created_at'].isoformat() if row['created_at'] else None
+            }
+            for row in reversed(rows)
+        ]
+
+    def _capture_app(self):
+        from flask import current_app, has_app_context
+        if self._app is None and has_app_context():
+            self._app = current_app._get_current_object()
+
+    def _app_context(self):
+        """Remember the Flask app on first use so flushes also work off-request"""
+        from flask import current_app, has_app_context
+        if has_app_context():
+            self._app = current_app._get_current_object()
+        if self._app is None:
+            raise RuntimeError('No Flask application available for chat history')
+        return self._app.app_context()
+
+    def _db_table(self):
+        db = self._app.extensions['sqlalchemy']
+        table = db.metadata.tables['chat_history']
+        if not self._index_checked:
+            # Tables created before the index was declared on the model lack it
+            for index in table.indexes:
+                if index.name == CHAT_HISTORY_INDEX:
+                    index.create(bind=db.engine, checkfirst=True)
+            self._index_checked = True
+        return db, table
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                'users_in_memory': len(self._users),
+                'max_users': self.max_users,
+                'max_turns': self.max_turns,
+                'pending_writes': len(self._pending),
+                'flush_size': self.flush_size,
+                'flush_interval': self.flush_interval,
+                **self.stats
+            }
+
+
+_store_config = AI_CONFIG.get('conversation_store', {})
+
+# Shared per worker process
+conversation_store = ConversationStore(
+    max_users=_store_config.get('max_users', 1000),
+    max_turns=_store_config.get('max_turns', 10),
+    refresh_seconds=_store_config.get('refresh_seconds', 30),
+    flush_size=_store_config.get('flush_size', 20),
+    flush_interval=_store_config.get('flush_interval', 5)
+)
+
+# Gunicorn workers exit through sys.exit on graceful shutdown, which runs this
+atexit.register(conversation_store.close)
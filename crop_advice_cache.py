@@ -0,0 +1,185 @@
+# Crop Advice Cache for AgroMitra
+# Farmers in the same district, season and farm-size band get functionally
+# identical crop advice, so the profile is reduced to a coarse bucket and the
+# AI answer for that bucket is reused until its TTL expires
+
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from ai_config import AI_CONFIG
+from disease_warm_cache import parse_acres
+
+SEASON_ALIASES = {
+    'kharif': ['kharif', 'monsoon', 'rainy'],
+    'rabi': ['rabi', 'winter'],
+    'zaid': ['zaid', 'zayed', 'summer']
+}
+
+IRRIGATION_KEYWORDS = {
+    'micro': ['drip', 'sprinkler', 'micro'],
+    'rainfed': ['rainfed', 'rain-fed', 'rain fed', 'none', 'no irrigation', 'dry'],
+    'irrigated': ['canal', 'borewell', 'bore well', 'tubewell', 'tube well', 'well', 'pump',
+                  'river', 'tank', 'pond', 'flood', 'irrigated', 'yes', 'full', 'partial']
+}
+
+SOIL_KEYWORDS = {
+    'black': ['black', 'regur', 'cotton soil'],
+    'red': ['red'],
+    'laterite': ['laterite', 'lateritic'],
+    'alluvial': ['alluvial'],
+    'sandy': ['sand', 'desert', 'arid'],
+    'saline': ['saline', 'alkaline', 'sodic'],
+    'clay': ['clay'],
+    'loam': ['loam']
+}
+
+BUCKET_LABELS = {
+    'micro': 'Drip / sprinkler',
+    'rainfed': 'Rainfed',
+    'irrigated': 'Assured (canal / well)'
+}
+
+_UNKNOWN = ('', 'unknown', 'none', 'n/a', 'current', 'any')
+
+
+def keyword_bucket(value, keywords: Dict) -> str:
+    text = str(value or '').lower()
+    for bucket, words in keywords.items():
+        if any(word in text for word in words):
+            return bucket
+    return 'any'
+
+
+def normalise_place(value) -> str:
+    """'  Nashik District ' -> 'nashik'; 'any' when unknown"""
+    text = re.sub(r'\s+', ' ', str(value or '').strip().lower())
+    text = re.sub(r'\s+(district|dist\.?)$', '', text)
+    return text if text not in _UNKNOWN else 'any'
+
+
+def season_bucket(season, now: datetime = None) -> str:
+    """Canonical season; 'current' (or unknown) resolves from the calendar month"""
+    bucket = keyword_bucket(season, SEASON_ALIASES)
+    if bucket != 'any':
+        return bucket
+    month = (now or datetime.now()).month
+    if 6 <= month <= 10:
+        return 'kharif'
+    if month >= 11 or month <= 3:
+        return 'rabi'
+    return 'zaid'
+
+
+def farm_size_bucket(farm_size, edges) -> str:
+    """Band label such as '2.5-5' from ascending acre edges; 'any' when unknown"""
+    acres = parse_acres(farm_size)
+    if acres is None:
+        return 'any'
+    lower = 0
+    for edge in edges:
+        if acres <= edge:
+            return f"{lower:g}-{edge:g}"
+        lower = edge
+    return f"{lower:g}+"
+
+
+class CropAdviceCache:
+    """
+    In-process LRU of AI crop advice keyed by the bucketed profile. Entries
+    expire after ttl_seconds; which profile fields form the key, and the
+    farm-size band edges, come from AI_CONFIG['crop_advice_cache'].
+    """
+
+    def __init__(self, settings: Dict = None):
+        self.settings = settings or AI_CONFIG.get('crop_advice_cache', {})
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'stores': 0}
+
+    def bucket(self, farmer_profile: Dict, season: str, location: Dict) -> Optional[Dict]:
+        """The cache bucket for a request, or None when caching is disabled"""
+        if not self.settings.get('enabled', False):
+            return None
+        values = {
+            'state': normalise_place(location.get('state')),
+            'district': normalise_place(location.get('district')),
+            'season': season_bucket(season),
+            'farm_size': farm_size_bucket(farmer_profile.get('farm_size'),
+                                          self.settings.get('farm_size_edges', [2.5, 5, 10, 25])),
+            'irrigation': keyword_bucket(farmer_profile.get('irrigation_access'), IRRIGATION_KEYWORDS),
+            'soil_type': keyword_bucket(farmer_profile.get('soil_type'), SOIL_KEYWORDS)
+        }
+        fields = self.settings.get('key_fields', list(values))
+        return {field: values[field] for field in fields if field in values}
+
+    @staticmethod
+    def key(bucket: Dict) -> str:
+        return json.dumps(bucket, sort_keys=True)
+
+    def get(self, bucket: Dict) -> Optional[Dict]:
+        key = self.key(bucket)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            if now - entry['stored_at'] > self.settings.get('ttl_seconds', 21600):
+                del self._entries[key]
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry['advice']
+
+    def put(self, bucket: Dict, advice: Dict):
+        with self._lock:
+            self._entries[self.key(bucket)] = {'advice': advice, 'stored_at': time.time()}
+            self._entries.move_to_end(self.key(bucket))
+            self.stats['stores'] += 1
+            while len(self._entries) > self.settings.get('max_entries', 5000):
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def status(self) -> Dict:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                'enabled': self.settings.get('enabled', False),
+                'entries': len(self._entries),
+                'key_fields': self.settings.get('key_fields'),
+                'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else None,
+                **self.stats
+            }
+
+
+def representative_request(bucket: Dict) -> Tuple[Dict, str, Dict]:
+    """
+    Profile, season and location describing the whole bucket, used for the
+    LLM call so the cached answer fits every farmer who maps to it
+    """
+    def known(value, label=None):
+        return 'Unknown' if value == 'any' else (label or value)
+
+    farm_size = bucket.get('farm_size', 'any')
+    farmer_profile = {
+        'farm_size': known(farm_size, f"{farm_size} acres"),
+        'soil_type': known(bucket.get('soil_type', 'any')).capitalize(),
+        'irrigation_access': known(bucket.get('irrigation', 'any'),
+                                   BUCKET_LABELS.get(bucket.get('irrigation')))
+    }
+    location = {
+        'state': known(bucket.get('state', 'any')).title(),
+        'district': known(bucket.get('district', 'any')).title()
+    }
+    return farmer_profile, bucket.get('season', 'current'), location
+
+
+# Shared per worker process
+crop_advice_cache = CropAdviceCache()
@@ -0,0 +1,264 @@
+# Crop Suitability Scoring for AgroMitra
+# Rule-based crop recommendations without the LLM: crops x attributes live in
+# NumPy matrices, a farmer profile becomes feature vectors, and every crop is
+# scored and ranked in one vectorised pass (many profiles at once for bulk use)
+
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from crop_advice_cache import IRRIGATION_KEYWORDS, SOIL_KEYWORDS, keyword_bucket, season_bucket
+from disease_warm_cache import parse_acres
+
+SEASONS = ['kharif', 'rabi', 'zaid']
+SOILS = list(SOIL_KEYWORDS)
+
+# Agro-climatic regions (simplified from the Planning Commission zones)
+ZONES = {
+    'north_plains': ['punjab', 'haryana', 'delhi', 'uttar pradesh', 'bihar', 'west bengal'],
+    'arid_west': ['rajasthan', 'gujarat'],
+    'central': ['madhya pradesh', 'chhattisgarh', 'maharashtra'],
+    'deccan_south': ['karnataka', 'telangana', 'andhra pradesh', 'tamil nadu'],
+    'humid_south': ['kerala', 'goa', 'puducherry'],
+    'east_northeast': ['odisha', 'jharkhand', 'assam', 'meghalaya', 'tripura', 'manipur',
+                       'mizoram', 'nagaland', 'arunachal pradesh', 'sikkim'],
+    'himalayan': ['himachal pradesh', 'uttarakhand', 'jammu', 'kashmir', 'ladakh']
+}
+ZONE_NAMES = list(ZONES)
+
+ZONE_LABELS = {
+    'north_plains': 'the northern plains',
+    'arid_west': 'the arid west',
+    'central': 'central India',
+    'deccan_south': 'the Deccan and south',
+    'humid_south': 'the humid south-west coast',
+    'east_northeast': 'eastern and north-eastern India',
+    'himalayan': 'the Himalayan states'
+}
+
+# name: (seasons, zones, soils, water need, capital need, value per acre, risk), levels 1-3
+CROP_ATTRIBUTES = {
+    'Rice': (['kharif'], ['north_plains', 'deccan_south', 'humid_south', 'east_northeast'],
+             ['alluvial', 'clay', 'loam', 'laterite'], 3, 2, 2, 1),
+    'Wheat': (['rabi'], ['north_plains', 'central', 'arid_west', 'himalayan'],
+              ['alluvial', 'loam', 'black', 'clay'], 2, 2, 2, 1),
+    'Maize': (['kharif', 'rabi'], ['north_plains', 'central', 'deccan_south', 'himalayan', 'east_northeast'],
+              ['loam', 'alluvial', 'red', 'sandy'], 2, 2, 2, 2),
+    'Cotton': (['kharif'], ['central', 'arid_west', 'deccan_south', 'north_plains'],
+               ['black', 'alluvial'], 2, 3, 3, 3),
+    'Sugarcane': (['kharif', 'zaid'], ['north_plains', 'central', 'deccan_south'],
+                  ['alluvial', 'black', 'loam'], 3, 3, 3, 2),
+    'Soybean': (['kharif'], ['central', 'arid_west'], ['black', 'loam'], 2, 2, 2, 2),
+    'Groundnut': (['kharif', 'zaid'], ['arid_west', 'deccan_south', 'central'],
+                  ['sandy', 'red', 'loam'], 1, 2, 2, 2),
+    'Bajra': (['kharif'], ['arid_west', 'north_plains'], ['sandy', 'loam', 'saline'], 1, 1, 1, 1),
+    'Jowar': (['kharif', 'rabi'], ['central', 'deccan_south', 'arid_west'], ['black', 'red', 'loam'], 1, 1, 1, 1),
+    'Ragi': (['kharif'], ['deccan_south', 'himalayan'], ['red', 'laterite', 'loam'], 1, 1, 1, 1),
+    'Pigeon pea (Tur)': (['kharif'], ['central', 'deccan_south', 'north_plains'],
+                         ['black', 'red', 'loam'], 1, 1, 2, 2),
+    'Green gram (Moong)': (['kharif', 'zaid'], ['arid_west', 'central', 'deccan_south', 'north_plains'],
+                           ['sandy', 'loam', 'red'], 1, 1, 2, 1),
+    'Gram': (['rabi'], ['central', 'north_plains', 'arid_west'], ['black', 'loam', 'sandy'], 1, 1, 2, 1),
+    'Mustard': (['rabi'], ['north_plains', 'arid_west', 'east_northeast'],
+                ['alluvial', 'sandy', 'loam'], 1, 1, 2, 1),
+    'Barley': (['rabi'], ['arid_west', 'north_plains', 'himalayan'], ['sandy', 'loam', 'saline'], 1, 1, 1, 1),
+    'Peas': (['rabi'], ['north_plains', 'himalayan', 'central'], ['loam', 'alluvial'], 2, 2, 2, 2),
+    'Onion': (['rabi', 'kharif'], ['central', 'deccan_south', 'arid_west'], ['loam', 'black', 'red'], 2, 2, 3, 3),
+    'Potato': (['rabi'], ['north_plains', 'east_northeast', 'himalayan'], ['loam', 'alluvial', 'sandy'], 2, 3, 3, 2),
+    'Tomato': (['rabi', 'zaid', 'kharif'], ['deccan_south', 'central', 'north_plains'],
+               ['loam', 'red', 'black'], 2, 2, 3, 3),
+    'Watermelon': (['zaid'], ['arid_west', 'north_plains', 'deccan_south'], ['sandy', 'loam'], 2, 2, 3, 2),
+    'Cucumber': (['zaid'], ['north_plains', 'central', 'deccan_south'], ['loam', 'sandy'], 2, 1, 2, 2),
+    'Fodder crops': (['zaid', 'rabi'], ['north_plains', 'arid_west', 'central'], ['loam', 'alluvial', 'sandy'], 2, 1, 1, 1),
+    'Coconut': (['kharif', 'rabi', 'zaid'], ['humid_south', 'deccan_south'], ['laterite', 'sandy', 'loam'], 2, 3, 2, 1),
+    'Turmeric': (['kharif'], ['deccan_south', 'humid_south', 'east_northeast'], ['loam', 'red', 'laterite'], 2, 2, 3, 2),
+    'Jute': (['kharif'], ['east_northeast', 'north_plains'], ['alluvial', 'loam'], 3, 1, 2, 2),
+    'Marigold (flowers)': (['kharif', 'rabi'], ['north_plains', 'central', 'deccan_south', 'east_northeast'],
+                           ['loam', 'red', 'alluvial'], 2, 1, 3, 2)
+}
+
+CROP_NAMES = list(CROP_ATTRIBUTES)
+
+
+def _membership(index: int, names: List[str]) -> np.ndarray:
+    """Crops x names 0/1 matrix from one attribute column"""
+    matrix = np.zeros((len(CROP_NAMES), len(names)))
+    for row, attributes in enumerate(CROP_ATTRIBUTES.values()):
+        for name in attributes[index]:
+            matrix[row, names.index(name)] = 1.0
+    return matrix
+
+
+SEASON_MATRIX = _membership(0, SEASONS)
+ZONE_MATRIX = _membership(1, ZONE_NAMES)
+SOIL_MATRIX = _membership(2, SOILS)
+WATER_NEED, CAPITAL_NEED, VALUE, RISK = (
+    np.array([attributes[column] for attributes in CROP_ATTRIBUTES.values()], dtype=float)
+    for column in range(3, 7)
+)
+
+WEIGHTS = {
+    'season': 4.0,      # Out-of-season crops should almost never make the list
+    'zone': 2.0,
+    'soil': 1.5,
+    'water_gap': 1.5,   # Per level of water need above what the farm can supply
+    'capital_gap': 1.0, # Per level of input cost above the budget
+    'value': 0.6,       # Per value level, scaled by how small the farm is
+    'risk': 0.5         # Per risk level, scaled by inexperience
+}
+
+WATER_SUPPLY = {'rainfed': 1.0, 'micro': 2.5, 'irrigated': 3.0, 'any': 2.0}
+LEVEL_LABELS = {1: 'Low', 2: 'Medium', 3: 'High'}
+
+_AMOUNT = re.compile(r'(\d+(?:\.\d+)?)\s*(k|lakh|lac|l\b)?')
+
+
+def zone_for_state(state) -> str:
+    text = str(state or '').lower()
+    for zone, states in ZONES.items():
+        if any(name in text for name in states):
+            return zone
+    return 'any'
+
+
+def capital_level(budget) -> float:
+    """Budget text or rupee amount -> capacity level 1-3 (2 when unknown)"""
+    text = str(budget or '').lower().replace(',', '')
+    match = _AMOUNT.search(text)
+    if match:
+        amount = float(match.group(1))
+        if match.group(2) == 'k':
+            amount *= 1000
+        elif match.group(2):
+            amount *= 100000
+        return 1.0 if amount < 25000 else 2.0 if amount < 100000 else 3.0
+    for level, words in ((1.0, ['low', 'limited', 'small']), (3.0, ['high', 'large'])):
+        if any(word in text for word in words):
+            return level
+    return 2.0
+
+
+def _experience_factor(experience) -> float:
+    """Weight on crop risk: 1 for beginners, 0 for experienced farmers"""
+    text = str(experience or '').lower()
+    match = re.search(r'\d+', text)
+    if match:
+        return max(0.0, 1 - int(match.group()) / 10)
+    if any(word in text for word in ['beginner', 'new', 'first']):
+        return 1.0
+    if any(word in text for word in ['expert', 'experienced', 'advanced']):
+        return 0.0
+    return 0.5
+
+
+def profile_features(farmer_profile: Dict, season: str, location: Dict) -> Dict:
+    """Per-profile inputs of the scoring matrices"""
+    acres = parse_acres(farmer_profile.get('farm_size'))
+    farm_text = str(farmer_profile.get('farm_size', '')).lower()
+    if acres is None:
+        smallness = 1.0 if 'small' in farm_text or 'marginal' in farm_text else 0.3
+    else:
+        smallness = float(np.clip((10 - acres) / 8, 0, 1))  # 1 at <= 2 acres, 0 from 10 acres
+    return {
+        'season': season_bucket(season),
+        'zone': zone_for_state(location.get('state')),
+        'soil': keyword_bucket(farmer_profile.get('soil_type'), SOIL_KEYWORDS),
+        'water': WATER_SUPPLY[keyword_bucket(farmer_profile.get('irrigation_access'), IRRIGATION_KEYWORDS)],
+        'capital': capital_level(farmer_profile.get('budget')),
+        'smallness': smallness,
+        'inexperience': _experience_factor(farmer_profile.get('experience'))
+    }
+
+
+def _one_hot(values: List[str], names: List[str]) -> np.ndarray:
+    matrix = np.zeros((len(values), len(names)))
+    for row, value in enumerate(values):
+        if value in names:
+            matrix[row, names.index(value)] = 1.0
+    return matrix
+
+
+def score_components(features: List[Dict]) -> Dict[str, np.ndarray]:
+    """Profiles x crops contribution of each scoring term"""
+    def column(name):
+        return np.array([f[name] for f in features], dtype=float)[:, None]
+
+    return {
+        'season': WEIGHTS['season'] * (_one_hot([f['season'] for f in features], SEASONS) @ SEASON_MATRIX.T),
+        'zone': WEIGHTS['zone'] * (_one_hot([f['zone'] for f in features], ZONE_NAMES) @ ZONE_MATRIX.T),
+        'soil': WEIGHTS['soil'] * (_one_hot([f['soil'] for f in features], SOILS) @ SOIL_MATRIX.T),
+        'water_gap': -WEIGHTS['water_gap'] * np.maximum(WATER_NEED - column('water'), 0),
+        'capital_gap': -WEIGHTS['capital_gap'] * np.maximum(CAPITAL_NEED - column('capital'), 0),
+        'value': WEIGHTS['value'] * column('smallness') * VALUE,
+        'risk': -WEIGHTS['risk'] * column('inexperience') * RISK
+    }
+
+
+def score_profiles(features: List[Dict]) -> np.ndarray:
+    """Profiles x crops total suitability scores"""
+    return sum(score_components(features).values())
+
+
+def _reasons(crop_index: int, feature: Dict, components: Dict, row: int) -> List[str]:
+    reasons = []
+    if components['season'][row, crop_index] > 0:
+        reasons.append(f"Suited to the {feature['season']} season")
+    if components['zone'][row, crop_index] > 0:
+        reasons.append(f"Widely grown in {ZONE_LABELS[feature['zone']]}")
+    if components['soil'][row, crop_index] > 0:
+        reasons.append(f"Does well on {feature['soil']} soil")
+    if components['water_gap'][row, crop_index] < 0:
+        reasons.append("Needs more water than your irrigation provides")
+    if components['capital_gap'][row, crop_index] < 0:
+        reasons.append("Input cost is high for your budget")
+    if VALUE[crop_index] >= 3 and feature['smallness'] >= 0.5:
+        reasons.append("High value per acre for a small farm")
+    # 0.5 is the no-answer default, so only a stated lack of experience warns
+    if RISK[crop_index] >= 3 and feature['inexperience'] > 0.5:
+        reasons.append("Price and pest risk is high for a new grower")
+    return reasons
+
+
+def _recommendation(scores: np.ndarray, components: Dict, row: int, feature: Dict, top_n: int) -> Dict:
+    ranked = np.argsort(-scores[row])[:top_n]
+    crop_scores = [{
+        'crop': CROP_NAMES[index],
+        'score': round(float(scores[row, index]), 2),
+        'reasons': _reasons(index, feature, components, row)
+    } for index in ranked]
+
+    def level(values):
+        return LEVEL_LABELS[int(round(float(values[ranked].mean())))]
+
+    reasoning = [f"{feature['season'].capitalize()} season"]
+    if feature['zone'] != 'any':
+        reasoning.append(f"Region: {ZONE_LABELS[feature['zone']]}")
+    if feature['smallness'] >= 0.5:
+        reasoning.append('Small farm: high-value crops ranked higher')
+    if feature['water'] <= 1.0:
+        reasoning.append('Rainfed: low water-need crops ranked higher')
+
+    return {
+        'top_crops': [entry['crop'] for entry in crop_scores],
+        'crop_scores': crop_scores,
+        'reasoning': reasoning,
+        'market_potential': level(VALUE),
+        'investment_required': level(CAPITAL_NEED),
+        'risk_level': level(RISK),
+        'source': 'suitability_model'
+    }
+
+
+def recommend_crops_batch(requests: List[Tuple[Dict, str, Dict]], top_n: int = 5) -> List[Dict]:
+    """Rank crops for many (farmer_profile, season, location) requests in one pass"""
+    if not requests:
+        return []
+    features = [profile_features(*request) for request in requests]
+    components = score_components(features)
+    scores = sum(components.values())
+    return [_recommendation(scores, components, row, feature, top_n) for row, feature in enumerate(features)]
+
+
+def recommend_crops(farmer_profile: Dict, season: str, location: Dict, top_n: int = 5) -> Dict:
+    return recommend_crops_batch([(farmer_profile, season, location)], top_n)[0]
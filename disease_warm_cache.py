@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Disease Recommendation Warm Cache for AgroMitra
+Precomputes AI-enhanced recommendations for every disease class x language x
+coarse context bucket (climate, farm-size band) so /detect can answer from
+memory and only call the LLM for contexts the cache does not cover.
+
+Build or extend the cache (safe to re-run, finished entries are kept):
+    python disease_warm_cache.py --concurrency 4
+    python disease_warm_cache.py --languages en,hi --provider gemini
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional
+
+from ai_config import AI_CONFIG
+from disease_info import CLASS_NAMES, resolve_disease_info
+
+CLIMATE_KEYWORDS = {
+    'tropical': ['tropical', 'humid', 'coastal', 'monsoon', 'wet'],
+    'arid': ['arid', 'dry', 'desert', 'semi-arid', 'semiarid'],
+    'temperate': ['temperate', 'hill', 'mountain', 'cold', 'highland'],
+    'subtropical': ['subtropical', 'sub-tropical', 'plains']
+}
+
+CLIMATE_LABELS = {
+    'tropical': 'Tropical / humid',
+    'arid': 'Arid / semi-arid',
+    'temperate': 'Temperate / hill',
+    'subtropical': 'Subtropical plains'
+}
+
+FARM_SIZE_LABELS = {
+    'marginal': 'Marginal (under 2.5 acres)',
+    'small': 'Small (2.5-5 acres)',
+    'medium': 'Medium (5-25 acres)',
+    'large': 'Large (over 25 acres)'
+}
+
+_NUMBER = re.compile(r'\d+(?:\.\d+)?')
+_EMPTY = (None, '', 'unknown', 'none', 'n/a')
+
+
+def climate_bucket(climate) -> str:
+    """Map free-text climate to a coarse bucket; 'any' when unknown"""
+    text = str(climate or '').lower()
+    # Check 'subtropical' before 'tropical', which it contains
+    for bucket in ('subtropical', 'arid', 'temperate', 'tropical'):
+        if any(word in text for word in CLIMATE_KEYWORDS[bucket]):
+            return bucket
+    return 'any'
+
+
+def parse_acres(farm_size) -> Optional[float]:
+    """Farm size in acres from a number or text like '3 ha'; None when absent"""
+    text = str(farm_size or '').lower()
+    match = _NUMBER.search(text)
+    if not match:
+        return None
+    acres = float(match.group())
+    if 'hectare' in text or re.search(r'\bha\b', text):
+        acres *= 2.47
+    return acres
+
+
+def farm_size_band(farm_size) -> str:
+    """Map a farm size in acres (number or text) to a band; 'any' when unknown"""
+    acres = parse_acres(farm_size)
+    if acres is None:
+        text = str(farm_size or '').lower()
+        for band in FARM_SIZE_LABELS:
+            if band in text:
+                return band
+        return 'any'
+    if acres <= 2.5:
+        return 'marginal'
+    if acres <= 5:
+        return 'small'
+    if acres <= 25:
+        return 'medium'
+    return 'large'
+
+
+def bucket_context(farmer_context: Optional[Dict]) -> Optional[Dict]:
+    """
+    Reduce a farmer context to its cache bucket, or None if it carries
+    details (e.g. previous treatments) that the cache cannot represent
+    """
+    context = farmer_context or {}
+    if str(context.get('treatment_history', '')).strip().lower() not in _EMPTY:
+        return None
+    language = context.get('language') or 'en'
+    settings = AI_CONFIG.get('warm_cache', {})
+    if language not in settings.get('languages', ['en']):
+        return None
+    return {
+        'language': language,
+        'climate': climate_bucket(context.get('climate')),
+        'farm_size': farm_size_band(context.get('farm_size'))
+    }
+
+
+def cache_key(predicted_class: str, bucket: Dict) -> str:
+    return f"{predicted_class}|{bucket['language']}|{bucket['climate']}|{bucket['farm_size']}"
+
+
+def prompt_fingerprint() -> str:
+    """Changes whenever the disease prompt instructions change"""
+    from ai_integration import DISEASE_INSTRUCTIONS
+    return hashlib.sha256(DISEASE_INSTRUCTIONS.encode('utf-8')).hexdigest()[:12]
+
+
+def cache_path(settings: Dict = None) -> str:
+    settings = settings or AI_CONFIG.get('warm_cache', {})
+    return os.path.join(settings.get('directory', 'cache'),
+                        f"disease_recommendations.v{settings.get('version', 1)}.json")
+
+
+class DiseaseWarmCache:
+    """
+    Read side used on the request path: the versioned JSON file is loaded
+    into a dict once (and again only when the file changes), so lookups are
+    a single dictionary access.
+    """
+
+    def __init__(self, settings: Dict = None):
+        self.settings = settings or AI_CONFIG.get('warm_cache', {})
+        self._entries = {}
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'uncacheable': 0}
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.settings.get('reload_check_seconds', 60):
+            return
+        with self._lock:
+            self._checked_at = now
+            path = cache_path(self.settings)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                self._entries, self._mtime = {}, None
+                return
+            if mtime == self._mtime:
+                return
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.error(f"Disease warm cache unreadable: {e}")
+                return
+            if data.get('version') != self.settings.get('version', 1):
+                logging.warning("Disease warm cache version mismatch, ignoring file")
+                self._entries = {}
+            else:
+                self._entries = data.get('entries', {})
+            self._mtime = mtime
+
+    def lookup(self, predicted_class: str, farmer_context: Optional[Dict]) -> Optional[Dict]:
+        if not self.settings.get('enabled', False):
+            return None
+        bucket = bucket_context(farmer_context)
+        if bucket is None:
+            self.stats['uncacheable'] += 1
+            return None
+        self._refresh()
+        entry = self._entries.get(cache_key(predicted_class, bucket))
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return {**entry, 'cache': 'warm', 'cache_bucket': bucket}
+
+    def status(self) -> Dict:
+        return {'entries': len(self._entries), 'version': self.settings.get('version', 1), **self.stats}
+
+
+# Shared per worker process
+disease_warm_cache = DiseaseWarmCache()
+
+
+def build_cache(languages, provider=None, concurrency=4, limit=None):
+    """Generate every missing class x language x bucket entry and save atomically"""
+    from ai_integration import AIRecommendationEngine
+
+    settings = AI_CONFIG.get('warm_cache', {})
+    path = cache_path(settings)
+    fingerprint = prompt_fingerprint()
+
+    entries = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            existing = json.load(f)
+        if existing.get('prompt_fingerprint') == fingerprint:
+            entries = existing.get('entries', {})
+        else:
+            print("Prompt instructions changed since the last build, regenerating everything")
+
+    jobs = []
+    for predicted_class in CLASS_NAMES:
+        for language in languages:
+            for climate in settings.get('climates', ['any']):
+                for farm_size in settings.get('farm_size_bands', ['any']):
+                    bucket = {'language': language, 'climate': climate, 'farm_size': farm_size}
+                    if cache_key(predicted_class, bucket) not in entries:
+                        jobs.append((predicted_class, bucket))
+    if limit:
+        jobs = jobs[:limit]
+    print(f"{len(entries)} entries cached, {len(jobs)} to generate -> {path}")
+
+    lock = threading.Lock()
+    failures = []
+
+    def generate(job):
+        predicted_class, bucket = job
+        info = resolve_disease_info(predicted_class)
+        disease_result = {
+            'predicted_class': predicted_class,
+            'disease_name': info['disease'],
+            'severity': info['severity']
+        }
+        farmer_context = {'language': bucket['language']}
+        if bucket['climate'] != 'any':
+            farmer_context['climate'] = CLIMATE_LABELS[bucket['climate']]
+        if bucket['farm_size'] != 'any':
+            farmer_context['farm_size'] = FARM_SIZE_LABELS[bucket['farm_size']]
+        engine = AIRecommendationEngine(provider=provider or AI_CONFIG['default_provider'])
+        result = engine.generate_disease_recommendations(disease_result, farmer_context)
+        with lock:
+            if result.get('source') == 'fallback_system':
+                failures.append(cache_key(predicted_class, bucket))
+            else:
+                result.pop('coalesced', None)
+                entries[cache_key(predicted_class, bucket)] = result
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(generate, jobs))
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    payload = {
+        'version': settings.get('version', 1),
+        'prompt_fingerprint': fingerprint,
+        'generated_at': datetime.now().isoformat(),
+        'entries': entries
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    print(f"Generated {len(jobs) - len(failures)} entries in {time.time() - start:.1f}s, "
+          f"{len(failures)} failed (re-run to retry); total {len(entries)}")
+
+
+def main():
+    settings = AI_CONFIG.get('warm_cache', {})
+    parser = argparse.ArgumentParser(description='Precompute multilingual disease recommendations')
+    parser.add_argument('--languages', default=','.join(settings.get('languages', ['en'])))
+    parser.add_argument('--provider', help='AI provider to use (default: AI_CONFIG default_provider)')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--limit', type=int, help='Generate at most this many entries (for trial runs)')
+    args = parser.parse_args()
+    build_cache([lang.strip() for lang in args.languages.split(',')], args.provider,
+                args.concurrency, args.limit)
+
+
+if __name__ == '__main__':
+    main()
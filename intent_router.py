@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Chat Intent Router for AgroMitra
+A hashed n-gram linear classifier (multinomial logistic regression) decides
+whether a chat message can be answered locally - greeting, reference
+knowledge, government schemes, market prices - or needs the LLM. Scoring a
+message takes well under a millisecond.
+
+The model is trained at startup from the seed examples below unless a
+trained weight file exists. Train on labelled chat logs (JSON lines with
+"message" and "intent", or CSV with those columns):
+    python intent_router.py --data chat_logs_labelled.jsonl
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import random
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ai_config import AI_CONFIG
+from knowledge_index import TOKEN_PATTERN, answer_from_knowledge, expand_query, tokenize
+
+INTENTS = ['greeting', 'knowledge', 'scheme', 'price', 'generate']
+
+# Intents whose questions are answered without the LLM
+LOCAL_INTENTS = ('greeting', 'knowledge', 'scheme', 'price')
+
+SEED_EXAMPLES = [
+    # Greetings and small talk
+    ('hello', 'greeting'), ('hi', 'greeting'), ('hey there', 'greeting'), ('good morning', 'greeting'),
+    ('good evening', 'greeting'), ('namaste', 'greeting'), ('namaskar ji', 'greeting'),
+    ('vanakkam', 'greeting'), ('नमस्ते', 'greeting'), ('नमस्कार भाई', 'greeting'), ('வணக்கம்', 'greeting'),
+    ('hello how are you', 'greeting'), ('hi agribot', 'greeting'), ('thanks', 'greeting'),
+    ('thank you so much', 'greeting'), ('dhanyavad', 'greeting'), ('धन्यवाद', 'greeting'),
+    ('நன்றி', 'greeting'), ('ok thanks bye', 'greeting'), ('bye', 'greeting'),
+    # Answerable from reference data (diseases, calendar, knowledge base)
+    ('when to sow rabi crops', 'knowledge'), ('what is the kharif season', 'knowledge'),
+    ('how to treat tomato late blight', 'knowledge'), ('symptoms of potato early blight', 'knowledge'),
+    ('how to prevent apple scab', 'knowledge'), ('what causes common rust in corn', 'knowledge'),
+    ('benefits of drip irrigation', 'knowledge'), ('how to make vermicompost', 'knowledge'),
+    ('what is organic farming', 'knowledge'), ('which crops grow in zaid season', 'knowledge'),
+    ('गेहूं की बुवाई कब करें', 'knowledge'), ('टमाटर में झुलसा रोग का इलाज', 'knowledge'),
+    ('सिंचाई कैसे करें', 'knowledge'), ('जैविक खेती क्या है', 'knowledge'),
+    ('தக்காளி நோய்க்கு சிகிச்சை', 'knowledge'), ('நெல் எப்போது விதைக்க வேண்டும்', 'knowledge'),
+    ('tomato blight treatment', 'knowledge'), ('list of rabi crops', 'knowledge'),
+    ('grape black rot prevention', 'knowledge'), ('how to use certified seeds', 'knowledge'),
+    ('when should i sow wheat', 'knowledge'), ('best time to plant paddy', 'knowledge'),
+    # Government schemes
+    ('what is pm kisan', 'scheme'), ('how to apply for pmfby crop insurance', 'scheme'),
+    ('kisan credit card eligibility', 'scheme'), ('documents needed for pm kisan', 'scheme'),
+    ('subsidy for drip irrigation', 'scheme'), ('pkvy organic scheme benefits', 'scheme'),
+    ('government loan for farmers', 'scheme'), ('soil health card scheme', 'scheme'),
+    ('पीएम किसान योजना क्या है', 'scheme'), ('फसल बीमा कैसे करें', 'scheme'),
+    ('किसान क्रेडिट कार्ड के लिए आवेदन', 'scheme'), ('सरकारी सब्सिडी योजना', 'scheme'),
+    ('பிரதமர் கிசான் திட்டம்', 'scheme'), ('பயிர் காப்பீடு எப்படி பெறுவது', 'scheme'),
+    ('kisan credit card kaise banaye', 'scheme'), ('pm kisan ki kist kab aayegi', 'scheme'),
+    ('which schemes am i eligible for', 'scheme'), ('how much money in pm kisan', 'scheme'),
+    ('how do i get crop insurance', 'scheme'), ('where to register for kisan scheme', 'scheme'),
+    # Market prices
+    ('tomato price today', 'price'), ('what is the rate of onion', 'price'), ('potato price in pune', 'price'),
+    ('mango rate', 'price'), ('current market price of apples', 'price'), ('will tomato price go up', 'price'),
+    ('price of bananas next month', 'price'), ('grapes bhav', 'price'), ('टमाटर का भाव', 'price'),
+    ('आलू की कीमत', 'price'), ('आज का मंडी भाव', 'price'), ('தக்காளி விலை', 'price'),
+    ('உருளைக்கிழங்கு விலை என்ன', 'price'), ('aloo ka rate', 'price'), ('carrot price trend', 'price'),
+    ('cauliflower rate today', 'price'), ('orange market price', 'price'), ('strawberry price per kg', 'price'),
+    # Needs generation
+    ('my tomato leaves are curling and turning yellow after rain what should i do', 'generate'),
+    ('which crop gives best profit on 2 acres with borewell', 'generate'),
+    ('plan my fertilizer schedule for 5 acres of cotton', 'generate'),
+    ('i have sandy soil in rajasthan and little water what should i grow', 'generate'),
+    ('compare drip and sprinkler for my sugarcane farm', 'generate'),
+    ('how can i increase income from my small farm', 'generate'),
+    ('write a plan for intercropping maize and beans', 'generate'),
+    ('should i sell my wheat now or store it for two months', 'generate'),
+    ('मेरी फसल में पीले पत्ते हैं और बारिश के बाद बढ़ रहे हैं क्या करूं', 'generate'),
+    ('2 एकड़ में कौन सी फसल सबसे ज्यादा मुनाफा देगी', 'generate'),
+    ('என் நிலத்தில் எந்த பயிர் லாபம் தரும்', 'generate'),
+    ('my field flooded yesterday what should i do now', 'generate'),
+    ('pests attacked my chilli crop and the spray did not work', 'generate'),
+    ('how to reduce the cost of cultivation for paddy', 'generate'),
+    ('explain how to start a dairy with 5 cows', 'generate'),
+    ('can i grow strawberries in madhya pradesh', 'generate'),
+    ('what should i do if the monsoon is delayed by two weeks', 'generate'),
+    ('my cow is not eating since yesterday', 'generate'),
+    ('help me decide between soybean and cotton this kharif', 'generate'),
+    ('why are my onion bulbs small this year', 'generate')
+]
+
+PRICE_TEMPLATES = {
+    'en': "{crop}: about ₹{current}/kg now, trend {trend}; expected to average ₹{average} over the next "
+          "30 days. The Price Prediction section has market-wise prices.",
+    'hi': "{crop}: अभी लगभग ₹{current}/किलो, रुझान {trend}; अगले 30 दिनों में औसतन ₹{average} रहने का "
+          "अनुमान है। मंडी-वार भाव के लिए मूल्य पूर्वानुमान अनुभाग देखें।",
+    'ta': "{crop}: தற்போது சுமார் ₹{current}/கிலோ, போக்கு {trend}; அடுத்த 30 நாட்களில் சராசரி ₹{average} "
+          "என கணிக்கப்படுகிறது. சந்தை வாரியான விலைகளுக்கு விலை முன்னறிவிப்பு பிரிவைப் பார்க்கவும்."
+}
+
+THANKS_RESPONSES = {
+    'en': "You're welcome! Ask me anytime about crops, diseases, prices or government schemes.",
+    'hi': 'आपका स्वागत है! फसल, रोग, भाव या सरकारी योजनाओं के बारे में कभी भी पूछें।',
+    'ta': 'மகிழ்ச்சி! பயிர், நோய், விலை அல்லது அரசு திட்டங்கள் பற்றி எப்போது வேண்டுமானாலும் கேளுங்கள்.'
+}
+
+TREND_WORDS = {
+    'hi': {'up': 'बढ़त', 'down': 'गिरावट', 'stable': 'स्थिर'},
+    'ta': {'up': 'உயர்வு', 'down': 'சரிவு', 'stable': 'நிலையானது'}
+}
+
+
+def extract_features(text: str, dimension: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hashed word unigrams, word bigrams and character 3-grams of each word
+    (so unseen inflections and spellings still share features), L2-normalised
+    """
+    words = TOKEN_PATTERN.findall(str(text).lower())
+    features = [f"w:{word}" for word in words]
+    features += [f"b:{first}_{second}" for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    # Glossary translations let Hindi/Tamil words share the English words' weights
+    features += [f"w:{term}" for term in expand_query(tokenize(text)) if term not in words]
+    if not features:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+    counts = {}
+    for feature in features:
+        index = zlib.crc32(feature.encode('utf-8')) % dimension
+        counts[index] = counts.get(index, 0.0) + 1.0
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+    return indices, values / np.linalg.norm(values)
+
+
+class IntentClassifier:
+    """Multinomial logistic regression over hashed sparse features"""
+
+    def __init__(self, dimension: int = 2 ** 16, labels: List[str] = None):
+        self.dimension = dimension
+        self.labels = list(labels or INTENTS)
+        self.weights = np.zeros((dimension, len(self.labels)), dtype=np.float32)
+        self.bias = np.zeros(len(self.labels), dtype=np.float32)
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        indices, values = extract_features(text, self.dimension)
+        logits = values @ self.weights[indices] + self.bias
+        logits = np.exp(logits - logits.max())
+        return logits / logits.sum()
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        probabilities = self.predict_proba(text)
+        best = int(np.argmax(probabilities))
+        return self.labels[best], float(probabilities[best])
+
+    def fit(self, examples: List[Tuple[str, str]], epochs: int = 40, learning_rate: float = 0.5,
+            l2: float = 1e-4, seed: int = 42):
+        """Stochastic gradient descent on the cross-entropy loss"""
+        encoded = [(extract_features(text, self.dimension), self.labels.index(label))
+                   for text, label in examples if label in self.labels]
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(encoded)
+            rate = learning_rate / (1 + epoch * 0.1)
+            for (indices, values), target in encoded:
+                logits = values @ self.weights[indices] + self.bias
+                probabilities = np.exp(logits - logits.max())
+                probabilities /= probabilities.sum()
+                probabilities[target] -= 1.0
+                gradient = np.outer(values, probabilities) + l2 * self.weights[indices]
+                self.weights[indices] -= rate * gradient
+                self.bias -= rate * probabilities
+        return self
+
+    def accuracy(self, examples: List[Tuple[str, str]]) -> float:
+        if not examples:
+            return 0.0
+        return sum(1 for text, label in examples if self.predict(text)[0] == label) / len(examples)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Only the rows that were ever updated are stored, the matrix is very sparse
+        rows = np.flatnonzero(np.abs(self.weights).sum(axis=1))
+        np.savez_compressed(path, rows=rows, values=self.weights[rows], bias=self.bias,
+                            labels=np.array(self.labels), dimension=self.dimension)
+
+    @classmethod
+    def load(cls, path: str) -> 'IntentClassifier':
+        data = np.load(path, allow_pickle=False)
+        model = cls(int(data['dimension']), [str(label) for label in data['labels']])
+        model.weights[data['rows']] = data['values']
+        model.bias = data['bias']
+        return model
+
+
+def load_examples(path: str) -> List[Tuple[str, str]]:
+    """Labelled chat log rows from JSON lines or CSV ('message', 'intent')"""
+    examples = []
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        if path.endswith('.csv'):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            if row.get('message') and row.get('intent') in INTENTS:
+                examples.append((row['message'], row['intent']))
+    return examples
+
+
+def answer_price_question(message: str, language: str = 'en') -> Optional[str]:
+    """Current price and 30-day outlook for the crop named in the message"""
+    try:
+        from price_prediction import predictor
+    except ImportError:
+        return None
+
+    terms = set(expand_query(tokenize(message)))
+    best, best_matched = None, 0
+    for crop in predictor.fetch_kaggle_data():
+        crop_terms = tokenize(crop)
+        matched = sum(1 for term in crop_terms if term in terms)
+        # Every word of the crop name must appear ('iceberg lettuce' needs both)
+        if matched == len(crop_terms) and matched > best_matched:
+            best, best_matched = crop, matched
+    if best is None:
+        return None
+
+    result = predictor.predict_price(best, 30)
+    if not result.get('success'):
+        return None
+    trend = TREND_WORDS.get(language, {}).get(result['trend'], result['trend'])
+    return PRICE_TEMPLATES.get(language, PRICE_TEMPLATES['en']).format(
+        crop=best.replace('_', ' ').capitalize(), current=result['current_price'],
+        trend=trend, average=result['average_predicted_price']
+    )
+
+
+class IntentRouter:
+    """
+    Classifies each chat message and answers the local intents from the
+    app's own data. Messages the model is unsure about, generation
+    requests and local intents without a usable answer go to the LLM.
+    """
+
+    def __init__(self, config: Dict = None):
+        self.config = config or AI_CONFIG.get('intent_router', {})
+        self.model = None
+        self._lock = threading.Lock()
+        self.stats = {'messages': 0, 'answered_locally': 0, 'escalated': 0, 'no_local_answer': 0,
+                      'by_intent': {intent: 0 for intent in INTENTS}}
+
+    def _get_model(self) -> IntentClassifier:
+        if self.model is None:
+            with self._lock:
+                if self.model is None:
+                    self.model = self._load_or_train()
+        return self.model
+
+    def _load_or_train(self) -> IntentClassifier:
+        path = self.config.get('model_path', 'models/intent_router.npz')
+        if os.path.exists(path):
+            try:
+                return IntentClassifier.load(path)
+            except Exception as e:
+                logging.error(f"Intent model unreadable, retraining from seed examples: {e}")
+        return IntentClassifier(self.config.get('hash_dimension', 2 ** 16)).fit(
+            SEED_EXAMPLES, self.config.get('epochs', 40), self.config.get('learning_rate', 0.5)
+        )
+
+    def classify(self, message: str) -> Tuple[str, float]:
+        return self._get_model().predict(message)
+
+    def _local_answer(self, intent: str, message: str, language: str) -> Optional[Dict]:
+        from agriculture_kb import AGRICULTURE_KB
+
+        if intent == 'greeting':
+            from chatbot import get_chatbot_response
+            from keyword_matcher import GREETING_TOPIC, topic_matcher
+            if topic_matcher.best_topic(message) == GREETING_TOPIC:
+                return {'response': get_chatbot_response(message, language), 'answered_from': 'greeting'}
+            # Thanks, goodbyes and other small talk
+            return {'response': THANKS_RESPONSES.get(language, THANKS_RESPONSES['en']), 'answered_from': 'greeting'}
+        if intent == 'price':
+            response = answer_price_question(message, language)
+            return {'response': response, 'answered_from': 'price_data'} if response else None
+
+        direct = answer_from_knowledge(message, language)
+        if direct:
+            return {'response': direct['response'], 'answered_from': 'knowledge_base',
+                    'sources': direct['sources']}
+        if intent == 'scheme':
+            # General scheme questions get the schemes overview in the user's language
+            responses = AGRICULTURE_KB['schemes']['responses']
+            return {'response': responses.get(language, responses['en']), 'answered_from': 'schemes_overview'}
+        return None
+
+    def answer_locally(self, message: str, language: str = 'en') -> Optional[Dict]:
+        """
+        A local reply ({'response', 'answered_from', 'intent', ...}) or None
+        when the message should go to the LLM
+        """
+        if not self.config.get('enabled', True):
+            # Router off: only clear-cut reference answers skip the LLM
+            direct = answer_from_knowledge(message, language)
+            if direct:
+                return {'response': direct['response'], 'answered_from': 'knowledge_base',
+                        'sources': direct['sources'], 'intent': 'knowledge'}
+            return None
+
+        intent, confidence = self.classify(message)
+        with self._lock:
+            self.stats['messages'] += 1
+            self.stats['by_intent'][intent] += 1
+
+        answer = None
+        if intent in LOCAL_INTENTS and confidence >= self.config.get('min_confidence', 0.5):
+            answer = self._local_answer(intent, message, language)
+            if answer is None:
+                with self._lock:
+                    self.stats['no_local_answer'] += 1
+
+        with self._lock:
+            self.stats['answered_locally' if answer else 'escalated'] += 1
+        if answer:
+            answer.update({'intent': intent, 'confidence': round(confidence, 3)})
+        return answer
+
+    def status(self) -> Dict:
+        with self._lock:
+            messages = self.stats['messages']
+            return {
+                'enabled': self.config.get('enabled', True),
+                'llm_calls_avoided_fraction': round(self.stats['answered_locally'] / messages, 3) if messages else None,
+                **self.stats,
+                'by_intent': dict(self.stats['by_intent'])
+            }
+
+
+# Shared per worker process; the model is loaded or trained on first use
+intent_router = IntentRouter()
+
+
+def main():
+    settings = AI_CONFIG.get('intent_router', {})
+    parser = argparse.ArgumentParser(description='Train the chat intent router')
+    parser.add_argument('--data', action='append', default=[],
+                        help='Labelled chat log (.jsonl or .csv with message,intent); repeatable')
+    parser.add_argument('--output', default=settings.get('model_path', 'models/intent_router.npz'))
+    parser.add_argument('--epochs', type=int, default=settings.get('epochs', 40))
+    parser.add_argument('--holdout', type=float, default=0.2, help='Share of examples kept for evaluation')
+    parser.add_argument('--no-seed', action='store_true', help='Train on the given logs only')
+    args = parser.parse_args()
+
+    examples = [] if args.no_seed else list(SEED_EXAMPLES)
+    for path in args.data:
+        examples.extend(load_examples(path))
+    random.Random(7).shuffle(examples)
+    split = int(len(examples) * (1 - args.holdout))
+    train, test = examples[:split], examples[split:]
+
+    model = IntentClassifier(settings.get('hash_dimension', 2 ** 16)).fit(
+        train, args.epochs, settings.get('learning_rate', 0.5)
+    )
+    print(f"Trained on {len(train)} examples: train accuracy {model.accuracy(train):.3f}, "
+          f"holdout accuracy {model.accuracy(test):.3f} ({len(test)} examples)")
+    # Final model uses every example
+    model = IntentClassifier(settings.get('hash_dimension', 2 ** 16)).fit(
+        examples, args.epochs, settings.get('learning_rate', 0.5)
+    )
+    model.save(args.output)
+    print(f"Saved {args.output}")
+
+
+if __name__ == '__main__':
+    main()
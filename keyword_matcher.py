@@ -0,0 +1,111 @@
+# Keyword Matching for AgroMitra
+# Aho-Corasick automaton compiled once from every chatbot topic keyword in
+# every language, so the rule-based chatbot scores all topics in a single
+# pass over the message instead of one substring scan per keyword
+
+import unicodedata
+from collections import defaultdict, deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from agriculture_kb import AGRICULTURE_KB, GREETING_KEYWORDS
+
+GREETING_TOPIC = 'greeting'
+
+# Keywords at least this long also match inflected forms ('diseases',
+# 'watering', Tamil case endings); shorter ones ('hi', 'rate') must be whole words
+MIN_PREFIX_MATCH = 4
+
+
+def _is_word_char(char: str) -> bool:
+    # Devanagari and Tamil vowel signs are combining marks, not alphanumerics
+    return char.isalnum() or unicodedata.category(char).startswith('M')
+
+
+class AhoCorasick:
+    """Multi-pattern string matcher: all occurrences of all patterns in O(len(text) + matches)"""
+
+    def __init__(self, patterns: List[Tuple[str, object]]):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]  # state -> [(pattern length, payload)]
+        for pattern, payload in patterns:
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append((len(pattern), payload))
+
+        # Breadth-first failure links; each state inherits the outputs of its fallback
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, object]]:
+        """Yield (start, end, payload) for every pattern occurrence"""
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for length, payload in self.output[state]:
+                yield index + 1 - length, index + 1, payload
+
+
+class TopicMatcher:
+    """Scores chatbot topics by the keywords (any language) found in a message"""
+
+    def __init__(self, knowledge_base: Dict, greetings: List[str] = None):
+        patterns = {}
+        for topic, data in knowledge_base.items():
+            keywords = list(data.get('keywords', []))
+            for words in data.get('local_keywords', {}).values():
+                keywords.extend(words)
+            for keyword in keywords:
+                # A keyword naming its own topic is the strongest evidence for it
+                weight = 1.5 if keyword.lower() == topic else 1.0
+                patterns.setdefault(keyword.lower(), []).append((topic, weight))
+        for keyword in greetings or []:
+            patterns.setdefault(keyword.lower(), []).append((GREETING_TOPIC, 1.0))
+        self.topics = list(knowledge_base)
+        self.automaton = AhoCorasick([(pattern, (pattern, targets)) for pattern, targets in patterns.items()])
+
+    def score(self, message: str) -> Dict[str, float]:
+        """Topic -> weight of distinct keywords matched"""
+        text = message.lower()
+        seen = set()
+        scores = defaultdict(float)
+        for start, end, (pattern, targets) in self.automaton.iter_matches(text):
+            if pattern in seen:
+                continue
+            if start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if end < len(text) and _is_word_char(text[end]) and len(pattern) < MIN_PREFIX_MATCH:
+                continue
+            seen.add(pattern)
+            for topic, weight in targets:
+                scores[topic] += weight
+        return dict(scores)
+
+    def best_topic(self, message: str) -> Optional[str]:
+        """Highest scoring topic (knowledge-base order breaks ties), greeting
+        only when no topic matched, None when nothing matched"""
+        scores = self.score(message)
+        topic_scores = [(scores[topic], -order, topic) for order, topic in enumerate(self.topics) if topic in scores]
+        if topic_scores:
+            return max(topic_scores)[2]
+        return GREETING_TOPIC if GREETING_TOPIC in scores else None
+
+
+# Compiled once per worker process
+topic_matcher = TopicMatcher(AGRICULTURE_KB, GREETING_KEYWORDS)
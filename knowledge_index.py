@@ -0,0 +1,249 @@
+# Knowledge Retrieval for AgroMitra
+# In-process BM25 index over the app's own reference data (disease database,
+# government schemes, chatbot knowledge base, seasonal calendar), used to
+# ground chatbot prompts and to answer well-covered questions without an LLM
+
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from ai_config import AI_CONFIG
+
+# Word characters plus the Devanagari and Tamil blocks, so vowel signs stay
+# inside their word (dandas U+0964/U+0965 are punctuation and excluded)
+TOKEN_PATTERN = re.compile(r'[\w\u0900-\u0963\u0966-\u097F\u0B80-\u0BFF]+')
+
+STOPWORDS = {
+    # English
+    'a', 'an', 'the', 'is', 'are', 'was', 'be', 'to', 'of', 'in', 'on', 'for', 'and', 'or',
+    'my', 'me', 'i', 'it', 'its', 'do', 'does', 'how', 'what', 'which', 'when', 'should',
+    'can', 'could', 'with', 'this', 'that', 'about', 'tell', 'please', 'you', 'your', 'from',
+    'at', 'by', 'as', 'have', 'has', 'will', 'would', 'there', 'any', 'some', 'best',
+    # Hindi
+    'है', 'हैं', 'का', 'की', 'के', 'में', 'को', 'और', 'क्या', 'कैसे', 'से', 'पर', 'यह',
+    'मेरा', 'मेरी', 'मेरे', 'मुझे', 'करें', 'करना', 'लिए', 'एक', 'कौन', 'कब', 'हो',
+    # Tamil
+    'என்', 'எப்படி', 'என்ன', 'ஒரு', 'மற்றும்', 'எனது', 'எந்த', 'எப்போது',
+    # Romanised Hindi
+    'ki', 'ka', 'ke', 'ko', 'mein', 'me', 'hai', 'kya', 'kaise', 'kab', 'aur', 'se', 'par'
+}
+
+# Hindi, Tamil and romanised (Hinglish) farm terms -> English index terms,
+# so questions in any supported language reach the English reference data
+TERM_GLOSSARY = {
+    # Hindi
+    'गेहूं': 'wheat', 'गेहूँ': 'wheat', 'धान': 'rice', 'चावल': 'rice', 'टमाटर': 'tomato',
+    'आलू': 'potato', 'मक्का': 'corn', 'कपास': 'cotton', 'सेब': 'apple', 'अंगूर': 'grape',
+    'रोग': 'disease', 'बीमारी': 'disease', 'कीट': 'pest', 'झुलसा': 'blight', 'धब्बे': 'spot',
+    'खाद': 'fertilizer', 'उर्वरक': 'fertilizer', 'सिंचाई': 'irrigation', 'पानी': 'water',
+    'बीज': 'seed', 'बुवाई': 'sowing', 'योजना': 'scheme', 'बीमा': 'insurance', 'ऋण': 'loan',
+    'कर्ज': 'loan', 'कीमत': 'price', 'भाव': 'price', 'दाम': 'price', 'मौसम': 'weather',
+    'जैविक': 'organic', 'मिट्टी': 'soil', 'सब्सिडी': 'subsidy', 'किसान': 'kisan',
+    'खरीफ': 'kharif', 'रबी': 'rabi', 'जायद': 'zaid',
+    # Tamil
+    'நெல்': 'rice', 'அரிசி': 'rice', 'கோதுமை': 'wheat', 'தக்காளி': 'tomato',
+    'உருளைக்கிழங்கு': 'potato', 'மக்காச்சோளம்': 'corn', 'பருத்தி': 'cotton',
+    'நோய்': 'disease', 'பூச்சி': 'pest', 'கருகல்': 'blight', 'உரம்': 'fertilizer',
+    'பாசனம்': 'irrigation', 'நீர்': 'water', 'தண்ணீர்': 'water', 'விதை': 'seed',
+    'திட்டம்': 'scheme', 'காப்பீடு': 'insurance', 'கடன்': 'loan', 'விலை': 'price',
+    'வானிலை': 'weather', 'இயற்கை': 'organic', 'மண்': 'soil', 'மானியம்': 'subsidy',
+    'விவசாயி': 'farmer',
+    # Romanised
+    'gehun': 'wheat', 'gehu': 'wheat', 'dhan': 'rice', 'chawal': 'rice', 'tamatar': 'tomato',
+    'aloo': 'potato', 'alu': 'potato', 'makka': 'corn', 'kapas': 'cotton', 'rog': 'disease',
+    'bimari': 'disease', 'keet': 'pest', 'khad': 'fertilizer', 'urvarak': 'fertilizer',
+    'sinchai': 'irrigation', 'paani': 'water', 'pani': 'water', 'beej': 'seed',
+    'yojana': 'scheme', 'bima': 'insurance', 'karz': 'loan', 'karza': 'loan',
+    'keemat': 'price', 'kimat': 'price', 'bhav': 'price', 'daam': 'price', 'mausam': 'weather',
+    'jaivik': 'organic', 'mitti': 'soil', 'thittam': 'scheme', 'vilai': 'price', 'noi': 'disease'
+}
+
+# Tamil is agglutinative (நோய்கள், நோயை ...): match glossary stems as prefixes
+_PREFIX_TERMS = sorted((term for term in TERM_GLOSSARY if not term.isascii() and len(term) >= 3),
+                       key=len, reverse=True)
+
+
+def _stem(token: str) -> str:
+    """Light English suffix folding so 'diseases'/'disease' and 'irrigate'/'irrigation' meet"""
+    if not token.isascii() or len(token) <= 4:
+        return token
+    for suffix, replacement in (('ations', ''), ('ation', ''), ('ings', ''), ('ing', ''),
+                                ('ates', ''), ('ate', ''), ('ies', 'y'), ('oes', 'o'),
+                                ('sses', 'ss'), ('ed', '')):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)] + replacement
+    if token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased, stemmed tokens without stopwords (English, Hindi, Tamil)"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(str(text).lower().replace('_', ' ')):
+        if token not in STOPWORDS:
+            tokens.append(_stem(token))
+    return tokens
+
+
+def expand_query(tokens: List[str]) -> List[str]:
+    """Add the English index term for every glossary word in the query"""
+    expanded = list(tokens)
+    for token in tokens:
+        english = TERM_GLOSSARY.get(token)
+        if english is None and not token.isascii():
+            english = next((TERM_GLOSSARY[term] for term in _PREFIX_TERMS if token.startswith(term)), None)
+        if english is not None:
+            expanded.append(_stem(english))
+    return expanded
+
+
+class Passage:
+    """One retrievable unit of reference text"""
+
+    def __init__(self, passage_id: str, source: str, title: str, text: str,
+                 language: str = 'en', group: str = None, keywords: str = ''):
+        self.id = passage_id
+        self.source = source
+        self.title = title
+        self.text = text
+        self.language = language
+        self.keywords = keywords  # Indexed but never shown
+        # Translations of the same entry share a group; only the best one is returned
+        self.group = group or passage_id
+
+    def to_dict(self) -> Dict:
+        return {'id': self.id, 'source': self.source, 'title': self.title, 'language': self.language}
+
+
+class BM25Index:
+    """Inverted index with Okapi BM25 ranking; built once, read-only afterwards"""
+
+    def __init__(self, passages: List[Passage], k1: float = 1.5, b: float = 0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)   # term -> [(passage index, term frequency)]
+        self.lengths = []
+        self.terms = []
+        self.positions = {passage.id: index for index, passage in enumerate(passages)}
+        for index, passage in enumerate(passages):
+            counts = Counter(tokenize(f"{passage.title} {passage.title} {passage.keywords} {passage.text}"))
+            for term, frequency in counts.items():
+                self.postings[term].append((index, frequency))
+            self.lengths.append(sum(counts.values()))
+            self.terms.append(set(counts))
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        total = len(passages)
+        self.idf = {term: math.log(1 + (total - len(posting) + 0.5) / (len(posting) + 0.5))
+                    for term, posting in self.postings.items()}
+
+    def search(self, query: str, top_k: int = 3, languages=None) -> List[Tuple[float, Passage]]:
+        """Best passages for the query, at most one per group"""
+        scores = defaultdict(float)
+        for term in set(expand_query(tokenize(query))):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for index, frequency in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[index] / self.average_length)
+                scores[index] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        results = []
+        seen_groups = set()
+        for index, score in sorted(scores.items(), key=lambda item: -item[1]):
+            passage = self.passages[index]
+            if languages and passage.language not in languages:
+                continue
+            if passage.group in seen_groups:
+                continue
+            seen_groups.add(passage.group)
+            results.append((score, passage))
+            if len(results) >= top_k:
+                break
+        return results
+
+    def coverage(self, query: str, passage: Passage) -> float:
+        """Share of the query's terms (or their glossary translations) found in the passage"""
+        terms = tokenize(query)
+        if not terms:
+            return 0.0
+        passage_terms = self.terms[self.positions[passage.id]]
+        matched = sum(1 for term in terms if set(expand_query([term])) & passage_terms)
+        return matched / len(terms)
+
+
+def build_passages() -> List[Passage]:
+    """Passages from every reference data source in the app"""
+    from agriculture_kb import AGRICULTURE_KB, SEASONAL_CALENDAR
+    from disease_info import DISEASE_INFO
+    from schemes import SCHEMES_DATA
+
+    passages = []
+    for predicted_class, info in DISEASE_INFO.items():
+        if info.get('disease') == 'Healthy':
+            continue
+        plant = predicted_class.split('___')[0].replace('_', ' ')
+        title = f"{plant} {info['disease']}"
+        text = (f"{title} (severity: {info.get('severity', 'Unknown')}). "
+                f"Treatment: {'; '.join(info.get('recommendations', []))}. "
+                f"Prevention: {info.get('prevention', '')}")
+        passages.append(Passage(f"disease:{predicted_class}", 'disease', title, text))
+
+    for scheme in SCHEMES_DATA:
+        text = (f"{scheme['name']}: {scheme['description']}. Benefits: {scheme['benefits']}. "
+                f"Eligibility: {'; '.join(scheme.get('eligibility', []))}. "
+                f"How to apply: {scheme.get('how_to_apply', '')}. "
+                f"Documents: {', '.join(scheme.get('documents', []))}")
+        passages.append(Passage(f"scheme:{scheme['id']}", 'scheme', scheme['name'], text))
+
+    for topic, data in AGRICULTURE_KB.items():
+        for language, response in data['responses'].items():
+            # English keywords make translated answers findable through the glossary too
+            passages.append(Passage(f"kb:{topic}:{language}", 'knowledge_base', topic.capitalize(), response,
+                                    language, group=f"kb:{topic}", keywords=' '.join(data['keywords'])))
+
+    for season, data in SEASONAL_CALENDAR.items():
+        name = season.replace('_', ' ').capitalize()
+        text = (f"{name} ({data['months']}): crops {', '.join(data['crops'])}. "
+                f"Activities: {'; '.join(data['activities'])}")
+        passages.append(Passage(f"calendar:{season}", 'seasonal_calendar', f"{name} crop calendar", text))
+    return passages
+
+
+_retrieval_config = AI_CONFIG.get('retrieval', {})
+
+# Built at import (a few hundred passages, milliseconds); shared per worker process
+knowledge_index = BM25Index(build_passages(), _retrieval_config.get('k1', 1.5), _retrieval_config.get('b', 0.75))
+
+
+def retrieve(message: str, language: str = 'en', top_k: int = None) -> List[Tuple[float, Passage]]:
+    """Grounding passages for an LLM prompt (English plus the user's language)"""
+    if not _retrieval_config.get('enabled', True):
+        return []
+    return knowledge_index.search(message, top_k or _retrieval_config.get('top_k', 3),
+                                  languages={'en', language})
+
+
+def answer_from_knowledge(message: str, language: str = 'en') -> Optional[Dict]:
+    """
+    A reply built from the best passage alone, when it clearly answers the
+    question: high BM25 score, most query terms covered, no close runner-up
+    of the same kind (e.g. two diseases of one crop), and written in the
+    user's language. None means the question needs the LLM.
+    """
+    if not (_retrieval_config.get('enabled', True) and _retrieval_config.get('answer_directly', True)):
+        return None
+    results = knowledge_index.search(message, 2, languages={language})
+    if not results:
+        return None
+    score, passage = results[0]
+    if score < _retrieval_config.get('direct_min_score', 5.0):
+        return None
+    if knowledge_index.coverage(message, passage) < _retrieval_config.get('direct_min_coverage', 0.7):
+        return None
+    if len(results) > 1 and results[1][1].source == passage.source and \
+            score < results[1][0] * _retrieval_config.get('direct_min_margin', 1.2):
+        return None
+    return {'response': passage.text, 'score': round(score, 2), 'sources': [passage.to_dict()]}
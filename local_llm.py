@@ -0,0 +1,233 @@
+# Local LLM Backend for AgroMitra
+# Offline generation through an Ollama-compatible server or in-process
+# Hugging Face transformers on CPU, with micro-batching of concurrent prompts
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from queue import Empty, Queue
+from typing import Dict, List, Optional
+
+import requests
+
+from ai_config import AI_CONFIG
+
+
+class OllamaBackend:
+    """
+    Client for an Ollama-compatible /api/generate endpoint. Ollama takes one
+    prompt per request, so a batch is sent as parallel requests and the server
+    schedules them together (see OLLAMA_NUM_PARALLEL).
+    """
+
+    def __init__(self, config: Dict):
+        self.endpoint = config.get('endpoint', 'http://localhost:11434/api/generate')
+        self.model = config.get('model', 'llama2')
+        self.timeout = config.get('timeout', 120)
+        self.options = {
+            'temperature': config.get('temperature', 0.7),
+            'num_predict': config.get('max_new_tokens', 512)
+        }
+        self.session = requests.Session()
+        self.pool = ThreadPoolExecutor(max_workers=config.get('max_batch_size', 8),
+                                       thread_name_prefix='ollama')
+
+    def _generate_one(self, prompt: str) -> Dict:
+        response = self.session.post(self.endpoint, json={
+            'model': self.model,
+            'prompt': prompt,
+            'stream': False,
+            'options': self.options
+        }, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        return {
+            'text': data.get('response', ''),
+            'prompt_tokens': data.get('prompt_eval_count'),
+            'completion_tokens': data.get('eval_count')
+        }
+
+    def generate_batch(self, prompts: List[str]) -> List:
+        """Return one result dict (or the exception it raised) per prompt"""
+        futures = [self.pool.submit(self._generate_one, prompt) for prompt in prompts]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+class TransformersBackend:
+    """
+    In-process causal LM on CPU. Weights are loaded from the local cache only
+    (no network) and Linear layers are dynamically quantised to int8.
+    A batch is one padded model.generate() call.
+    """
+
+    def __init__(self, config: Dict):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        self.torch = torch
+        model_name = config.get('hf_model', 'Qwen/Qwen2.5-0.5B-Instruct')
+        local_only = config.get('local_files_only', True)
+        self.max_new_tokens = config.get('max_new_tokens', 512)
+        self.temperature = config.get('temperature', 0.7)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, local_files_only=local_only,
+                                                       padding_side='left')
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        model = AutoModelForCausalLM.from_pretrained(model_name, local_files_only=local_only)
+        model.eval()
+        if config.get('quantize', True):
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        if config.get('threads'):
+            torch.set_num_threads(config['threads'])
+        self.model = model
+
+    def _format(self, prompt: str) -> str:
+        if getattr(self.tokenizer, 'chat_template', None):
+            return self.tokenizer.apply_chat_template(
+                [{'role': 'user', 'content': prompt}], tokenize=False, add_generation_prompt=True
+            )
+        return prompt
+
+    def generate_batch(self, prompts: List[str]) -> List:
+        inputs = self.tokenizer([self._format(p) for p in prompts], return_tensors='pt', padding=True)
+        with self.torch.no_grad():
+            outputs = self.model.generate(
+                **inputs,
+                max_new_tokens=self.max_new_tokens,
+                do_sample=self.temperature > 0,
+                temperature=self.temperature if self.temperature > 0 else None,
+                pad_token_id=self.tokenizer.pad_token_id
+            )
+        prompt_length = inputs['input_ids'].shape[1]
+        prompt_tokens = inputs['attention_mask'].sum(dim=1).tolist()
+        results = []
+        for row, used in zip(outputs, prompt_tokens):
+            generated = row[prompt_length:]
+            completion_tokens = int((generated != self.tokenizer.pad_token_id).sum())
+            results.append({
+                'text': self.tokenizer.decode(generated, skip_special_tokens=True).strip(),
+                'prompt_tokens': int(used),
+                'completion_tokens': completion_tokens
+            })
+        return results
+
+
+class _Pending:
+    def __init__(self, prompt: str):
+        self.prompt = prompt
+        self.future = Future()
+
+
+class MicroBatcher:
+    """
+    Collects prompts submitted by concurrent request threads for up to
+    batch_window_ms (or until max_batch_size) and hands each group to the
+    backend as one batch. At most max_concurrency batches run at once.
+    """
+
+    def __init__(self, backend, max_batch_size: int = 8, batch_window_ms: float = 20,
+                 max_concurrency: int = 1, name: str = 'local-llm'):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window_ms / 1000.0
+        self.queue = Queue()
+        self.stats = {'batches': 0, 'prompts': 0, 'max_batch_seen': 0}
+        self._stats_lock = threading.Lock()
+        self._workers = [
+            threading.Thread(target=self._worker, name=f'{name}-{i}', daemon=True)
+            for i in range(max(1, max_concurrency))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, prompt: str) -> Future:
+        pending = _Pending(prompt)
+        self.queue.put(pending)
+        return pending.future
+
+    def _collect(self) -> List[_Pending]:
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect()
+            with self._stats_lock:
+                self.stats['batches'] += 1
+                self.stats['prompts'] += len(batch)
+                self.stats['max_batch_seen'] = max(self.stats['max_batch_seen'], len(batch))
+            try:
+                results = self.backend.generate_batch([item.prompt for item in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+            for item, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    item.future.set_exception(result)
+                else:
+                    item.future.set_result(result)
+
+
+class LocalLLM:
+    """Facade used by AIRecommendationEngine for the 'local' provider"""
+
+    def __init__(self, config: Dict = None):
+        self.config = config or AI_CONFIG.get('local', {})
+        if self.config.get('provider', 'ollama') == 'huggingface':
+            backend = TransformersBackend(self.config)
+        else:
+            backend = OllamaBackend(self.config)
+        self.batcher = MicroBatcher(
+            backend,
+            max_batch_size=self.config.get('max_batch_size', 8),
+            batch_window_ms=self.config.get('batch_window_ms', 20),
+            max_concurrency=self.config.get('max_concurrency', 1)
+        )
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> Dict:
+        """Blocking generate; returns {'text', 'prompt_tokens', 'completion_tokens'}"""
+        future = self.batcher.submit(prompt)
+        return future.result(timeout=timeout or self.config.get('timeout', 120))
+
+    def status(self) -> Dict:
+        return {
+            'backend': self.config.get('provider', 'ollama'),
+            'queued': self.batcher.queue.qsize(),
+            **self.batcher.stats
+        }
+
+
+_local_llm = None
+_local_llm_lock = threading.Lock()
+
+
+def get_local_llm() -> LocalLLM:
+    """Shared per worker process; the backend is created on first use"""
+    global _local_llm
+    if _local_llm is None:
+        with _local_llm_lock:
+            if _local_llm is None:
+                _local_llm = LocalLLM()
+                logging.info(f"Local LLM backend ready: {_local_llm.config.get('provider', 'ollama')}")
+    return _local_llm
+
+
+def local_llm_status() -> Optional[Dict]:
+    """Batching statistics, or None when the local backend was never used"""
+    return _local_llm.status() if _local_llm is not None else None
@@ -0,0 +1,252 @@
+# Market Geography for AgroMitra
+# Mandi coordinates, a k-d tree over them for nearby-market search from a
+# farmer's location, and the transport cost model used to rank markets by what
+# the farmer actually takes home (net realisation) rather than headline price
+
+import heapq
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# Road distance is longer than the great-circle one; typical Indian detour factor
+ROAD_CIRCUITY = 1.3
+
+# Small-truck freight, loading/unloading and bags, and commission + market fee
+FREIGHT_RATE_PER_TONNE_KM = 3.0
+HANDLING_COST_PER_KG = 0.4
+MANDI_CHARGES_RATE = 0.04
+
+DEFAULT_RADIUS_KM = 250
+DEFAULT_MARKET_LIMIT = 5
+
+# Approximate city-centre coordinates (lat, lon) of the markets in
+# price_prediction.INDIAN_STATES_MARKETS
+MARKET_COORDINATES = {
+    'Andhra Pradesh': {'Vijayawada': (16.51, 80.65), 'Visakhapatnam': (17.69, 83.22), 'Guntur': (16.31, 80.44),
+                       'Tirupati': (13.63, 79.42), 'Rajahmundry': (17.00, 81.80)},
+    'Arunachal Pradesh': {'Itanagar': (27.08, 93.61), 'Naharlagun': (27.10, 93.69), 'Pasighat': (28.07, 95.33),
+                          'Tezpur': (26.63, 92.80)},
+    'Assam': {'Guwahati': (26.14, 91.74), 'Dibrugarh': (27.47, 94.91), 'Silchar': (24.83, 92.78),
+              'Jorhat': (26.75, 94.22), 'Tezpur': (26.63, 92.80)},
+    'Bihar': {'Patna': (25.59, 85.14), 'Muzaffarpur': (26.12, 85.39), 'Bhagalpur': (25.24, 86.97),
+              'Darbhanga': (26.15, 85.90), 'Gaya': (24.79, 85.00)},
+    'Chhattisgarh': {'Raipur': (21.25, 81.63), 'Bilaspur': (22.08, 82.14), 'Durg': (21.19, 81.28),
+                     'Korba': (22.36, 82.75), 'Jagdalpur': (19.07, 82.03)},
+    'Goa': {'Panaji': (15.49, 73.83), 'Margao': (15.27, 73.96), 'Vasco da Gama': (15.40, 73.81),
+            'Mapusa': (15.59, 73.81)},
+    'Gujarat': {'Ahmedabad': (23.02, 72.57), 'Surat': (21.17, 72.83), 'Vadodara': (22.31, 73.18),
+                'Rajkot': (22.30, 70.80), 'Junagadh': (21.52, 70.46)},
+    'Haryana': {'Faridabad': (28.41, 77.32), 'Gurgaon': (28.46, 77.03), 'Panipat': (29.39, 76.97),
+                'Ambala': (30.38, 76.78), 'Karnal': (29.69, 76.99)},
+    'Himachal Pradesh': {'Shimla': (31.10, 77.17), 'Mandi': (31.71, 76.93), 'Kullu': (31.96, 77.11),
+                         'Kangra': (32.10, 76.27), 'Solan': (30.90, 77.10)},
+    'Jharkhand': {'Ranchi': (23.34, 85.31), 'Jamshedpur': (22.80, 86.20), 'Dhanbad': (23.80, 86.43),
+                  'Bokaro': (23.67, 86.15), 'Deoghar': (24.48, 86.69)},
+    'Karnataka': {'Bangalore': (12.97, 77.59), 'Mysore': (12.30, 76.64), 'Hubli': (15.36, 75.12),
+                  'Belgaum': (15.85, 74.50), 'Mangalore': (12.91, 74.86)},
+    'Kerala': {'Thiruvananthapuram': (8.52, 76.94), 'Kochi': (9.93, 76.27), 'Kozhikode': (11.26, 75.78),
+               'Thrissur': (10.53, 76.21), 'Kollam': (8.89, 76.61)},
+    'Madhya Pradesh': {'Bhopal': (23.26, 77.41), 'Indore': (22.72, 75.86), 'Gwalior': (26.22, 78.18),
+                       'Jabalpur': (23.18, 79.99), 'Ujjain': (23.18, 75.78)},
+    'Maharashtra': {'Mumbai': (19.08, 72.88), 'Pune': (18.52, 73.86), 'Nagpur': (21.15, 79.09),
+                    'Nashik': (20.00, 73.79), 'Aurangabad': (19.88, 75.34)},
+    'Manipur': {'Imphal': (24.82, 93.94), 'Thoubal': (24.64, 94.01), 'Bishnupur': (24.63, 93.76),
+                'Churachandpur': (24.33, 93.68)},
+    'Meghalaya': {'Shillong': (25.58, 91.89), 'Tura': (25.51, 90.22), 'Jowai': (25.45, 92.20),
+                  'Nongstoin': (25.52, 91.27)},
+    'Mizoram': {'Aizawl': (23.73, 92.72), 'Lunglei': (22.88, 92.73), 'Saiha': (22.49, 92.98),
+                'Champhai': (23.47, 93.33)},
+    'Nagaland': {'Kohima': (25.67, 94.11), 'Dimapur': (25.91, 93.73), 'Mokokchung': (26.33, 94.53),
+                 'Tuensang': (26.27, 94.83)},
+    'Odisha': {'Bhubaneswar': (20.30, 85.82), 'Cuttack': (20.46, 85.88), 'Rourkela': (22.26, 84.85),
+               'Berhampur': (19.31, 84.79), 'Sambalpur': (21.47, 83.97)},
+    'Punjab': {'Ludhiana': (30.90, 75.86), 'Amritsar': (31.63, 74.87), 'Jalandhar': (31.33, 75.58),
+               'Patiala': (30.34, 76.39), 'Bathinda': (30.21, 74.95)},
+    'Rajasthan': {'Jaipur': (26.91, 75.79), 'Jodhpur': (26.24, 73.02), 'Kota': (25.21, 75.86),
+                  'Bikaner': (28.02, 73.31), 'Udaipur': (24.59, 73.71)},
+    'Sikkim': {'Gangtok': (27.33, 88.61), 'Namchi': (27.17, 88.36), 'Gyalshing': (27.29, 88.26),
+               'Mangan': (27.51, 88.53)},
+    'Tamil Nadu': {'Chennai': (13.08, 80.27), 'Coimbatore': (11.02, 76.96), 'Madurai': (9.93, 78.12),
+                   'Tiruchirappalli': (10.79, 78.70), 'Salem': (11.66, 78.15)},
+    'Telangana': {'Hyderabad': (17.39, 78.49), 'Warangal': (17.97, 79.59), 'Nizamabad': (18.67, 78.09),
+                  'Karimnagar': (18.44, 79.13), 'Khammam': (17.25, 80.15)},
+    'Tripura': {'Agartala': (23.83, 91.28), 'Dharmanagar': (24.37, 92.17), 'Udaipur': (23.53, 91.48),
+                'Kailashahar': (24.33, 92.00)},
+    'Uttar Pradesh': {'Lucknow': (26.85, 80.95), 'Kanpur': (26.45, 80.33), 'Agra': (27.18, 78.01),
+                      'Varanasi': (25.32, 82.97), 'Meerut': (28.98, 77.71)},
+    'Uttarakhand': {'Dehradun': (30.32, 78.03), 'Haridwar': (29.95, 78.16), 'Roorkee': (29.85, 77.89),
+                    'Haldwani': (29.22, 79.51), 'Rishikesh': (30.09, 78.27)},
+    'West Bengal': {'Kolkata': (22.57, 88.36), 'Howrah': (22.59, 88.26), 'Durgapur': (23.52, 87.31),
+                    'Asansol': (23.68, 86.98), 'Siliguri': (26.73, 88.40)},
+    'Delhi': {'New Delhi': (28.61, 77.21), 'Azadpur Mandi': (28.71, 77.18), 'Okhla': (28.53, 77.27),
+              'Ghazipur': (28.62, 77.32)},
+    'Chandigarh': {'Chandigarh Sector 26': (30.73, 76.80), 'Chandigarh Sector 19': (30.73, 76.79)},
+    'Puducherry': {'Puducherry': (11.93, 79.83), 'Karaikal': (10.92, 79.84), 'Mahe': (11.70, 75.54),
+                   'Yanam': (16.73, 82.21)}
+}
+
+
+def valid_location(lat: float, lon: float) -> bool:
+    """Finite latitude within -90..90 and longitude within -180..180"""
+    return math.isfinite(lat) and math.isfinite(lon) and -90 <= lat <= 90 and -180 <= lon <= 180
+
+
+def unit_vectors(lat, lon) -> np.ndarray:
+    """Points on the unit sphere, where straight-line distance orders like great-circle distance"""
+    lat, lon = np.radians(np.asarray(lat, dtype=float)), np.radians(np.asarray(lon, dtype=float))
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def chord_to_km(chord) -> np.ndarray:
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0.0, 1.0))
+
+
+def km_to_chord(km: float) -> float:
+    return float(2 * np.sin(min(km / (2 * EARTH_RADIUS_KM), np.pi / 2)))
+
+
+class KDTree:
+    """
+    Static k-d tree over (n, d) points. Nodes live in flat lists with their
+    bounding boxes; a leaf's points are scored in one array operation, and
+    subtrees whose box lies beyond the radius (or the current k-th nearest)
+    are never visited.
+    """
+
+    def __init__(self, points: np.ndarray, leaf_size: int = 16):
+        self.points = np.asarray(points, dtype=float)
+        self.leaf_size = leaf_size
+        self.index = np.arange(len(self.points))
+        self.lower, self.upper, self.ranges, self.children = [], [], [], []
+        if len(self.points):
+            self._build(0, len(self.points))
+
+    def _build(self, start: int, end: int) -> int:
+        node = len(self.ranges)
+        block = self.points[self.index[start:end]]
+        self.lower.append(block.min(axis=0))
+        self.upper.append(block.max(axis=0))
+        self.ranges.append((start, end))
+        self.children.append(None)
+        if end - start > self.leaf_size:
+            # Split the widest dimension at its median
+            dim = int(np.argmax(self.upper[node] - self.lower[node]))
+            middle = (start + end) // 2
+            order = np.argpartition(block[:, dim], middle - start)
+            self.index[start:end] = self.index[start:end][order]
+            self.children[node] = (self._build(start, middle), self._build(middle, end))
+        return node
+
+    def _box_distance(self, node: int, point: np.ndarray) -> float:
+        gap = np.maximum(0.0, np.maximum(self.lower[node] - point, point - self.upper[node]))
+        return float(np.sqrt(gap @ gap))
+
+    def _leaf(self, node: int, point: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.ranges[node]
+        index = self.index[start:end]
+        return index, np.linalg.norm(self.points[index] - point, axis=1)
+
+    def query_radius(self, point: np.ndarray, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices and distances of every point within radius, nearest first"""
+        found, distances = [np.empty(0, dtype=int)], [np.empty(0)]
+        stack = [0] if self.ranges else []
+        while stack:
+            node = stack.pop()
+            if self._box_distance(node, point) > radius:
+                continue
+            if self.children[node] is None:
+                index, distance = self._leaf(node, point)
+                keep = distance <= radius
+                found.append(index[keep])
+                distances.append(distance[keep])
+            else:
+                stack.extend(self.children[node])
+        found, distances = np.concatenate(found), np.concatenate(distances)
+        order = np.argsort(distances, kind='stable')
+        return found[order], distances[order]
+
+    def query(self, point: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices and distances of the k nearest points, nearest first"""
+        best, best_distances = np.empty(0, dtype=int), np.empty(0)
+        heap = [(self._box_distance(0, point), 0)] if self.ranges else []
+        while heap:
+            bound, node = heapq.heappop(heap)
+            if len(best) == k and bound > best_distances[-1]:
+                break
+            if self.children[node] is None:
+                index, distance = self._leaf(node, point)
+                best = np.concatenate([best, index])
+                best_distances = np.concatenate([best_distances, distance])
+                order = np.argsort(best_distances, kind='stable')[:k]
+                best, best_distances = best[order], best_distances[order]
+            else:
+                for child in self.children[node]:
+                    heapq.heappush(heap, (self._box_distance(child, point), child))
+        return best, best_distances
+
+
+class MarketIndex:
+    """Markets with coordinates, searchable by distance from any point"""
+
+    def __init__(self, coordinates: Dict[str, Dict[str, Tuple[float, float]]] = MARKET_COORDINATES):
+        rows, seen = [], set()
+        for state, markets in coordinates.items():
+            for market, (lat, lon) in markets.items():
+                # A market listed under two states (Tezpur) is indexed once
+                if (market, lat, lon) not in seen:
+                    seen.add((market, lat, lon))
+                    rows.append((market, state, lat, lon))
+        self.markets = [row[0] for row in rows]
+        self.states = [row[1] for row in rows]
+        self.lat = np.array([row[2] for row in rows])
+        self.lon = np.array([row[3] for row in rows])
+        self.tree = KDTree(unit_vectors(self.lat, self.lon))
+
+    def locate(self, market: str = None, state: str = None) -> Optional[Tuple[float, float]]:
+        """Coordinates of a known market, else the centre of a state's markets"""
+        if market:
+            for i, name in enumerate(self.markets):
+                if name.lower() == market.lower() and (not state or self.states[i] == state):
+                    return float(self.lat[i]), float(self.lon[i])
+        if state:
+            rows = [i for i, name in enumerate(self.states) if name == state]
+            if rows:
+                return float(self.lat[rows].mean()), float(self.lon[rows].mean())
+        return None
+
+    def nearby(self, lat: float, lon: float, radius_km: float = DEFAULT_RADIUS_KM,
+               limit: int = DEFAULT_MARKET_LIMIT) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Market rows and great-circle km within radius_km, nearest first; the
+        nearest `limit` markets when none are that close
+        """
+        if not valid_location(lat, lon):
+            raise ValueError(f"Invalid location ({lat}, {lon})")
+        if not (math.isfinite(radius_km) and radius_km >= 0):
+            raise ValueError(f"Invalid radius {radius_km} km")
+        point = unit_vectors(lat, lon)
+        rows, chords = self.tree.query_radius(point, km_to_chord(radius_km))
+        if not len(rows):
+            rows, chords = self.tree.query(point, limit)
+        return rows, chord_to_km(chords)
+
+
+def transport_cost(road_km: np.ndarray, rate_per_tonne_km: float = FREIGHT_RATE_PER_TONNE_KM) -> np.ndarray:
+    """Cost per kg of getting produce to each market"""
+    return HANDLING_COST_PER_KG + rate_per_tonne_km * np.asarray(road_km) / 1000.0
+
+
+def net_realisation(prices: np.ndarray, road_km: np.ndarray,
+                    rate_per_tonne_km: float = FREIGHT_RATE_PER_TONNE_KM) -> np.ndarray:
+    """
+    What the farmer keeps per kg, shape of prices (markets, days): the sale
+    price less mandi charges and the trip to each market
+    """
+    return prices * (1 - MANDI_CHARGES_RATE) - transport_cost(road_km, rate_per_tonne_km)[:, None]
+
+
+# Built once per worker process
+market_index = MarketIndex()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Materialised Price Forecasts for AgroMitra
+Evaluates every stored forecast model once and writes the daily forecast
+paths (series x days, float32) to a .npy file that every worker memory-maps,
+so /predict and /compare slice arrays instead of evaluating models.
+The index (series keys, start date, generation time) lives in a JSON file
+that is swapped atomically, so readers never see a half-written table.
+
+Rebuild after the nightly refit (cron):
+    python price_models.py && python materialised_forecasts.py
+"""
+
+import argparse
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are not serialised
+    fcntl = None
+
+from price_models import forecast_models, model_forecasts
+from price_store import PriceStore, from_days, price_store, to_day
+
+# Longest standard horizon, plus slack so a missed nightly run still serves it
+HORIZON_DAYS = 90
+SLACK_DAYS = 7
+
+# How often readers look for a newer table
+RELOAD_CHECK_SECONDS = 30
+
+DEFAULT_DIR = os.getenv('FORECAST_TABLE_DIR') or os.path.dirname(price_store.path)
+
+
+def table_dir(store: PriceStore) -> str:
+    """Where a store's table lives: DEFAULT_DIR for the shared store, else beside the store"""
+    if os.path.abspath(store.path) == os.path.abspath(price_store.path):
+        return DEFAULT_DIR
+    return os.path.dirname(os.path.abspath(store.path))
+
+
+@contextmanager
+def _writer_lock(directory: str):
+    """Exclusive across processes, so a rebuild and an in-place update never interleave"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'forecasts.lock'), 'a+') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class MaterialisedForecasts:
+    """Read side of the forecast table, reloaded when a new build is published"""
+
+    def __init__(self, directory: str = DEFAULT_DIR):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'forecasts.json')
+        self._lock = threading.Lock()
+        self._table = None
+        self._rows = {}
+        self._meta = {}
+        self._mtime = None
+        self._checked_at = 0.0
+        self.stats = {'lookups': 0, 'hits': 0, 'unavailable': 0}
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < RELOAD_CHECK_SECONDS and self._table is not None:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.index_path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.index_path, encoding='utf-8') as handle:
+                meta = json.load(handle)
+            table = np.load(os.path.join(self.directory, meta['table']), mmap_mode='r')
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading materialised forecasts, keeping the previous table: {e}")
+            return
+        self._rows = {tuple(key): row for row, key in enumerate(meta['keys'])}
+        self._table, self._meta, self._mtime = table, meta, mtime
+
+    def lookup(self, keys: List[Tuple[str, str]], days: int,
+               today: date = None) -> Optional[Tuple[np.ndarray, List[Optional[str]], str]]:
+        """
+        Forecast paths for tomorrow onwards per (crop, market) key, the model
+        per key (None: no model for that series) and when the table was
+        generated or last updated; None when no table covers the requested horizon
+        """
+        with self._lock:
+            self._refresh()
+            table, rows, meta = self._table, self._rows, self._meta
+            self.stats['lookups'] += 1
+            offset = to_day(today or date.today()) + 1 - meta['start_day'] if table is not None else -1
+            if offset < 0 or offset + days > table.shape[1]:
+                self.stats['unavailable'] += 1
+                return None
+            self.stats['hits'] += 1
+
+        out = np.full((len(keys), days), np.nan)
+        found = [i for i, key in enumerate(keys) if key in rows]
+        if found:
+            out[found] = table[[rows[keys[i]] for i in found], offset:offset + days]
+        models = [meta['models'][rows[key]] if key in rows else None for key in keys]
+        return out, models, meta.get('updated_at') or meta['generated_at']
+
+    def status(self) -> Dict:
+        with self._lock:
+            self._refresh()
+            return {
+                'available': self._table is not None,
+                'series': len(self._rows),
+                'days': int(self._table.shape[1]) if self._table is not None else 0,
+                'start_date': str(from_days(self._meta['start_day'])) if self._meta else None,
+                'generated_at': self._meta.get('generated_at'),
+                'updated_at': self._meta.get('updated_at'),
+                'incremental_updates': self._meta.get('incremental_updates', 0),
+                **self.stats
+            }
+
+
+def build_table(store: PriceStore = price_store, directory: str = None,
+                days: int = HORIZON_DAYS + SLACK_DAYS, today: date = None) -> Dict:
+    """Evaluate every stored model from tomorrow on and publish the table"""
+    directory = directory or table_dir(store)
+    # Models are read under the lock too, so no update lands between the read and the publish
+    with _writer_lock(directory):
+        return _build_table(store, directory, days, today)
+
+
+def _build_table(store: PriceStore, directory: str, days: int, today: Optional[date]) -> Dict:
+    start = time.time()
+    keys = store.model_keys()
+    forecasts, models = model_forecasts(store, keys, days, today)
+    generated_at = datetime.now().isoformat(timespec='seconds')
+    stamp = datetime.now().strftime('%Y%m%d%H%M%S')
+
+    table_name = f"forecasts-{stamp}.npy"
+    np.save(os.path.join(directory, table_name), np.round(forecasts, 2).astype(np.float32))
+    meta = {
+        'table': table_name,
+        'keys': [list(key) for key in keys],
+        'models': models,
+        'start_day': to_day(today or date.today()) + 1,
+        'days': days,
+        'generated_at': generated_at
+    }
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.json')
+    with os.fdopen(handle, 'w', encoding='utf-8') as temp:
+        json.dump(meta, temp)
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, os.path.join(directory, 'forecasts.json'))
+
+    # Readers still holding an older table keep their mapping; on Windows the
+    # file stays until the next build
+    for old in glob.glob(os.path.join(directory, 'forecasts-*.npy')):
+        if os.path.basename(old) != table_name:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    return {'series': len(keys), 'days': days, 'generated_at': generated_at,
+            'seconds': round(time.time() - start, 2)}
+
+
+def update_rows(models: Dict[Tuple[str, str], Dict], directory: str = DEFAULT_DIR) -> int:
+    """
+    Rewrite only the given series' rows of the published table in place;
+    workers see the new values through their shared mapping. Series not in
+    the table wait for the next full build. Returns the rows written.
+    """
+    if not models:
+        return 0
+    with _writer_lock(directory):
+        return _update_rows(models, directory)
+
+
+def _update_rows(models: Dict[Tuple[str, str], Dict], directory: str) -> int:
+    index_path = os.path.join(directory, 'forecasts.json')
+    try:
+        with open(index_path, encoding='utf-8') as handle:
+            meta = json.load(handle)
+    except (OSError, ValueError):
+        return 0
+    rows = {tuple(key): row for row, key in enumerate(meta['keys'])}
+    keys = [key for key in models if key in rows]
+    if not keys:
+        return 0
+
+    try:
+        table = np.load(os.path.join(directory, meta['table']), mmap_mode='r+')
+    except (OSError, ValueError) as e:
+        print(f"Materialised forecasts not updated, waiting for the next build: {e}")
+        return 0
+    width = table.shape[1]
+    # Column c is start_day + c; a model forecasts from the day after its last
+    # observation, and columns already in the past repeat its first forecast
+    shifts = np.array([meta['start_day'] - models[key]['last_day'] - 1 for key in keys])
+    forecasts = forecast_models([models[key] for key in keys], max(int(shifts.max()), 0) + width)
+    columns = np.clip(shifts[:, None] + np.arange(width), 0, None)
+    table[[rows[key] for key in keys]] = np.round(np.take_along_axis(forecasts, columns, axis=1), 2)
+    table.flush()
+    del table
+
+    meta['updated_at'] = datetime.now().isoformat(timespec='seconds')
+    meta['incremental_updates'] = meta.get('incremental_updates', 0) + len(keys)
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.json')
+    with os.fdopen(handle, 'w', encoding='utf-8') as temp:
+        json.dump(meta, temp)
+    os.chmod(temp_path, 0o644)
+    # Never put back an index that a writer without the lock (Windows) has replaced
+    try:
+        with open(index_path, encoding='utf-8') as handle:
+            current = json.load(handle).get('table')
+    except (OSError, ValueError):
+        current = None
+    if current != meta['table']:
+        os.remove(temp_path)
+        return 0
+    os.replace(temp_path, index_path)
+    return len(keys)
+
+
+# Shared per worker process; the table itself is shared through the page cache
+materialised_forecasts = MaterialisedForecasts()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Materialise daily price forecasts for every fitted series')
+    parser.add_argument('--days', type=int, default=HORIZON_DAYS + SLACK_DAYS)
+    parser.add_argument('--store', help='Price store path (default: PRICE_STORE_PATH or database/prices.db)')
+    parser.add_argument('--output', help='Directory for forecasts.json and the table (default: FORECAST_TABLE_DIR '
+                                          'or beside the store)')
+    args = parser.parse_args()
+
+    store = PriceStore(args.store) if args.store else price_store
+    output = args.output or table_dir(store)
+    stats = build_table(store, output, args.days)
+    print(f"Materialised {stats['series']} series x {stats['days']} days in {stats['seconds']}s "
+          f"-> {output}")
+
+
+if __name__ == '__main__':
+    main()
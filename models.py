@@ -109,6 +109,10 @@ class DiseaseDetection(db.Model):
 
 class ChatHistory(db.Model):
     __tablename__ = 'chat_history'
+    __table_args__ = (
+        # Conversation context is read as "latest N turns for a user"
+        db.Index('ix_chat_history_user_created', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
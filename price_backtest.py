@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Price Forecast Backtesting for AgroMitra
+Rolling-origin evaluation of the forecasting models: each series is cut at a
+series of past days, every model (and the hold-out selection used in
+production, 'auto') is fitted on the data up to the cut and its forecast is
+scored against what the mandi actually reported 1, 7, 14 and 30 days later.
+Reports MAPE, sMAPE and how often the actual price fell inside the P10-P90
+band, per crop, market, horizon and model.
+
+Results per series and cut-off are cached in the price store, keyed by the
+model code and the data they were scored on, so a re-run only evaluates cuts
+whose data or models changed:
+    python price_backtest.py --crops Tomato,Onion --cutoffs 12 --step 14
+    python price_backtest.py --output backtest.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+import price_models
+from price_models import (FITTERS, MIN_OBSERVATIONS, NATIONAL_MARKET, daily_values, fit_series,
+                          forecast_models, forecast_quantiles)
+from price_store import PriceStore, price_store, to_days
+
+HORIZONS = (1, 7, 14, 30)
+CUTOFF_COUNT = 12
+CUTOFF_STEP_DAYS = 14
+
+# Band scored for coverage; a calibrated P10-P90 band holds 80% of actuals
+BAND_QUANTILES = (0.1, 0.9)
+
+EVALUATED_MODELS = tuple(FITTERS) + ('auto',)
+
+
+def model_version(horizons: Sequence[int] = HORIZONS) -> str:
+    """Changes whenever the model code or the scored horizons do, invalidating cached results"""
+    with open(price_models.__file__, 'rb') as handle:
+        digest = hashlib.sha256(handle.read())
+    digest.update(repr((tuple(horizons), BAND_QUANTILES)).encode())
+    return digest.hexdigest()[:16]
+
+
+def cutoff_days(last_day: int, horizons: Sequence[int] = HORIZONS, count: int = CUTOFF_COUNT,
+                step: int = CUTOFF_STEP_DAYS) -> List[int]:
+    """
+    Cut-offs whose longest horizon is already observed, newest first. They sit
+    on multiples of `step` days so daily ingests do not shift them (and the cache)
+    """
+    newest = (last_day - max(horizons)) // step * step
+    return [newest - step * i for i in range(count)]
+
+
+def backtest_series(days: np.ndarray, values: np.ndarray, cutoffs: Sequence[int],
+                    horizons: Sequence[int] = HORIZONS, cached: Dict[int, Tuple[str, Dict]] = None
+                    ) -> Dict[int, Tuple[str, Dict]]:
+    """
+    Forecasts, bands and actuals per model at each cut-off as
+    cutoff -> (data_hash, results). Cut-offs with too little history are
+    skipped; cached results whose data hash still matches are reused.
+    """
+    cached = cached or {}
+    horizons = np.asarray(horizons)
+    longest = int(horizons.max())
+    grid = np.arange(days[0], days[-1] + 1)
+    y = daily_values(days, values)
+    # Interpolated days are fitted on but never scored
+    observed = np.full(len(grid), np.nan)
+    observed[days - days[0]] = values
+
+    out = {}
+    for cutoff in cutoffs:
+        end = cutoff - int(days[0])
+        if end + 1 < MIN_OBSERVATIONS or end + longest >= len(grid):
+            continue
+        window = observed[:end + longest + 1]
+        data_hash = hashlib.sha1(np.round(window, 2).tobytes()).hexdigest()
+        if cutoff in cached and cached[cutoff][0] == data_hash:
+            out[cutoff] = cached[cutoff]
+            continue
+
+        train = y[:end + 1]
+        models = [{'model': name, 'params': fitter(train)} for name, fitter in FITTERS.items()]
+        models.append(fit_series(grid[:end + 1], train))
+        forecasts = forecast_models(models, longest)
+        lower, upper = forecast_quantiles(models, longest, BAND_QUANTILES)
+        columns = horizons - 1
+        actual = observed[end + horizons]
+        results = {'actual': [None if np.isnan(value) else round(float(value), 2) for value in actual]}
+        for name, forecast, low, high in zip(EVALUATED_MODELS, forecasts, lower, upper):
+            results[name] = {
+                'forecast': np.round(forecast[columns], 2).tolist(),
+                'lower': np.round(low[columns], 2).tolist(),
+                'upper': np.round(high[columns], 2).tolist()
+            }
+        out[cutoff] = (data_hash, results)
+    return out
+
+
+def score(actual: np.ndarray, forecast: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> Dict:
+    """MAPE, sMAPE and P10-P90 coverage (all %) over the scorable points"""
+    ok = ~np.isnan(actual) & (actual > 0)
+    if not ok.any():
+        return {'n': 0, 'mape': None, 'smape': None, 'coverage': None}
+    actual, forecast, lower, upper = actual[ok], forecast[ok], lower[ok], upper[ok]
+    error = np.abs(forecast - actual)
+    return {
+        'n': int(ok.sum()),
+        'mape': round(float((error / actual).mean() * 100), 2),
+        'smape': round(float((2 * error / (actual + np.abs(forecast))).mean() * 100), 2),
+        'coverage': round(float(((actual >= lower) & (actual <= upper)).mean() * 100), 1)
+    }
+
+
+def summarise(results: List[Tuple[str, str, int, Dict]], horizons: Sequence[int] = HORIZONS) -> Dict:
+    """Scores by (model, horizon), and within each crop and each series"""
+    points = defaultdict(list)
+    for crop, market, _, result in results:
+        actual = [np.nan if value is None else value for value in result['actual']]
+        for model in EVALUATED_MODELS:
+            rows = zip(actual, result[model]['forecast'], result[model]['lower'], result[model]['upper'])
+            for horizon, row in zip(horizons, rows):
+                for group in (('overall',), ('crop', crop), ('series', crop, market)):
+                    points[group + (model, horizon)].append(row)
+
+    summary = {'overall': {}, 'by_crop': {}, 'by_series': {}}
+    for key, rows in points.items():
+        level, model, horizon = key[0], key[-2], str(key[-1])
+        metrics = score(*np.array(rows, dtype=float).T)
+        if level == 'overall':
+            summary['overall'].setdefault(model, {})[horizon] = metrics
+        elif level == 'crop':
+            summary['by_crop'].setdefault(key[1], {}).setdefault(model, {})[horizon] = metrics
+        else:
+            series = f"{key[1]} @ {key[2]}"
+            summary['by_series'].setdefault(series, {}).setdefault(model, {})[horizon] = metrics
+    return summary
+
+
+_worker_store = None
+
+
+def _init_worker(path: str):
+    global _worker_store
+    _worker_store = PriceStore(path)
+
+
+def _backtest_keys(args: Tuple) -> Tuple[List[Tuple], List[Tuple]]:
+    keys, version, horizons, count, step = args
+    cached = defaultdict(dict)
+    for (crop, market, cutoff), entry in _worker_store.load_backtests(version, keys).items():
+        cached[(crop, market)][cutoff] = entry
+
+    results, fresh = [], []
+    for crop, market in keys:
+        if market == NATIONAL_MARKET:
+            days, values = _worker_store.national_series(crop)
+        else:
+            series = _worker_store.series(crop, market)
+            days, values = to_days(series['dates']), series['modal_price']
+        if len(values) < MIN_OBSERVATIONS:
+            continue
+        previous = cached.get((crop, market), {})
+        cutoffs = cutoff_days(int(days[-1]), horizons, count, step)
+        for cutoff, (data_hash, result) in backtest_series(days, values, cutoffs, horizons, previous).items():
+            results.append((crop, market, cutoff, result))
+            if previous.get(cutoff, (None,))[0] != data_hash:
+                fresh.append((crop, market, cutoff, data_hash, result))
+    return results, fresh
+
+
+def run_backtest(store: PriceStore = price_store, processes: int = None, crops: List[str] = None,
+                 markets: List[str] = None, horizons: Sequence[int] = HORIZONS, count: int = CUTOFF_COUNT,
+                 step: int = CUTOFF_STEP_DAYS, batch_size: int = 32) -> Dict:
+    """Backtest every selected series (and each crop's national series) across a process pool"""
+    keys = [key for key in store.series_keys()
+            if (not crops or key[0] in crops) and (not markets or key[1] in markets)]
+    if not markets:
+        keys += [(crop, NATIONAL_MARKET) for crop in sorted({crop for crop, _ in keys})]
+    version = model_version(horizons)
+    batches = [(keys[i:i + batch_size], version, tuple(horizons), count, step)
+               for i in range(0, len(keys), batch_size)]
+    start = time.time()
+    results, evaluated = [], 0
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count(), initializer=_init_worker,
+                             initargs=(store.path,)) as pool:
+        for batch_results, fresh in pool.map(_backtest_keys, batches):
+            results.extend(batch_results)
+            if fresh:
+                store.save_backtests(version, fresh)
+                evaluated += len(fresh)
+    return {
+        'model_version': version,
+        'series': len(keys),
+        'cutoffs': len(results),
+        'evaluated': evaluated,
+        'cached': len(results) - evaluated,
+        'seconds': round(time.time() - start, 2),
+        **summarise(results, horizons)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rolling-origin backtest of the price forecasting models')
+    parser.add_argument('--processes', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--crops', help='Comma-separated crops to backtest (default: all)')
+    parser.add_argument('--markets', help='Comma-separated markets to backtest (default: all, plus national)')
+    parser.add_argument('--horizons', default=','.join(map(str, HORIZONS)), help='Comma-separated days ahead')
+    parser.add_argument('--cutoffs', type=int, default=CUTOFF_COUNT, help='Cut-offs per series')
+    parser.add_argument('--step', type=int, default=CUTOFF_STEP_DAYS, help='Days between cut-offs')
+    parser.add_argument('--store', help='Price store path (default: PRICE_STORE_PATH or database/prices.db)')
+    parser.add_argument('--output', help='Write the full report (including per-series scores) as JSON')
+    args = parser.parse_args()
+
+    store = PriceStore(args.store) if args.store else price_store
+    crops = [crop.strip() for crop in args.crops.split(',')] if args.crops else None
+    markets = [market.strip() for market in args.markets.split(',')] if args.markets else None
+    horizons = sorted(int(horizon) for horizon in args.horizons.split(','))
+    report = run_backtest(store, args.processes, crops, markets, horizons, args.cutoffs, args.step)
+
+    print(f"Backtested {report['series']} series at {report['cutoffs']} cut-offs in {report['seconds']}s "
+          f"({report['evaluated']} evaluated, {report['cached']} cached)")
+    print(f"{'model':<16}{'days':>6}{'MAPE%':>9}{'sMAPE%':>9}{'P10-P90%':>10}{'n':>8}")
+    for model, by_horizon in report['overall'].items():
+        for horizon, metrics in by_horizon.items():
+            if metrics['n']:
+                print(f"{model:<16}{horizon:>6}{metrics['mape']:>9}{metrics['smape']:>9}"
+                      f"{metrics['coverage']:>10}{metrics['n']:>8}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
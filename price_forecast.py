@@ -0,0 +1,98 @@
+# Price Forecast Engine for AgroMitra
+# Forecasts are NumPy arrays: crops x markets x days in one vectorised pass,
+# one shared date range, and min/max/mean/modal prices from array reductions
+
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Longest horizon a request may ask for; longer ones are capped
+MAX_FORECAST_DAYS = 365
+
+# Most crop x market pairs one comparison or batch request may ask for; a
+# batch with daily predictions is held to MAX_PREDICTION_POINTS pairs x days,
+# and one with simulated bands to MAX_BAND_SERIES pairs
+MAX_COMPARE_SERIES = 20000
+MAX_PREDICTION_POINTS = 100000
+MAX_BAND_SERIES = 20
+
+# Daily price change per trend; 'stable' oscillates by +/- STABLE_SWING
+TREND_SLOPES = {'up': 0.5, 'down': -0.3, 'stable': 0.0}
+STABLE_SWING = 0.2
+
+RURAL_MARKET_FACTOR = 0.95
+
+
+def clamp_days(days) -> int:
+    """Forecast horizon limited to 1..MAX_FORECAST_DAYS"""
+    return max(1, min(int(days), MAX_FORECAST_DAYS))
+
+
+@lru_cache(maxsize=32)
+def _date_range(start: date, days: int) -> Tuple[str, ...]:
+    first = np.datetime64(start, 'D') + 1
+    return tuple(np.datetime_as_string(first + np.arange(days), unit='D'))
+
+
+def forecast_dates(days: int, start: date = None) -> List[str]:
+    """'YYYY-MM-DD' for each of the next `days` days, generated once per day and horizon"""
+    return list(_date_range(start or date.today(), days))
+
+
+def market_factor(market: Optional[str], state: Optional[str], variations: Dict) -> Tuple[float, str]:
+    """Price multiplier and its reason for a market (1.0 for the national average)"""
+    if market and market in variations:
+        return variations[market]['factor'], variations[market]['reason']
+    if state and market:
+        # Default adjustment for unlisted markets
+        return RURAL_MARKET_FACTOR, 'Rural market adjustment'
+    return 1.0, ''
+
+
+def trend_forecast(base_prices: np.ndarray, trends: List[str], days: int) -> np.ndarray:
+    """
+    Daily prices for every series, shape base_prices.shape + (days,).
+    base_prices is (crops, markets); trends has one entry per crop. A falling
+    trend stops at zero, as the fitted models' forecasts do.
+    """
+    base_prices = np.asarray(base_prices, dtype=float)
+    slopes = np.array([TREND_SLOPES.get(trend, 0.0) for trend in trends])
+    swings = np.array([STABLE_SWING if trend not in ('up', 'down') else 0.0 for trend in trends])
+    day = np.arange(1, days + 1)
+    sign = np.where(day % 2 == 0, 1.0, -1.0)
+    # (crops, 1, days): each crop's per-day change, broadcast over markets
+    change = slopes[:, None, None] * day + swings[:, None, None] * sign
+    return np.round(np.maximum(base_prices[..., None] + change, 0.0), 2)
+
+
+def modal_prices(prices: np.ndarray) -> np.ndarray:
+    """
+    Most frequent whole-rupee price along the last axis; ties go to the value
+    seen first, as collections.Counter.most_common would. Each row is sorted
+    and its runs counted, so memory is O(rows x days) whatever the price range.
+    """
+    flat = np.rint(prices.reshape(-1, prices.shape[-1])).astype(np.int64)
+    count, days = flat.shape
+    # A stable sort keeps equal prices in day order, so a run's first entry is its first day
+    order = np.argsort(flat, axis=1, kind='stable')
+    ordered = np.take_along_axis(flat, order, axis=1)
+    starts = np.ones(flat.shape, dtype=bool)
+    starts[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    runs = np.cumsum(starts, axis=1) - 1 + np.arange(count)[:, None] * days
+    lengths = np.bincount(runs.ravel(), minlength=count * days)[runs]
+    # Longest run wins, then the earliest first day
+    score = np.where(starts, lengths * (days + 1) + (days - order), -1)
+    best = score.argmax(axis=1)
+    return ordered[np.arange(count), best].reshape(prices.shape[:-1])
+
+
+def summarise(prices: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per-series reductions over the forecast horizon"""
+    return {
+        'min': prices.min(axis=-1),
+        'max': prices.max(axis=-1),
+        'mean': np.round(prices.mean(axis=-1), 2),
+        'mode': modal_prices(prices)
+    }
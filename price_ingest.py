@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Mandi Price Ingestion for AgroMitra
+Streams Agmarknet-style price dumps (CSV, .gz, .bz2, .xz or .zip) into the
+price store in fixed-size chunks, so memory stays flat however large the
+file. Crop, market and state names are normalised, invalid rows dropped,
+variety rows for the same (crop, market, day) merged across the whole file,
+and rows are upserted, so re-running a file changes nothing. New days are folded straight into the
+affected series' forecast models and materialised forecast rows.
+
+    python price_ingest.py data/agmarknet_2023.csv.gz data/agmarknet_2024.csv.gz
+    python price_ingest.py dump.csv --unit kg --chunk-size 20000 --force
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from price_prediction import INDIAN_STATES_MARKETS, SAMPLE_PRICE_DATA
+from materialised_forecasts import table_dir, update_rows
+from price_models import NATIONAL_MARKET, update_models
+from price_store import STAGED_COLUMNS, PriceStore, price_store
+
+# Normalised header -> store column; Agmarknet exports use several spellings
+COLUMN_ALIASES = {
+    'state': 'state',
+    'market': 'market', 'market_name': 'market', 'apmc': 'market', 'mandi': 'market',
+    'commodity': 'crop', 'commodity_name': 'crop', 'crop': 'crop',
+    'arrival_date': 'date', 'price_date': 'date', 'reported_date': 'date', 'date': 'date',
+    'arrivals_tonnes': 'arrival_tonnes', 'arrivals': 'arrival_tonnes', 'arrival_tonnes': 'arrival_tonnes',
+    'min_price': 'min_price', 'min_x0020_price': 'min_price', 'min_price_rs_quintal': 'min_price',
+    'max_price': 'max_price', 'max_x0020_price': 'max_price', 'max_price_rs_quintal': 'max_price',
+    'modal_price': 'modal_price', 'modal_x0020_price': 'modal_price', 'modal_price_rs_quintal': 'modal_price'
+}
+REQUIRED_COLUMNS = ('crop', 'market', 'date', 'modal_price')
+
+# Agmarknet exports use day-first dates; tried in order, each only on rows still unparsed
+DATE_FORMATS = ('%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%d-%b-%Y', '%d/%m/%y')
+
+# Agmarknet quotes rupees per quintal; the store (like the app) uses per kg
+UNIT_DIVISORS = {'quintal': 100.0, 'kg': 1.0}
+
+# A day advances a crop's national model only once this share of the markets
+# that usually report it (median over the baseline days) has come in
+NATIONAL_MIN_COVERAGE = 0.8
+NATIONAL_BASELINE_DAYS = 28
+
+STATE_ALIASES = {
+    'orissa': 'Odisha', 'pondicherry': 'Puducherry', 'nct of delhi': 'Delhi',
+    'uttaranchal': 'Uttarakhand', 'chattisgarh': 'Chhattisgarh', 'telengana': 'Telangana'
+}
+
+CROP_ALIASES = {
+    'apple': 'apples', 'banana': 'bananas', 'banana_green': 'bananas', 'grapes': 'grapes',
+    'lemon': 'lemons', 'lime': 'limes', 'mango': 'mangoes', 'mango_raw_ripe': 'mangoes',
+    'orange': 'oranges', 'papaya': 'papayas', 'pear': 'pears', 'pineapple': 'pineapples',
+    'strawberry': 'strawberries', 'carrot': 'carrots', 'cauliflower': 'cauliflower',
+    'potato': 'potatoes', 'tomato': 'tomatoes', 'lettuce': 'green_leaf_lettuce'
+}
+
+# Suffixes that name a yard rather than a different market
+_MARKET_NOISE = re.compile(r'\(.*?\)|\b(apmc|f&v|fruit and vegetable|veg|market|yard|grain)\b')
+
+
+def _simplify(value: str) -> str:
+    return re.sub(r'[^a-z0-9]+', ' ', _MARKET_NOISE.sub(' ', value.lower())).strip()
+
+
+def _header_key(column: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', column.strip().lower()).strip('_')
+
+
+class NameNormaliser:
+    """Maps raw crop, market and state spellings onto the app's canonical names"""
+
+    def __init__(self, states_markets: Dict[str, List[str]], crops: List[str]):
+        self.states = {state.lower(): state for state in states_markets}
+        self.states.update(STATE_ALIASES)
+        # Mandi names repeat across states (Aurangabad, Udaipur, Bilaspur), so
+        # markets resolve within their state; rows without one only match a
+        # name that a single state uses
+        self.markets = {}
+        spellings = {}
+        for state, markets in states_markets.items():
+            for market in markets:
+                simple = _simplify(market)
+                # Dumps say 'Azadpur' for 'Azadpur Mandi'
+                for spelling in (simple, re.sub(r'\s+mandi$', '', simple)):
+                    self.markets.setdefault(state, {}).setdefault(spelling, market)
+                    spellings.setdefault(spelling, set()).add(market)
+        self.markets[''] = {spelling: markets.pop() for spelling, markets in spellings.items() if len(markets) == 1}
+        self.crops = set(crops)
+        self._cache = {'crop': {}, 'market': {}, 'state': {}}
+
+    def crop(self, value: str) -> str:
+        """'Tomato', 'Potato (Red)' -> 'tomatoes', 'potatoes'; unknown crops keep a slug"""
+        slug = re.sub(r'[^a-z0-9]+', '_', re.sub(r'\(.*?\)', ' ', value.lower())).strip('_')
+        for candidate in (slug, CROP_ALIASES.get(slug), f"{slug}s", f"{slug}es"):
+            if candidate in self.crops:
+                return candidate
+        return slug
+
+    def market(self, value: str, state: str = '') -> str:
+        """
+        'Pune(Pimpri) APMC' in Maharashtra -> 'Pune'; unknown markets are
+        title-cased, never folded onto a known market of another state
+        """
+        simple = _simplify(value)
+        known = self.markets.get(state, {})
+        if simple in known:
+            return known[simple]
+        # 'Pune Gultekdi' is a yard of Pune, but only a market of the same state qualifies
+        first = simple.split(' ')[0] if simple and state else ''
+        if first in known:
+            return known[first]
+        return simple.title()
+
+    def state(self, value: str) -> str:
+        return self.states.get(value.strip().lower(), value.strip().title())
+
+    def map(self, kind: str, values: pd.Series) -> pd.Series:
+        """Normalise a column via its distinct values, memoised across chunks"""
+        cache = self._cache[kind]
+        for value in values.unique():
+            if value not in cache:
+                cache[value] = getattr(self, kind)(value) if isinstance(value, str) else ''
+        return values.map(cache)
+
+    def map_markets(self, values: pd.Series, states: pd.Series) -> pd.Series:
+        """Normalise the market column against each row's (normalised) state"""
+        cache = self._cache['market']
+        pairs = list(zip(values.tolist(), states.tolist()))
+        for value, state in set(pairs):
+            if (value, state) not in cache:
+                cache[(value, state)] = self.market(value, state) if isinstance(value, str) else ''
+        return pd.Series([cache[pair] for pair in pairs], index=values.index)
+
+
+def open_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Stream the file in chunks of raw string columns; compression is inferred"""
+    compression = 'infer'
+    if path.lower().endswith('.zip'):
+        compression = {'method': 'zip'}
+    reader = pd.read_csv(path, dtype=str, chunksize=chunk_size, compression=compression,
+                         skipinitialspace=True, on_bad_lines='skip')
+    for chunk in reader:
+        chunk.columns = [COLUMN_ALIASES.get(_header_key(column), _header_key(column)) for column in chunk.columns]
+        missing = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+        if missing:
+            raise ValueError(f"{path}: missing column(s) {', '.join(missing)}")
+        yield chunk
+
+
+def _numbers(chunk: pd.DataFrame, column: str) -> np.ndarray:
+    if column not in chunk.columns:
+        return np.full(len(chunk), np.nan)
+    values = pd.to_numeric(chunk[column], errors='coerce')
+    # Only the few values written with thousands separators need the slow path
+    retry = values.isna() & chunk[column].notna()
+    if retry.any():
+        values[retry] = pd.to_numeric(chunk.loc[retry, column].str.replace(',', '', regex=False), errors='coerce')
+    return values.to_numpy(float)
+
+
+def _dates(values: pd.Series) -> pd.Series:
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    for date_format in DATE_FORMATS:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(values[missing], format=date_format, errors='coerce')
+    return parsed
+
+
+def prepare_chunk(chunk: pd.DataFrame, names: NameNormaliser, divisor: float, stats: Dict) -> pd.DataFrame:
+    """Normalise, validate and merge one chunk into staging rows"""
+    states = names.map('state', chunk['state']) if 'state' in chunk.columns else pd.Series('', index=chunk.index)
+    frame = pd.DataFrame({
+        'crop': names.map('crop', chunk['crop']),
+        'market': names.map_markets(chunk['market'], states),
+        'state': states,
+        'date': _dates(chunk['date']),
+        'arrival_tonnes': _numbers(chunk, 'arrival_tonnes'),
+        'min_price': _numbers(chunk, 'min_price') / divisor,
+        'max_price': _numbers(chunk, 'max_price') / divisor,
+        'modal_price': _numbers(chunk, 'modal_price') / divisor
+    })
+
+    invalid = {
+        'bad_date': frame['date'].isna().to_numpy(),
+        'bad_price': ~(frame['modal_price'].to_numpy() > 0),
+        'missing_name': ((frame['crop'] == '') | (frame['market'] == '')).to_numpy()
+    }
+    keep = np.ones(len(frame), dtype=bool)
+    for reason, mask in invalid.items():
+        stats['rejected'][reason] += int((mask & keep).sum())
+        keep &= ~mask
+    frame = frame[keep]
+    # Series key as market_key(): same-named mandis of different states stay apart
+    frame = frame.assign(market=frame['market'].where(frame['state'] == '', frame['market'] + ', ' + frame['state']))
+    day = (frame['date'].to_numpy().astype('datetime64[D]') - np.datetime64('1970-01-01', 'D')).astype(np.int64)
+
+    # Several varieties of a crop are quoted per market and day: merge them,
+    # weighting the modal price by arrivals where they are known. The sums are
+    # kept so varieties in other chunks merge in the store the same way
+    weight = frame['arrival_tonnes'].fillna(0).clip(lower=0).to_numpy() + 1e-9
+    frame = frame.assign(day=day, weight=weight, weighted=frame['modal_price'].to_numpy() * weight)
+    merged = frame.groupby(['crop', 'market', 'day'], sort=False).agg(
+        state=('state', 'first'), arrival_tonnes=('arrival_tonnes', 'sum'), min_price=('min_price', 'min'),
+        max_price=('max_price', 'max'), weighted=('weighted', 'sum'), weight=('weight', 'sum'),
+        arrivals_known=('arrival_tonnes', 'count')
+    ).reset_index()
+    merged.loc[merged['arrivals_known'] == 0, 'arrival_tonnes'] = np.nan
+    # Key order turns the staging upsert into mostly-sequential B-tree appends
+    return merged.sort_values(['crop', 'market', 'day'])
+
+
+def file_fingerprint(path: str) -> str:
+    """Size, mtime and a hash of the first MiB: cheap, and enough to spot a changed dump"""
+    info = os.stat(path)
+    with open(path, 'rb') as handle:
+        head = hashlib.sha256(handle.read(1 << 20)).hexdigest()[:16]
+    return f"{info.st_size}:{int(info.st_mtime)}:{head}"
+
+
+def refresh_forecasts(store: PriceStore, rows: pd.DataFrame, directory: str = None) -> int:
+    """Fold newly stored rows into each affected series' model and the store's forecast table"""
+    observations = {
+        key: (group['day'].to_numpy(), group['modal_price'].to_numpy())
+        for key, group in rows.groupby(['crop', 'market'], sort=False)
+    }
+    updated = update_models(store, observations)
+    update_rows(updated, directory or table_dir(store))
+    return len(updated)
+
+
+def complete_national_days(store: PriceStore, crop: str, last_day: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Days after last_day, with their mean price, up to the first day that too
+    few markets have reported. A model never revisits a day it has applied, so
+    a mean over the few markets in one file would stick until the next refit.
+    """
+    days, values, counts = store.national_coverage(crop, last_day - NATIONAL_BASELINE_DAYS + 1)
+    baseline = counts[days <= last_day]
+    newer = days > last_day
+    if not len(baseline) or not newer.any():
+        return days[:0], values[:0]
+    complete = counts[newer] >= NATIONAL_MIN_COVERAGE * np.median(baseline)
+    run = len(complete) if complete.all() else int(np.argmin(complete))
+    return days[newer][:run], values[newer][:run]
+
+
+def refresh_national_forecasts(store: PriceStore, crops: Iterable[str], directory: str = None) -> int:
+    """Same for each affected crop's national series, over the days most markets have reported"""
+    models = store.load_models([(crop, NATIONAL_MARKET) for crop in crops])
+    observations = {key: complete_national_days(store, key[0], model['last_day']) for key, model in models.items()}
+    updated = update_models(store, observations)
+    update_rows(updated, directory or table_dir(store))
+    return len(updated)
+
+
+def ingest_file(path: str, store: PriceStore = price_store, unit: str = 'quintal',
+                chunk_size: int = 50000, force: bool = False, names: Optional[NameNormaliser] = None,
+                update_forecasts: bool = True, forecast_dir: str = None) -> Dict:
+    """
+    Load one dump into the store; returns row counts and throughput. Forecast
+    updates go to the store's table (see materialised_forecasts.table_dir)
+    unless forecast_dir says otherwise.
+    """
+    forecast_dir = forecast_dir or table_dir(store)
+    names = names or NameNormaliser(INDIAN_STATES_MARKETS, list(SAMPLE_PRICE_DATA))
+    fingerprint = file_fingerprint(path)
+    if not force and store.is_ingested(path, fingerprint):
+        print(f"{path}: already ingested, skipping (use --force to reload)")
+        return {'path': path, 'skipped': True}
+
+    stats = {'path': path, 'read': 0, 'stored': 0, 'merged': 0, 'forecasts_updated': 0,
+             'rejected': {'bad_date': 0, 'bad_price': 0, 'missing_name': 0}}
+    crops = set()
+    start = time.time()
+    # Chunks are staged and only merged into prices once the whole file is read,
+    # so a key's varieties merge the same way wherever the chunk boundaries fall
+    store.clear_staged()
+    for chunk in open_chunks(path, chunk_size):
+        stats['read'] += len(chunk)
+        rows = prepare_chunk(chunk, names, UNIT_DIVISORS[unit], stats)
+        # NaN becomes NULL for the optional columns
+        values = rows[list(STAGED_COLUMNS)].astype(object)
+        store.stage(values.where(values.notna(), None).itertuples(index=False, name=None))
+        elapsed = time.time() - start
+        print(f"  {stats['read']:,} rows read ({stats['read'] / elapsed:,.0f} rows/s)")
+
+    stats['stored'] = store.merge_staged()
+    stats['merged'] = stats['read'] - sum(stats['rejected'].values()) - stats['stored']
+    if update_forecasts:
+        for batch in store.staged_batches(chunk_size):
+            rows = pd.DataFrame(batch, columns=['crop', 'market', 'day', 'modal_price'])
+            stats['forecasts_updated'] += refresh_forecasts(store, rows, forecast_dir)
+            crops.update(rows['crop'].unique())
+    store.clear_staged()
+
+    if crops:
+        stats['forecasts_updated'] += refresh_national_forecasts(store, crops, forecast_dir)
+    stats['seconds'] = round(time.time() - start, 2)
+    stats['rows_per_second'] = round(stats['read'] / stats['seconds']) if stats['seconds'] else stats['read']
+    store.mark_ingested(path, fingerprint, stats['stored'])
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load Agmarknet-style mandi price dumps into the price store')
+    parser.add_argument('files', nargs='+', help='CSV files (optionally .gz/.bz2/.xz/.zip compressed)')
+    parser.add_argument('--unit', choices=list(UNIT_DIVISORS), default='quintal',
+                        help='Unit the prices in the file are quoted per (default: quintal)')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='Rows held in memory at a time')
+    parser.add_argument('--force', action='store_true', help='Reload files that were already ingested')
+    parser.add_argument('--no-forecast-update', action='store_true',
+                        help='Skip the incremental model and forecast updates (e.g. for historical backfills)')
+    parser.add_argument('--store', help='Price store path (default: PRICE_STORE_PATH or database/prices.db)')
+    parser.add_argument('--forecast-dir', help='Materialised forecast table to update (default: FORECAST_TABLE_DIR '
+                                               'for the shared store, else beside the store)')
+    args = parser.parse_args()
+
+    store = PriceStore(args.store) if args.store else price_store
+    names = NameNormaliser(INDIAN_STATES_MARKETS, list(SAMPLE_PRICE_DATA))
+    for path in args.files:
+        print(f"Ingesting {path}")
+        stats = ingest_file(path, store, args.unit, args.chunk_size, args.force, names,
+                            not args.no_forecast_update, args.forecast_dir)
+        if stats.get('skipped'):
+            continue
+        rejected = ', '.join(f"{reason} {count:,}" for reason, count in stats['rejected'].items())
+        print(f"{path}: {stats['read']:,} rows read, {stats['stored']:,} stored, {stats['merged']:,} merged, "
+              f"rejected: {rejected}, {stats['forecasts_updated']:,} forecasts updated "
+              f"in {stats['seconds']}s ({stats['rows_per_second']:,} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Price Forecasting Models for AgroMitra
+Fits seasonal-naive, Holt-Winters (additive, damped trend, weekly season)
+and ARIMA(p,1,0) models to every (crop, market) series in the price store,
+plus a national series per crop, keeps whichever forecast a held-out
+fortnight best and persists its parameters. Requests only evaluate the
+stored models; fitting runs offline across a process pool.
+
+Refit everything (e.g. nightly, after ingestion):
+    python price_models.py --processes 8
+    python price_models.py --crops tomatoes,onion
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from price_store import PriceStore, price_store, to_day, to_days
+
+NATIONAL_MARKET = '*'
+
+SEASON_LENGTH = 7        # Mandi prices follow the weekly market cycle
+HOLDOUT_DAYS = 14        # Fit on all but this, score the forecast of this
+MIN_OBSERVATIONS = 35    # Shorter series keep the trend forecast
+AR_ORDER = 7
+DAMPING = 0.98
+
+# Holt-Winters smoothing grid, searched for all combinations at once
+HW_ALPHAS = (0.1, 0.3, 0.5, 0.8)
+HW_BETAS = (0.01, 0.05, 0.15)
+HW_GAMMAS = (0.05, 0.15, 0.3)
+
+MODEL_NAMES = ('seasonal_naive', 'holt_winters', 'arima')
+
+# Recent one-step errors kept per model and resampled for forecast bands
+RESIDUAL_SAMPLE = 365
+DEFAULT_PATHS = 2000
+MIN_PATHS = 200
+# Paths x days per request; long horizons get fewer paths to stay fast
+PATH_DAY_BUDGET = 400_000
+# Simulated values held at once (series x paths x days) before batching series
+SIMULATION_BATCH = 4_000_000
+
+
+def daily_values(days: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Series on a gap-free daily grid; missing days (market holidays) interpolated"""
+    grid = np.arange(days[0], days[-1] + 1)
+    return np.interp(grid, days, values)
+
+
+def fit_seasonal_naive(y: np.ndarray) -> Dict:
+    errors = y[SEASON_LENGTH:] - y[:-SEASON_LENGTH]
+    return {'season': y[-SEASON_LENGTH:].tolist(), 'residual_sd': float(errors.std()),
+            'residuals': np.round(errors[-RESIDUAL_SAMPLE:], 3).tolist()}
+
+
+def fit_holt_winters(y: np.ndarray) -> Dict:
+    """Grid-search the smoothing constants; every combination runs in one vectorised recursion"""
+    m = SEASON_LENGTH
+    alpha, beta, gamma = (grid.ravel() for grid in np.meshgrid(HW_ALPHAS, HW_BETAS, HW_GAMMAS, indexing='ij'))
+    count = alpha.size
+    level = np.full(count, y[:m].mean())
+    trend = np.full(count, (y[m:2 * m].mean() - y[:m].mean()) / m)
+    season = np.tile(y[:m] - y[:m].mean(), (count, 1))
+    sse = np.zeros(count)
+    recent_errors = []
+    for t in range(m, len(y)):
+        slot = t % m
+        seasonal = season[:, slot]
+        error = y[t] - (level + DAMPING * trend + seasonal)
+        sse += error * error
+        if t >= len(y) - RESIDUAL_SAMPLE:
+            recent_errors.append(error)
+        new_level = alpha * (y[t] - seasonal) + (1 - alpha) * (level + DAMPING * trend)
+        trend = beta * (new_level - level) + (1 - beta) * DAMPING * trend
+        season[:, slot] = gamma * (y[t] - new_level) + (1 - gamma) * seasonal
+        level = new_level
+
+    best = int(np.argmin(sse))
+    # Rotate so season[0] is the day after the last observation
+    upcoming = season[best, (len(y) + np.arange(m)) % m]
+    return {
+        'level': float(level[best]), 'trend': float(trend[best]), 'phi': DAMPING,
+        'season': upcoming.tolist(),
+        'alpha': float(alpha[best]), 'beta': float(beta[best]), 'gamma': float(gamma[best]),
+        'residual_sd': float(np.sqrt(sse[best] / (len(y) - m))),
+        'residuals': np.round(np.array(recent_errors)[:, best], 3).tolist()
+    }
+
+
+def fit_arima(y: np.ndarray) -> Dict:
+    """ARIMA(AR_ORDER, 1, 0) with drift: least squares on the daily differences"""
+    diffs = np.diff(y)
+    p = AR_ORDER
+    lagged = np.lib.stride_tricks.sliding_window_view(diffs[:-1], p)[:, ::-1]
+    design = np.column_stack([np.ones(len(lagged)), lagged])
+    coef, *_ = np.linalg.lstsq(design, diffs[p:], rcond=None)
+    residuals = diffs[p:] - design @ coef
+    return {'coef': coef.tolist(), 'recent': diffs[-p:][::-1].tolist(), 'last': float(y[-1]),
+            'floor': float(y.min() * 0.5), 'ceiling': float(y.max() * 2),
+            'residual_sd': float(residuals.std()),
+            'residuals': np.round(residuals[-RESIDUAL_SAMPLE:], 3).tolist()}
+
+
+FITTERS = {'seasonal_naive': fit_seasonal_naive, 'holt_winters': fit_holt_winters, 'arima': fit_arima}
+
+
+def _forecast_group(name: str, params: List[Dict], horizon: int) -> np.ndarray:
+    """(len(params), horizon) forecasts for models of one kind"""
+    steps = np.arange(horizon)
+    if name == 'seasonal_naive':
+        season = np.array([p['season'] for p in params])
+        return season[:, steps % season.shape[1]]
+    if name == 'holt_winters':
+        level = np.array([p['level'] for p in params])
+        trend = np.array([p['trend'] for p in params])
+        phi = np.array([p['phi'] for p in params])
+        season = np.array([p['season'] for p in params])
+        damped = np.cumsum(phi[:, None] ** (steps + 1), axis=1)
+        return level[:, None] + trend[:, None] * damped + season[:, steps % season.shape[1]]
+    if name == 'arima':
+        coef = np.array([p['coef'] for p in params])
+        recent = np.array([p['recent'] for p in params])
+        level = np.array([p['last'] for p in params])
+        floor = np.array([p['floor'] for p in params])
+        ceiling = np.array([p['ceiling'] for p in params])
+        out = np.empty((len(params), horizon))
+        for step in range(horizon):
+            diff = coef[:, 0] + (coef[:, 1:] * recent).sum(axis=1)
+            level = np.clip(level + diff, floor, ceiling)
+            recent = np.column_stack([diff, recent[:, :-1]])
+            out[:, step] = level
+        return out
+    raise ValueError(f"Unknown model {name}")
+
+
+def forecast_models(models: Sequence[Dict], horizon: int) -> np.ndarray:
+    """Evaluate stored models, vectorised within each model kind; rows follow `models`"""
+    out = np.empty((len(models), horizon))
+    for name in MODEL_NAMES:
+        rows = [i for i, model in enumerate(models) if model['model'] == name]
+        if rows:
+            out[rows] = _forecast_group(name, [models[i]['params'] for i in rows], horizon)
+    return np.maximum(out, 0.0)
+
+
+def clamp_paths(paths, days: int) -> int:
+    """Sample path count limited to MIN_PATHS..PATH_DAY_BUDGET / days"""
+    return max(MIN_PATHS, min(int(paths), PATH_DAY_BUDGET // max(days, 1)))
+
+
+def _simulate_group(name: str, params: List[Dict], shocks: np.ndarray) -> np.ndarray:
+    """
+    Sample paths (len(params), horizon, paths) for models of one kind: each
+    model's recursion is run forward with shocks[:, h] as the day-h error,
+    every path of every model in the same array operation
+    """
+    count, horizon, paths = shocks.shape
+    if name == 'seasonal_naive':
+        # Each weekday slot is a random walk: its value plus the shocks so far
+        season = np.array([p['season'] for p in params])
+        m = season.shape[1]
+        weeks = -(-horizon // m)
+        padded = np.zeros((count, weeks * m, paths))
+        padded[:, :horizon] = shocks
+        walks = np.cumsum(padded.reshape(count, weeks, m, paths), axis=1).reshape(count, weeks * m, paths)
+        return walks[:, :horizon] + season[:, np.arange(horizon) % m, None]
+    out = np.empty(shocks.shape)
+    if name == 'holt_winters':
+        def column(key):
+            return np.array([p[key] for p in params])[:, None]
+        alpha, beta, gamma, phi = column('alpha'), column('beta'), column('gamma'), column('phi')
+        level = np.repeat(column('level'), paths, axis=1)
+        trend = np.repeat(column('trend'), paths, axis=1)
+        season = np.repeat(np.array([p['season'] for p in params])[:, :, None], paths, axis=2)
+        for step in range(horizon):
+            # Error-correction form of the updates in _step
+            slot, error = step % season.shape[1], shocks[:, step]
+            out[:, step] = level + phi * trend + season[:, slot] + error
+            level = level + phi * trend + alpha * error
+            trend = phi * trend + alpha * beta * error
+            season[:, slot] += gamma * (1 - alpha) * error
+        return out
+    if name == 'arima':
+        coef = np.array([p['coef'] for p in params])
+        p = coef.shape[1] - 1
+        # Differences oldest first, so step's lags are diffs[:, step:step + p]
+        diffs = np.empty((count, p + horizon, paths))
+        diffs[:, :p] = np.array([q['recent'][::-1] for q in params])[:, :, None]
+        lags = coef[:, :0:-1]
+        level = np.repeat(np.array([q['last'] for q in params])[:, None], paths, axis=1)
+        floor = np.array([q['floor'] for q in params])[:, None]
+        ceiling = np.array([q['ceiling'] for q in params])[:, None]
+        for step in range(horizon):
+            diff = coef[:, :1] + np.einsum('gk,gkp->gp', lags, diffs[:, step:step + p]) + shocks[:, step]
+            level = np.clip(level + diff, floor, ceiling)
+            diffs[:, p + step] = diff
+            out[:, step] = level
+        return out
+    raise ValueError(f"Unknown model {name}")
+
+
+def _residual_pools(models: Sequence[Dict], rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Residuals to resample per model, padded to a matrix, and how many each has.
+    Models fitted before residuals were stored draw from a normal sample with
+    their residual spread, or 5% of their first forecast.
+    """
+    pools = [model['params'].get('residuals') or [] for model in models]
+    missing = [i for i, pool in enumerate(pools) if len(pool) < SEASON_LENGTH]
+    if missing:
+        first = forecast_models([models[i] for i in missing], 1)[:, 0]
+        for i, fallback in zip(missing, first):
+            sd = models[i]['params'].get('residual_sd') or 0.05 * fallback
+            pools[i] = rng.normal(0.0, sd, RESIDUAL_SAMPLE)
+    lengths = np.array([len(pool) for pool in pools])
+    matrix = np.zeros((len(pools), lengths.max()))
+    for i, pool in enumerate(pools):
+        matrix[i, :len(pool)] = pool
+    return matrix, lengths
+
+
+def simulate_paths(models: Sequence[Dict], horizon: int, paths: int = DEFAULT_PATHS,
+                   seed: Optional[int] = 0) -> np.ndarray:
+    """
+    Bootstrap sample paths (len(models), horizon, paths): the models run
+    forward on one-step errors resampled from their own recent residuals.
+    A fixed seed keeps repeated requests' bands identical.
+    """
+    rng = np.random.default_rng(seed)
+    pools, lengths = _residual_pools(models, rng)
+    draws = rng.integers(0, lengths[:, None, None], (len(models), horizon, paths))
+    draws += (np.arange(len(models)) * pools.shape[1])[:, None, None]
+    shocks = np.take(pools, draws)
+    out = np.empty((len(models), horizon, paths))
+    for name in MODEL_NAMES:
+        rows = [i for i, model in enumerate(models) if model['model'] == name]
+        if rows:
+            out[rows] = _simulate_group(name, [models[i]['params'] for i in rows], shocks[rows])
+    return np.maximum(out, 0.0)
+
+
+def forecast_quantiles(models: Sequence[Dict], horizon: int, quantiles: Sequence[float] = (0.1, 0.5, 0.9),
+                       paths: int = DEFAULT_PATHS, seed: Optional[int] = 0) -> np.ndarray:
+    """
+    Forecast quantiles from simulated paths, shape (len(quantiles), len(models),
+    horizon), as order statistics of the paths (a partial sort, not a full one).
+    Series are simulated in batches of about SIMULATION_BATCH values.
+    """
+    ranks = [int(round(q * (paths - 1))) for q in quantiles]
+    out = np.empty((len(quantiles), len(models), horizon))
+    batch = max(1, SIMULATION_BATCH // (paths * horizon))
+    for start in range(0, len(models), batch):
+        simulated = simulate_paths(models[start:start + batch], horizon, paths, seed)
+        ordered = np.partition(simulated, sorted(set(ranks)), axis=2)
+        out[:, start:start + batch] = np.moveaxis(ordered[:, :, ranks], 2, 0)
+    return out
+
+
+def fit_series(days: np.ndarray, values: np.ndarray) -> Optional[Dict]:
+    """Pick the model with the lowest hold-out MAE, then refit it on the whole series"""
+    if len(values) < MIN_OBSERVATIONS:
+        return None
+    y = daily_values(days, values)
+    train, actual = y[:-HOLDOUT_DAYS], y[-HOLDOUT_DAYS:]
+    errors = {}
+    for name, fitter in FITTERS.items():
+        predicted = forecast_models([{'model': name, 'params': fitter(train)}], HOLDOUT_DAYS)[0]
+        errors[name] = float(np.abs(predicted - actual).mean())
+    best = min(errors, key=errors.get)
+    params = FITTERS[best](y)
+    params['holdout_mae'] = {name: round(error, 3) for name, error in errors.items()}
+    params['last_value'] = float(y[-1])
+    return {'model': best, 'params': params, 'last_day': int(days[-1]), 'observations': int(len(values)),
+            'mae': round(errors[best], 3)}
+
+
+def _step(name: str, params: Dict, y: float):
+    """Advance a fitted model by one observed day without refitting"""
+    if 'residuals' in params:
+        predicted = forecast_models([{'model': name, 'params': params}], 1)[0, 0]
+        params['residuals'] = params['residuals'][1 - RESIDUAL_SAMPLE:] + [round(y - predicted, 3)]
+    if name == 'seasonal_naive':
+        params['season'] = params['season'][1:] + [y]
+    elif name == 'holt_winters':
+        alpha, beta, gamma, phi = params['alpha'], params['beta'], params['gamma'], params['phi']
+        seasonal, level = params['season'][0], params['level']
+        new_level = alpha * (y - seasonal) + (1 - alpha) * (level + phi * params['trend'])
+        params['trend'] = beta * (new_level - level) + (1 - beta) * phi * params['trend']
+        # season[0] is always the next day, so today's component moves to the back
+        params['season'] = params['season'][1:] + [gamma * (y - new_level) + (1 - gamma) * seasonal]
+        params['level'] = new_level
+    elif name == 'arima':
+        diff = y - params['last']
+        params['recent'] = [diff] + params['recent'][:-1]
+        params['last'] = y
+        params['floor'] = min(params['floor'], y * 0.5)
+        params['ceiling'] = max(params['ceiling'], y * 2)
+    params['last_value'] = y
+
+
+def update_model(model: Dict, days: np.ndarray, values: np.ndarray) -> int:
+    """
+    Fold observations newer than the model's last day into its state, O(1)
+    per day; gaps are interpolated as in fitting. Older days (corrections)
+    are left for the next refit. Returns the number of days applied.
+    """
+    newer = days > model['last_day']
+    if not newer.any():
+        return 0
+    days, values = days[newer], values[newer]
+    order = np.argsort(days)
+    days, values = days[order], values[order]
+    last_value = model['params'].get('last_value', float(values[0]))
+    grid = np.arange(model['last_day'] + 1, days[-1] + 1)
+    filled = np.interp(grid, np.concatenate([[model['last_day']], days]), np.concatenate([[last_value], values]))
+    for y in filled.tolist():
+        _step(model['model'], model['params'], y)
+    model['last_day'] = int(days[-1])
+    model['observations'] = (model.get('observations') or 0) + len(days)
+    return len(grid)
+
+
+def update_models(store: PriceStore, observations: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]]) -> Dict:
+    """
+    Apply new (days, modal prices) per (crop, market) key to the stored
+    models and save the ones that changed; returns them by key
+    """
+    models = store.load_models(list(observations))
+    updated = {}
+    for key, model in models.items():
+        days, values = observations[key]
+        if update_model(model, days, values):
+            updated[key] = model
+    if updated:
+        store.save_models([(crop, market, model) for (crop, market), model in updated.items()])
+    return updated
+
+
+_worker_store = None
+
+
+def _init_worker(path: str):
+    global _worker_store
+    _worker_store = PriceStore(path)
+
+
+def _fit_keys(keys: List[Tuple[str, str]]) -> List[Tuple]:
+    fitted = []
+    for crop, market in keys:
+        if market == NATIONAL_MARKET:
+            days, values = _worker_store.national_series(crop)
+        else:
+            series = _worker_store.series(crop, market)
+            days, values = to_days(series['dates']), series['modal_price']
+        model = fit_series(days, values)
+        if model:
+            fitted.append((crop, market, model))
+    return fitted
+
+
+def refit_all(store: PriceStore = price_store, processes: int = None, crops: List[str] = None,
+              batch_size: int = 64) -> Dict:
+    """Fit every series (and each crop's national series) across a process pool"""
+    keys = [key for key in store.series_keys() if not crops or key[0] in crops]
+    keys += [(crop, NATIONAL_MARKET) for crop in sorted({crop for crop, _ in keys})]
+    batches = [keys[i:i + batch_size] for i in range(0, len(keys), batch_size)]
+    start = time.time()
+    stats = {'series': len(keys), 'fitted': 0, 'by_model': {name: 0 for name in MODEL_NAMES}}
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count(), initializer=_init_worker,
+                             initargs=(store.path,)) as pool:
+        for fitted in pool.map(_fit_keys, batches):
+            store.save_models(fitted)
+            stats['fitted'] += len(fitted)
+            for _, _, model in fitted:
+                stats['by_model'][model['model']] += 1
+    stats['seconds'] = round(time.time() - start, 2)
+    return stats
+
+
+def model_forecasts(store: PriceStore, keys: List[Tuple[str, str]], days: int,
+                    today: date = None) -> Tuple[np.ndarray, List[Optional[str]]]:
+    """
+    Forecasts for tomorrow onwards per (crop, market) key: (len(keys), days)
+    with NaN rows where no model is stored, plus the model name per key
+    """
+    out = np.full((len(keys), days), np.nan)
+    names = [None] * len(keys)
+    models = store.load_models(keys)
+    found = [i for i, key in enumerate(keys) if key in models]
+    if not found:
+        return out, names
+
+    # Models end on their last observed day; skip ahead to tomorrow
+    today_day = to_day(today or date.today())
+    offsets = np.array([max(0, today_day - models[keys[i]]['last_day']) for i in found])
+    horizon = int(offsets.max()) + days
+    forecasts = forecast_models([models[keys[i]] for i in found], horizon)
+    columns = offsets[:, None] + np.arange(days)
+    out[found] = np.take_along_axis(forecasts, columns, axis=1)
+    for i in found:
+        names[i] = models[keys[i]]['model']
+    return out, names
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Refit price forecasting models for every crop x market series')
+    parser.add_argument('--processes', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--crops', help='Comma-separated crops to refit (default: all)')
+    parser.add_argument('--store', help='Price store path (default: PRICE_STORE_PATH or database/prices.db)')
+    args = parser.parse_args()
+
+    store = PriceStore(args.store) if args.store else price_store
+    crops = [crop.strip() for crop in args.crops.split(',')] if args.crops else None
+    stats = refit_all(store, args.processes, crops)
+    by_model = ', '.join(f"{name} {count}" for name, count in stats['by_model'].items())
+    print(f"Fitted {stats['fitted']} of {stats['series']} series in {stats['seconds']}s ({by_model})")
+
+
+if __name__ == '__main__':
+    main()
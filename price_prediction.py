@@ -2,9 +2,19 @@ from flask import Blueprint, request, jsonify
 import requests
 import json
 import pandas as pd
-from datetime import datetime, timedelta
+import numpy as np
+import math
+from datetime import date, datetime
 import os
 
+from price_forecast import (MAX_BAND_SERIES, MAX_COMPARE_SERIES, MAX_FORECAST_DAYS, MAX_PREDICTION_POINTS,
+                            clamp_days, forecast_dates, market_factor, summarise, trend_forecast)
+from price_store import market_key, price_store, to_day
+from price_models import DEFAULT_PATHS, NATIONAL_MARKET, clamp_paths, forecast_quantiles, model_forecasts
+from materialised_forecasts import materialised_forecasts
+from market_geo import (DEFAULT_MARKET_LIMIT, DEFAULT_RADIUS_KM, FREIGHT_RATE_PER_TONNE_KM, MANDI_CHARGES_RATE,
+                        ROAD_CIRCUITY, market_index, net_realisation, transport_cost, valid_location)
+
 price_bp = Blueprint('price', __name__)
 
 # Indian States and their major agricultural markets
@@ -43,6 +53,30 @@ INDIAN_STATES_MARKETS = {
     'Puducherry': ['Puducherry', 'Karaikal', 'Mahe', 'Yanam']
 }
 
+# States listing each market name; some names (Aurangabad, Tezpur, Udaipur) are in several
+MARKET_STATES = {
+    market: [state for state, names in INDIAN_STATES_MARKETS.items() if market in names]
+    for markets in INDIAN_STATES_MARKETS.values() for market in markets
+}
+
+def series_market(market, state=None):
+    """
+    Store key of a market's series. Without a state, the market list supplies
+    it when only one state has a market of that name
+    """
+    if not market:
+        return None
+    if not state and len(MARKET_STATES.get(market, [])) == 1:
+        state = MARKET_STATES[market][0]
+    return market_key(market, state)
+
+def are_names(values, allow_none=False):
+    """
+    True when every entry is a string (or None, if allowed). Request names are
+    used as dict keys, so anything else is rejected before it can raise
+    """
+    return all(isinstance(value, str) or (allow_none and value is None) for value in values)
+
 # Market-specific price variations (percentage difference from base price)
 MARKET_PRICE_VARIATIONS = {
     'Mumbai': {'factor': 1.15, 'reason': 'Metropolitan demand'},
@@ -100,93 +134,305 @@ class PricePredictor:
         
     def fetch_kaggle_data(self):
         """
-        Fetch data from Kaggle kernel output
+        Current price and trend per crop: from the mandi price store once it
+        holds data, otherwise the bundled sample prices
         """
         try:
-            # This would typically use Kaggle API
-            # For now, using sample data
-            return SAMPLE_PRICE_DATA
+            snapshot = price_store.snapshot()
+            if snapshot:
+                return snapshot
+        except Exception as e:
+            print(f"Error reading price store: {e}")
+        return SAMPLE_PRICE_DATA
+    
+    def observed_prices(self, crop_names, markets):
+        """Latest stored mandi price per crop x market (NaN where none)"""
+        markets = [market or '' for market in markets]
+        try:
+            return price_store.latest_matrix(list(crop_names), markets)
         except Exception as e:
-            print(f"Error fetching Kaggle data: {e}")
-            return SAMPLE_PRICE_DATA
+            print(f"Error reading price store: {e}")
+            return np.full((len(crop_names), len(markets)), np.nan)
     
-    def predict_price(self, crop_name, days=30, state=None, market=None):
+    def predict_price(self, crop_name, days=30, state=None, market=None, bands=False, paths=DEFAULT_PATHS):
         """
         Predict future price for a crop with location-specific adjustments
         """
-        crop_name = crop_name.lower()
+        return self.predict_many([crop_name], days, state, [market], bands=bands, paths=paths)[0]
+    
+    def fitted_forecasts(self, crop_names, markets, ratio, days):
+        """
+        Forecasts from the stored models: a market's own model, else the crop's
+        national model scaled by the market's price ratio; NaN where neither exists.
+        Read from the materialised table when it covers the horizon, else the
+        models are evaluated live. Also returns the table's generation time.
+        """
+        crops, width = len(crop_names), len(markets)
+        keys = [(crop, market or NATIONAL_MARKET) for crop in crop_names for market in markets]
+        national = [(crop, NATIONAL_MARKET) for crop in crop_names]
+        generated_at = None
+        try:
+            looked_up = materialised_forecasts.lookup(keys + national, days)
+            if looked_up:
+                forecasts, models, generated_at = looked_up
+            else:
+                forecasts, models = model_forecasts(price_store, keys + national, days)
+        except Exception as e:
+            print(f"Error evaluating forecast models: {e}")
+            return (np.full((crops, width, days), np.nan), np.full((crops, width), None, dtype=object),
+                    None)
+        
+        own = forecasts[:len(keys)].reshape(crops, width, days)
+        scaled = forecasts[len(keys):][:, None, :] * ratio[..., None]
+        names = np.array(models[:len(keys)], dtype=object).reshape(crops, width)
+        national_names = np.array(models[len(keys):], dtype=object)[:, None]
+        return (np.where(np.isnan(own), scaled, own),
+                np.where(names == None, national_names, names),  # noqa: E711 (elementwise)
+                generated_at)
+    
+    def forecast_bands(self, crop_names, markets, ratio, days, paths):
+        """
+        P10/P50/P90 per day, shape (3, crops, markets, days), simulated from the
+        same model fitted_forecasts picks (a national band is scaled by the
+        market's price ratio); NaN where no model is stored. Also returns the
+        path count used, capped for long (or stale) horizons.
+        """
+        out = np.full((3, len(crop_names), len(markets), days), np.nan)
+        keys = [(crop, market or NATIONAL_MARKET) for crop in crop_names for market in markets]
+        try:
+            models = price_store.load_models(keys + [(crop, NATIONAL_MARKET) for crop in crop_names])
+        except Exception as e:
+            print(f"Error loading forecast models: {e}")
+            return out, 0
+        
+        # Simulate each distinct model once, from its last observed day on
+        chosen = {}
+        for i, crop in enumerate(crop_names):
+            for j, market in enumerate(markets):
+                own = (crop, market or NATIONAL_MARKET)
+                if own in models:
+                    chosen[(i, j)] = (own, 1.0)
+                elif (crop, NATIONAL_MARKET) in models:
+                    chosen[(i, j)] = ((crop, NATIONAL_MARKET), float(ratio[i, j]))
+        if not chosen:
+            return out, 0
+        simulated = sorted({key for key, _ in chosen.values()})
+        row = {key: k for k, key in enumerate(simulated)}
+        offsets = np.array([max(0, to_day(date.today()) - models[key]['last_day']) for key in simulated])
+        horizon = int(offsets.max()) + days
+        paths = clamp_paths(paths, horizon)
+        quantiles = forecast_quantiles([models[key] for key in simulated], horizon, (0.1, 0.5, 0.9), paths)
+        for (i, j), (key, scale) in chosen.items():
+            k = row[key]
+            out[:, i, j] = quantiles[:, k, offsets[k]:offsets[k] + days] * scale
+        return out, paths
+    
+    def forecast_matrix(self, crop_names, days, state=None, markets=None, market_states=None):
+        """
+        Forecasts for every known crop x market pair in one vectorised pass, as
+        arrays: prices (crops, markets, days), current and observed prices, the
+        model and market factor per pair. Markets are in `state`, or each in
+        its entry of market_states.
+        """
+        markets = list(markets) if markets else [None]
+        series = [series_market(market, market_states[j] if market_states else state)
+                  for j, market in enumerate(markets)]
         data = self.fetch_kaggle_data()
+        known = [name for name in dict.fromkeys(str(crop).lower() for crop in crop_names) if name in data]
+        factors = [market_factor(market, state, MARKET_PRICE_VARIATIONS) for market in markets]
+        source = 'sample' if data is SAMPLE_PRICE_DATA else 'price_store'
         
-        if crop_name in data:
-            crop_data = data[crop_name]
-            
-            # Apply market-specific price adjustments
-            market_factor = 1.0
-            market_info = ""
-            if market and market in MARKET_PRICE_VARIATIONS:
-                market_factor = MARKET_PRICE_VARIATIONS[market]['factor']
-                market_info = MARKET_PRICE_VARIATIONS[market]['reason']
-            elif state and market:
-                # Default adjustment for unlisted markets
-                market_factor = 0.95  # Slightly lower for rural markets
-                market_info = "Rural market adjustment"
-            
-            # Calculate adjusted base price
-            adjusted_base_price = crop_data['current'] * market_factor
-            
-            # Generate price prediction for specified days
-            predictions = []
-            trend = crop_data['trend']
-            
-            for day in range(1, days + 1):
-                if trend == 'up':
-                    price = adjusted_base_price + (day * 0.5)
-                elif trend == 'down':
-                    price = adjusted_base_price - (day * 0.3)
-                else:
-                    price = adjusted_base_price + ((-1) ** day * 0.2)
-                
-                predictions.append({
-                    'day': day,
-                    'date': (datetime.now() + timedelta(days=day)).strftime('%Y-%m-%d'),
-                    'predicted_price': round(price, 2)
-                })
-            
-            # Calculate min, max, and modal price from predictions
-            price_values = [p['predicted_price'] for p in predictions]
-            min_price = min(price_values)
-            max_price = max(price_values)
-            
-            # Calculate modal price (most frequent, rounded to nearest rupee)
-            from collections import Counter
-            rounded_prices = [round(p) for p in price_values]
-            price_counter = Counter(rounded_prices)
-            modal_price = price_counter.most_common(1)[0][0] if price_counter else round(adjusted_base_price)
-            
-            # Calculate average predicted price
-            avg_predicted_price = round(sum(price_values) / len(price_values), 2)
-            
-            return {
-                'success': True,
-                'crop': crop_name,
-                'state': state,
-                'market': market,
-                'current_price': round(adjusted_base_price, 2),
-                'base_price': crop_data['current'],
-                'market_factor': round(market_factor, 2),
-                'market_info': market_info,
-                'trend': crop_data['trend'],
-                'predictions': predictions,
-                'average_predicted_price': avg_predicted_price,
-                'min_price': min_price,
-                'max_price': max_price,
-                'modal_price': modal_price
-            }
-        else:
-            return {
-                'success': False,
-                'error': 'Crop not found in database'
+        base = np.array([data[name]['current'] for name in known], dtype=float)
+        factor = np.array([f for f, _ in factors])
+        adjusted = base[:, None] * factor[None, :]
+        observed = np.full(adjusted.shape, np.nan)
+        if source == 'price_store' and known:
+            # A market's own latest price beats a factor on the national one
+            observed = self.observed_prices(known, series)
+            adjusted = np.where(np.isnan(observed), adjusted, observed)
+        prices = trend_forecast(adjusted, [data[name]['trend'] for name in known], days)
+        models = np.full(adjusted.shape, 'trend', dtype=object)
+        ratio = adjusted / base[:, None] if known else adjusted
+        generated_at = None
+        if source == 'price_store' and known:
+            fitted, fitted_models, generated_at = self.fitted_forecasts(known, series, ratio, days)
+            has_model = ~np.isnan(fitted[..., 0])
+            prices = np.where(has_model[..., None], np.round(fitted, 2), prices)
+            models = np.where(has_model, fitted_models, models)
+        return {
+            'data': data, 'source': source, 'crops': known, 'markets': markets, 'series': series, 'factors': factors,
+            'current': adjusted, 'observed': observed, 'ratio': ratio, 'prices': prices, 'models': models,
+            'generated_at': generated_at
+        }
+    
+    def predict_many(self, crop_names, days=30, state=None, markets=None, include_predictions=True,
+                     bands=False, paths=DEFAULT_PATHS):
+        """
+        Predict prices for every crop x market pair in one vectorised pass;
+        returns one predict_price-style result per pair, crops outermost.
+        With bands, fitted series also get simulated P10/P50/P90 per day.
+        """
+        days = clamp_days(days)
+        names = [str(crop).lower() for crop in crop_names]
+        matrix = self.forecast_matrix(names, days, state, markets)
+        data, source, generated_at = matrix['data'], matrix['source'], matrix['generated_at']
+        known, markets, factors = matrix['crops'], matrix['markets'], matrix['factors']
+        adjusted, observed, prices, models = matrix['current'], matrix['observed'], matrix['prices'], matrix['models']
+        
+        if known:
+            quantiles = np.full((3,) + prices.shape, np.nan)
+            if bands and source == 'price_store' and (models != 'trend').any():
+                quantiles, paths = self.forecast_bands(known, matrix['series'], matrix['ratio'], days, paths)
+                quantiles = np.round(quantiles, 2)
+            stats = summarise(prices)
+            dates = forecast_dates(days) if include_predictions else None
+        
+        results = []
+        row = {name: i for i, name in enumerate(known)}
+        for name in names:
+            if name not in row:
+                results.extend({'success': False, 'error': 'Crop not found in database'} for _ in markets)
+                continue
+            i = row[name]
+            crop_data = data[name]
+            for j, market in enumerate(markets):
+                is_observed = not np.isnan(observed[i, j])
+                result = {
+                    'success': True,
+                    'crop': name,
+                    'state': state,
+                    'market': market,
+                    'current_price': round(float(adjusted[i, j]), 2),
+                    'base_price': crop_data['current'],
+                    'market_factor': round(float(adjusted[i, j]) / crop_data['current'], 2) if is_observed
+                                     else round(factors[j][0], 2),
+                    'market_info': 'Observed mandi price' if is_observed else factors[j][1],
+                    'trend': crop_data['trend'],
+                    'model': models[i, j],
+                    'forecast_generated_at': generated_at if models[i, j] != 'trend' else None,
+                    'data_source': source,
+                    'as_of': crop_data.get('as_of'),
+                    'days': days,
+                    'average_predicted_price': float(stats['mean'][i, j]),
+                    'min_price': float(stats['min'][i, j]),
+                    'max_price': float(stats['max'][i, j]),
+                    'modal_price': int(stats['mode'][i, j])
+                }
+                if bands:
+                    # Trend-only series have no residuals to simulate from
+                    has_band = not np.isnan(quantiles[0, i, j, 0])
+                    result['bands'] = {
+                        'paths': paths,
+                        'p10': quantiles[0, i, j].tolist(),
+                        'p50': quantiles[1, i, j].tolist(),
+                        'p90': quantiles[2, i, j].tolist()
+                    } if has_band else None
+                if include_predictions:
+                    result['predictions'] = [
+                        {'day': day, 'date': dates[day - 1], 'predicted_price': price}
+                        for day, price in enumerate(prices[i, j].tolist(), start=1)
+                    ]
+                results.append(result)
+        return results
+    
+    def compare(self, crop_names, markets=None, days=30, state=None):
+        """
+        Crops x markets comparison over a horizon as columnar arrays: one row
+        per crop, one column per market, no per-pair objects
+        """
+        days = clamp_days(days)
+        matrix = self.forecast_matrix(crop_names, days, state, markets)
+        known, markets, data = matrix['crops'], matrix['markets'], matrix['data']
+        prices, current = matrix['prices'], matrix['current']
+        final = prices[..., -1]
+        average = prices.mean(axis=-1)
+        change = np.divide(final - current, current, out=np.zeros_like(current), where=current > 0) * 100
+        best = average.argmax(axis=1) if known else np.array([], dtype=int)
+        missing = [crop for crop in dict.fromkeys(str(crop).lower() for crop in crop_names) if crop not in data]
+        
+        def table(values, decimals=2):
+            return np.round(values, decimals).tolist()
+        
+        return {
+            'success': True,
+            'days': days,
+            'state': state,
+            'data_source': matrix['source'],
+            'forecast_generated_at': matrix['generated_at'],
+            'crops': known,
+            'markets': markets,
+            'not_found': missing,
+            'trend': [data[crop]['trend'] for crop in known],
+            'as_of': [data[crop].get('as_of') for crop in known],
+            'current_price': table(current),
+            'observed': (~np.isnan(matrix['observed'])).tolist(),
+            'predicted_price': table(average),
+            'final_price': table(final),
+            'min_price': table(prices.min(axis=-1)),
+            'max_price': table(prices.max(axis=-1)),
+            'change_percent': table(change, 1),
+            'model': matrix['models'].tolist(),
+            'best_market': [markets[j] for j in best.tolist()],
+            'best_price': table(average[np.arange(len(known)), best])
+        }
+    
+    def best_markets(self, crop_name, lat, lon, days=7, state=None, radius_km=DEFAULT_RADIUS_KM,
+                     limit=DEFAULT_MARKET_LIMIT, rate_per_tonne_km=FREIGHT_RATE_PER_TONNE_KM, quantity_kg=None):
+        """
+        Markets near (lat, lon) ranked by net realisation: the best of selling
+        today or on any forecast day, less mandi charges and transport, scored
+        for every candidate market x day in one array operation
+        """
+        days = clamp_days(days)
+        rows, km = market_index.nearby(lat, lon, radius_km, limit)
+        markets = [market_index.markets[row] for row in rows]
+        matrix = self.forecast_matrix([crop_name], days, state, markets,
+                                      [market_index.states[row] for row in rows])
+        if not matrix['crops']:
+            return {'success': False, 'error': 'Crop not found in database'}
+        
+        road_km = km * ROAD_CIRCUITY
+        # Column 0 is selling today at the current price
+        options = np.column_stack([matrix['current'][0], matrix['prices'][0]])
+        net = net_realisation(options, road_km, rate_per_tonne_km)
+        best_day = net.argmax(axis=1)
+        best_net = net[np.arange(len(markets)), best_day]
+        sale_price = options[np.arange(len(markets)), best_day]
+        freight = transport_cost(road_km, rate_per_tonne_km)
+        dates = [datetime.now().strftime('%Y-%m-%d')] + forecast_dates(days)
+        
+        ranked = []
+        for k in np.argsort(-best_net, kind='stable')[:limit].tolist():
+            day = int(best_day[k])
+            entry = {
+                'market': markets[k],
+                'state': market_index.states[rows[k]],
+                'distance_km': round(float(road_km[k]), 1),
+                'current_price': round(float(options[k, 0]), 2),
+                'observed': not np.isnan(matrix['observed'][0, k]),
+                'model': matrix['models'][0, k],
+                'sell_in_days': day,
+                'sell_date': dates[day],
+                'sale_price': round(float(sale_price[k]), 2),
+                'mandi_charges_per_kg': round(float(sale_price[k] * MANDI_CHARGES_RATE), 2),
+                'transport_cost_per_kg': round(float(freight[k]), 2),
+                'net_price_per_kg': round(float(best_net[k]), 2),
+                'net_today_per_kg': round(float(net[k, 0]), 2)
             }
+            if quantity_kg:
+                entry['net_total'] = round(float(best_net[k]) * quantity_kg, 2)
+            ranked.append(entry)
+        
+        return {
+            'success': True,
+            'crop': matrix['crops'][0],
+            'origin': {'lat': lat, 'lon': lon},
+            'days': days,
+            'radius_km': radius_km,
+            'candidates': len(markets),
+            'data_source': matrix['source'],
+            'markets': ranked
+        }
     
     def get_market_prices(self, state=None, market=None):
         """
@@ -204,11 +450,18 @@ class PricePredictor:
             market_factor = 0.95  # Default rural market adjustment
             market_info = "Rural market prices"
         
+        source = 'sample' if data is SAMPLE_PRICE_DATA else 'price_store'
+        crops = list(data)
+        observed = np.full(len(crops), np.nan)
+        if source == 'price_store' and market:
+            observed = self.observed_prices(crops, [series_market(market, state)])[:, 0]
+        
         market_prices = []
-        for crop, info in data.items():
+        for crop, info, observed_price in zip(crops, data.values(), observed.tolist()):
             # Format crop name properly
             crop_display = crop.replace('_', ' ').title()
-            adjusted_price = round(info['current'] * market_factor, 2)
+            is_observed = not np.isnan(observed_price)
+            adjusted_price = round(observed_price if is_observed else info['current'] * market_factor, 2)
             
             market_prices.append({
                 'crop': crop_display,
@@ -217,8 +470,9 @@ class PricePredictor:
                 'price': adjusted_price,  # For backward compatibility
                 'unit': 'per kg',
                 'trend': info['trend'],
-                'market_factor': round(market_factor, 2),
-                'last_updated': datetime.now().strftime('%Y-%m-%d')
+                'market_factor': round(adjusted_price / info['current'], 2) if is_observed else round(market_factor, 2),
+                'observed': is_observed,
+                'last_updated': info.get('as_of') or datetime.now().strftime('%Y-%m-%d')
             })
         
         # Sort by crop name
@@ -230,6 +484,7 @@ class PricePredictor:
             'market': market,
             'market_info': market_info,
             'market_factor': round(market_factor, 2),
+            'data_source': source,
             'prices': market_prices
         }
 
@@ -250,14 +505,73 @@ def predict_price():
     days = data.get('days', 30)
     state = data.get('state')
     market = data.get('market')
+    bands = bool(data.get('bands', False))
     
-    result = predictor.predict_price(crop_name, days, state, market)
+    try:
+        days = int(days)
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': f'days must be an integer (1-{MAX_FORECAST_DAYS})'}), 400
+    try:
+        paths = int(data.get('paths', DEFAULT_PATHS))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'paths must be an integer'}), 400
+    
+    result = predictor.predict_price(crop_name, days, state, market, bands, paths)
     
     if result['success']:
         return jsonify(result), 200
     else:
         return jsonify(result), 404
 
+@price_bp.route('/predict/batch', methods=['POST'])
+def predict_prices_batch():
+    """
+    Predict prices for several crops across several markets in one call
+    """
+    data = request.get_json()
+    
+    if not data or not data.get('crops'):
+        return jsonify({'success': False, 'error': 'Crops list is required'}), 400
+    
+    try:
+        days = int(data.get('days', 30))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': f'days must be an integer (1-{MAX_FORECAST_DAYS})'}), 400
+    try:
+        paths = int(data.get('paths', DEFAULT_PATHS))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'paths must be an integer'}), 400
+    
+    crops = data['crops']
+    state = data.get('state')
+    markets = data.get('markets') or [data.get('market')]
+    include_predictions = bool(data.get('include_predictions', True))
+    bands = bool(data.get('bands', False))
+    if not isinstance(crops, list) or not isinstance(markets, list):
+        return jsonify({'success': False, 'error': 'crops and markets must be lists'}), 400
+    if not are_names(crops) or not are_names(markets, allow_none=True) or not are_names([state], allow_none=True):
+        return jsonify({'success': False, 'error': 'crops, markets and state must be names (strings)'}), 400
+    
+    pairs = len(crops) * len(markets)
+    if pairs > MAX_COMPARE_SERIES:
+        return jsonify({'success': False,
+                        'error': f'At most {MAX_COMPARE_SERIES} crop x market pairs per request'}), 400
+    if include_predictions and pairs * clamp_days(days) > MAX_PREDICTION_POINTS:
+        return jsonify({'success': False,
+                        'error': f'At most {MAX_PREDICTION_POINTS} daily predictions (pairs x days) per request; '
+                                 'set include_predictions to false for summaries only'}), 400
+    if bands and pairs > MAX_BAND_SERIES:
+        return jsonify({'success': False, 'error': f'At most {MAX_BAND_SERIES} crop x market pairs with bands'}), 400
+    
+    results = predictor.predict_many(crops, days, state, markets, include_predictions, bands, paths)
+    
+    return jsonify({
+        'success': True,
+        'days': clamp_days(days),
+        'state': state,
+        'results': results
+    }), 200
+
 @price_bp.route('/market-prices', methods=['GET'])
 def get_market_prices():
     """
@@ -269,6 +583,96 @@ def get_market_prices():
     result = predictor.get_market_prices(state, market)
     return jsonify(result), 200
 
+@price_bp.route('/forecast-status', methods=['GET'])
+def get_forecast_status():
+    """
+    Price store coverage and freshness of the materialised forecasts
+    """
+    try:
+        store = price_store.status()
+    except Exception as e:
+        store = {'error': str(e)}
+    return jsonify({
+        'success': True,
+        'price_store': store,
+        'materialised_forecasts': materialised_forecasts.status()
+    }), 200
+
+@price_bp.route('/best-markets', methods=['POST'])
+def find_best_markets():
+    """
+    Best nearby markets to sell a crop in, by forecast price net of transport
+    and mandi charges, from the farmer's lat/lon (or a market or state)
+    """
+    data = request.get_json()
+    
+    if not data or 'crop' not in data:
+        return jsonify({'success': False, 'error': 'Crop name is required'}), 400
+    
+    try:
+        days = int(data.get('days', 7))
+        radius_km = float(data.get('radius_km', DEFAULT_RADIUS_KM))
+        limit = max(1, int(data.get('limit', DEFAULT_MARKET_LIMIT)))
+        rate = float(data.get('rate_per_tonne_km', FREIGHT_RATE_PER_TONNE_KM))
+        quantity_kg = float(data['quantity_kg']) if data.get('quantity_kg') else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'days, radius_km, limit, rate_per_tonne_km and quantity_kg '
+                                                   'must be numbers'}), 400
+    if not all(math.isfinite(value) and value >= 0 for value in (radius_km, rate, quantity_kg or 0.0)):
+        return jsonify({'success': False, 'error': 'radius_km, rate_per_tonne_km and quantity_kg '
+                                                   'must be finite and non-negative'}), 400
+    
+    state = data.get('state')
+    if data.get('lat') is not None and data.get('lon') is not None:
+        try:
+            origin = float(data['lat']), float(data['lon'])
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'lat and lon must be numbers'}), 400
+        if not valid_location(*origin):
+            return jsonify({'success': False, 'error': 'lat and lon must be finite, within -90..90 and -180..180'}), 400
+    else:
+        origin = market_index.locate(data.get('market'), state)
+        if origin is None:
+            return jsonify({'success': False, 'error': 'lat/lon, or a known market or state, is required'}), 400
+    
+    result = predictor.best_markets(data['crop'], origin[0], origin[1], days, state, radius_km, limit, rate,
+                                    quantity_kg)
+    
+    if result['success']:
+        return jsonify(result), 200
+    else:
+        return jsonify(result), 404
+
+@price_bp.route('/nearby-markets', methods=['GET'])
+def get_nearby_markets():
+    """
+    Markets within radius_km of lat/lon, nearest first
+    """
+    try:
+        lat = float(request.args['lat'])
+        lon = float(request.args['lon'])
+        radius_km = float(request.args.get('radius_km', DEFAULT_RADIUS_KM))
+        limit = max(1, int(request.args.get('limit', DEFAULT_MARKET_LIMIT)))
+    except (KeyError, ValueError):
+        return jsonify({'success': False, 'error': 'lat and lon are required numbers'}), 400
+    if not valid_location(lat, lon):
+        return jsonify({'success': False, 'error': 'lat and lon must be finite, within -90..90 and -180..180'}), 400
+    if not (math.isfinite(radius_km) and radius_km >= 0):
+        return jsonify({'success': False, 'error': 'radius_km must be finite and non-negative'}), 400
+    
+    rows, km = market_index.nearby(lat, lon, radius_km, limit)
+    return jsonify({
+        'success': True,
+        'origin': {'lat': lat, 'lon': lon},
+        'radius_km': radius_km,
+        'markets': [
+            {'market': market_index.markets[row], 'state': market_index.states[row],
+             'lat': float(market_index.lat[row]), 'lon': float(market_index.lon[row]),
+             'distance_km': round(float(distance), 1)}
+            for row, distance in zip(rows.tolist(), km.tolist())
+        ]
+    }), 200
+
 @price_bp.route('/states', methods=['GET'])
 def get_states():
     """
@@ -303,7 +707,7 @@ def get_available_crops():
     """
     Get list of all crops available for price prediction
     """
-    crops = list(SAMPLE_PRICE_DATA.keys())
+    crops = list(predictor.fetch_kaggle_data().keys())
     return jsonify({
         'success': True,
         'crops': [crop.capitalize() for crop in crops]
@@ -312,7 +716,8 @@ def get_available_crops():
 @price_bp.route('/compare', methods=['POST'])
 def compare_prices():
     """
-    Compare prices across multiple crops
+    Compare crops across markets over a horizon; the whole crops x markets
+    matrix is computed at once and returned as columnar arrays
     """
     data = request.get_json()
     
@@ -320,19 +725,34 @@ def compare_prices():
         return jsonify({'success': False, 'error': 'Crops list is required'}), 400
     
     crops = data['crops']
-    comparison = []
-    
-    for crop in crops:
-        result = predictor.predict_price(crop, 30)
-        if result['success']:
-            comparison.append({
-                'crop': crop,
-                'current_price': result['current_price'],
-                'predicted_price': result['average_predicted_price'],
-                'trend': result['trend']
-            })
+    state = data.get('state')
+    if not are_names([state], allow_none=True):
+        return jsonify({'success': False, 'error': 'crops, markets and state must be names (strings)'}), 400
+    markets = data.get('markets') or ([data['market']] if data.get('market') else None)
+    if not markets and state in INDIAN_STATES_MARKETS:
+        markets = INDIAN_STATES_MARKETS[state]
+    if not isinstance(crops, list) or (markets is not None and not isinstance(markets, list)):
+        return jsonify({'success': False, 'error': 'crops and markets must be lists'}), 400
+    if not are_names(crops) or not are_names(markets or []):
+        return jsonify({'success': False, 'error': 'crops, markets and state must be names (strings)'}), 400
+    if len(crops) * len(markets or [None]) > MAX_COMPARE_SERIES:
+        return jsonify({'success': False,
+                        'error': f'At most {MAX_COMPARE_SERIES} crop x market pairs per request'}), 400
+    try:
+        days = int(data.get('days', 30))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': f'days must be an integer (1-{MAX_FORECAST_DAYS})'}), 400
     
-    return jsonify({
-        'success': True,
-        'comparison': comparison
-    }), 200
+    result = predictor.compare(crops, markets, days, state)
+    
+    # Earlier clients read one row per crop; keep it, from the first market
+    result['comparison'] = [
+        {
+            'crop': crop,
+            'current_price': result['current_price'][i][0],
+            'predicted_price': result['predicted_price'][i][0],
+            'trend': result['trend'][i]
+        }
+        for i, crop in enumerate(result['crops'])
+    ]
+    return jsonify(result), 200
@@ -0,0 +1,430 @@
+# Mandi Price Store for AgroMitra
+# Daily arrivals and prices per (crop, market, date) in SQLite. Rows are
+# clustered on that composite key, so one series is a single index range
+# scan and comes back as NumPy arrays. Mandi names repeat across states, so
+# the market key carries the state (see market_key)
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_PATH = os.getenv('PRICE_STORE_PATH') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'prices.db'
+)
+
+# Current price = mean of the last CURRENT_WINDOW days; trend compares it
+# with the mean of the CURRENT_WINDOW days ending TREND_LAG days earlier
+CURRENT_WINDOW = 7
+TREND_LAG = 30
+TREND_THRESHOLD = 0.02
+
+SNAPSHOT_TTL = 300
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    crop TEXT NOT NULL,
+    market TEXT NOT NULL,            -- market_key(): 'Udaipur, Rajasthan'
+    day INTEGER NOT NULL,            -- days since 1970-01-01
+    state TEXT,
+    arrival_tonnes REAL,
+    min_price REAL,
+    max_price REAL,
+    modal_price REAL NOT NULL,       -- rupees per kg
+    PRIMARY KEY (crop, market, day)
+) WITHOUT ROWID;
+-- Covers the national snapshot so it never touches the table rows
+CREATE INDEX IF NOT EXISTS ix_prices_crop_day ON prices (crop, day, modal_price);
+CREATE INDEX IF NOT EXISTS ix_prices_market_day ON prices (market, day);
+CREATE TABLE IF NOT EXISTS forecast_models (
+    crop TEXT NOT NULL,
+    market TEXT NOT NULL,            -- market_key(), or '*' for the crop's national series
+    model TEXT NOT NULL,
+    params TEXT NOT NULL,            -- JSON, see price_models.py
+    last_day INTEGER NOT NULL,
+    observations INTEGER,
+    mae REAL,
+    fitted_at TEXT,
+    PRIMARY KEY (crop, market)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS backtest_cache (
+    model_version TEXT NOT NULL,     -- see price_backtest.model_version()
+    crop TEXT NOT NULL,
+    market TEXT NOT NULL,
+    cutoff_day INTEGER NOT NULL,
+    data_hash TEXT NOT NULL,         -- the series up to cutoff + horizon it was scored on
+    results TEXT NOT NULL,           -- JSON forecasts, bands and actuals per model
+    PRIMARY KEY (model_version, crop, market, cutoff_day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ingested_files (
+    path TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    rows INTEGER,
+    ingested_at TEXT
+);
+"""
+
+COLUMNS = ('crop', 'market', 'day', 'state', 'arrival_tonnes', 'min_price', 'max_price', 'modal_price')
+
+# Partially merged rows of the load in progress: the modal price is kept as an
+# arrivals-weighted sum so rows for one key can arrive in any chunk
+STAGED_COLUMNS = ('crop', 'market', 'day', 'state', 'arrival_tonnes', 'arrivals_known', 'min_price',
+                  'max_price', 'weighted', 'weight')
+
+STAGING_SCHEMA = """
+CREATE TEMP TABLE IF NOT EXISTS staged_prices (
+    crop TEXT NOT NULL,
+    market TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    state TEXT,
+    arrival_tonnes REAL,
+    arrivals_known INTEGER NOT NULL,
+    min_price REAL,
+    max_price REAL,
+    weighted REAL NOT NULL,
+    weight REAL NOT NULL,
+    PRIMARY KEY (crop, market, day)
+) WITHOUT ROWID
+"""
+
+# PRAGMA user_version of a store with the current market keys
+SCHEMA_VERSION = 1
+
+_EPOCH = np.datetime64('1970-01-01', 'D')
+
+
+def market_key(market: str, state: str = None) -> str:
+    """
+    Series key of a mandi: there is an Udaipur in Rajasthan and in Tripura, an
+    Aurangabad in Bihar and in Maharashtra. Markets without a known state keep
+    the bare name.
+    """
+    return f"{market}, {state}" if state else market
+
+
+def to_day(value) -> int:
+    """'2024-03-01', date or datetime64 -> days since the epoch"""
+    return int((np.datetime64(value, 'D') - _EPOCH).astype(int))
+
+
+def to_days(dates) -> np.ndarray:
+    return (np.asarray(dates, dtype='datetime64[D]') - _EPOCH).astype(np.int64)
+
+
+def from_days(days) -> np.ndarray:
+    return _EPOCH + np.asarray(days, dtype='timedelta64[D]')
+
+
+class PriceStore:
+    """
+    SQLite-backed price history. Each thread gets its own connection; the
+    database runs in WAL mode so the web workers read while ingestion writes.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._snapshot_at = 0.0
+        self._initialised = False
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            if not self._initialised:
+                connection.executescript(SCHEMA)
+                self._migrate(connection)
+                self._initialised = True
+        return connection
+
+    @staticmethod
+    def _migrate(connection: sqlite3.Connection):
+        """Bring a store written before market keys carried the state up to date"""
+        if connection.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION:
+            return
+        with connection:
+            connection.execute(
+                "UPDATE OR REPLACE prices SET market = market || ', ' || state "
+                "WHERE state <> '' AND instr(market, ', ') = 0"
+            )
+            # Models of merged series are dropped; the nightly refit fits the split ones
+            connection.execute("DELETE FROM forecast_models WHERE market <> '*'")
+            connection.execute("DELETE FROM backtest_cache WHERE market <> '*'")
+            connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def upsert(self, rows: Iterable[Sequence]) -> int:
+        """
+        Insert or replace rows of COLUMNS in one transaction; re-loading the
+        same (crop, market, day) overwrites it, so loads are idempotent
+        """
+        connection = self._connection()
+        placeholders = ', '.join('?' for _ in COLUMNS)
+        updates = ', '.join(f"{column} = excluded.{column}" for column in COLUMNS[3:])
+        with connection:
+            cursor = connection.executemany(
+                f"INSERT INTO prices ({', '.join(COLUMNS)}) VALUES ({placeholders}) "
+                f"ON CONFLICT (crop, market, day) DO UPDATE SET {updates}",
+                rows
+            )
+        self.invalidate()
+        return cursor.rowcount
+
+    def stage(self, rows: Iterable[Sequence]) -> None:
+        """
+        Add rows of STAGED_COLUMNS to this thread's staging table; a key staged
+        again (say, from a later chunk) is combined with what is already there
+        """
+        connection = self._connection()
+        connection.execute(STAGING_SCHEMA)
+        placeholders = ', '.join('?' for _ in STAGED_COLUMNS)
+        with connection:
+            connection.executemany(
+                f"INSERT INTO staged_prices ({', '.join(STAGED_COLUMNS)}) VALUES ({placeholders}) "
+                "ON CONFLICT (crop, market, day) DO UPDATE SET "
+                "arrival_tonnes = COALESCE(arrival_tonnes, 0) + COALESCE(excluded.arrival_tonnes, 0), "
+                "arrivals_known = arrivals_known + excluded.arrivals_known, "
+                "min_price = MIN(COALESCE(min_price, excluded.min_price), COALESCE(excluded.min_price, min_price)), "
+                "max_price = MAX(COALESCE(max_price, excluded.max_price), COALESCE(excluded.max_price, max_price)), "
+                "weighted = weighted + excluded.weighted, weight = weight + excluded.weight",
+                rows
+            )
+
+    def merge_staged(self) -> int:
+        """Upsert the staged rows into prices, in key order; returns how many there were"""
+        connection = self._connection()
+        connection.execute(STAGING_SCHEMA)
+        updates = ', '.join(f"{column} = excluded.{column}" for column in COLUMNS[3:])
+        with connection:
+            # WHERE true keeps ON CONFLICT from parsing as a join constraint
+            connection.execute(
+                f"INSERT INTO prices ({', '.join(COLUMNS)}) "
+                "SELECT crop, market, day, state, CASE WHEN arrivals_known > 0 THEN arrival_tonnes END, "
+                "min_price, max_price, ROUND(weighted / weight, 2) FROM staged_prices WHERE true "
+                "ORDER BY crop, market, day "
+                f"ON CONFLICT (crop, market, day) DO UPDATE SET {updates}"
+            )
+        self.invalidate()
+        return connection.execute("SELECT COUNT(*) FROM staged_prices").fetchone()[0]
+
+    def staged_batches(self, size: int = 50000) -> Iterator[List[Tuple]]:
+        """
+        (crop, market, day, modal_price) of the staged rows in key order. Pages
+        by key rather than holding a cursor open, so callers may write between them
+        """
+        last = ('', '', -2 ** 31)
+        while True:
+            rows = self._connection().execute(
+                "SELECT crop, market, day, ROUND(weighted / weight, 2) FROM staged_prices "
+                "WHERE (crop, market, day) > (?, ?, ?) ORDER BY crop, market, day LIMIT ?",
+                (*last, size)
+            ).fetchall()
+            if not rows:
+                return
+            yield rows
+            last = rows[-1][:3]
+
+    def clear_staged(self) -> None:
+        connection = self._connection()
+        connection.execute(STAGING_SCHEMA)
+        with connection:
+            connection.execute("DELETE FROM staged_prices")
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def series(self, crop: str, market: str, start=None, end=None) -> Dict[str, np.ndarray]:
+        """One (crop, market_key) series as arrays, oldest first"""
+        query = "SELECT day, modal_price, min_price, max_price, arrival_tonnes FROM prices WHERE crop = ? AND market = ?"
+        params = [crop, market]
+        if start is not None:
+            query += " AND day >= ?"
+            params.append(to_day(start))
+        if end is not None:
+            query += " AND day <= ?"
+            params.append(to_day(end))
+        rows = self._connection().execute(query + " ORDER BY day", params).fetchall()
+        values = np.array(rows, dtype=float).reshape(-1, 5)
+        return {
+            'dates': from_days(values[:, 0].astype(np.int64)),
+            'modal_price': values[:, 1],
+            'min_price': values[:, 2],
+            'max_price': values[:, 3],
+            'arrival_tonnes': values[:, 4]
+        }
+
+    def national_series(self, crop: str, start_day: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Days and the mean modal price across markets for each day"""
+        rows = self._connection().execute(
+            "SELECT day, AVG(modal_price) FROM prices WHERE crop = ? AND day >= ? GROUP BY day ORDER BY day",
+            (crop, start_day if start_day is not None else -2 ** 31)
+        ).fetchall()
+        values = np.array(rows, dtype=float).reshape(-1, 2)
+        return values[:, 0].astype(np.int64), values[:, 1]
+
+    def national_coverage(self, crop: str, start_day: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Days from start_day, the mean modal price and how many markets reported each"""
+        rows = self._connection().execute(
+            "SELECT day, AVG(modal_price), COUNT(*) FROM prices WHERE crop = ? AND day >= ? GROUP BY day ORDER BY day",
+            (crop, start_day)
+        ).fetchall()
+        values = np.array(rows, dtype=float).reshape(-1, 3)
+        return values[:, 0].astype(np.int64), values[:, 1], values[:, 2].astype(np.int64)
+
+    def series_keys(self) -> List[Tuple[str, str]]:
+        return self._connection().execute("SELECT DISTINCT crop, market FROM prices").fetchall()
+
+    def latest_matrix(self, crops: List[str], markets: List[str]) -> np.ndarray:
+        """Latest modal price per crop x market_key; NaN where the market has no series"""
+        matrix = np.full((len(crops), len(markets)), np.nan)
+        if not crops or not markets:
+            return matrix
+        keys = [(i, j, crop, market) for i, crop in enumerate(crops) for j, market in enumerate(markets)]
+        # One primary-key seek per (crop, market), batched under SQLite's parameter limit
+        for start in range(0, len(keys), 200):
+            batch = keys[start:start + 200]
+            query = (
+                f"WITH keys(i, j, crop, market) AS (VALUES {', '.join('(?, ?, ?, ?)' for _ in batch)}) "
+                "SELECT i, j, (SELECT modal_price FROM prices p WHERE p.crop = keys.crop AND p.market = keys.market "
+                "ORDER BY day DESC LIMIT 1) FROM keys"
+            )
+            for i, j, price in self._connection().execute(query, [value for key in batch for value in key]):
+                if price is not None:
+                    matrix[i, j] = price
+        return matrix
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        National current price and trend per crop, in the shape of
+        SAMPLE_PRICE_DATA; cached until SNAPSHOT_TTL passes or data is written
+        """
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._snapshot_at < SNAPSHOT_TTL:
+                return self._snapshot
+        # Skip-scan the (crop, day) index: one seek per crop instead of a full scan
+        query = """
+            WITH RECURSIVE crops(crop) AS (
+                SELECT MIN(crop) FROM prices
+                UNION ALL
+                SELECT (SELECT MIN(crop) FROM prices WHERE crop > crops.crop) FROM crops WHERE crop IS NOT NULL
+            ),
+            latest AS MATERIALIZED (
+                SELECT crop, (SELECT MAX(day) FROM prices WHERE crop = crops.crop) AS last
+                FROM crops WHERE crop IS NOT NULL
+            )
+            SELECT p.crop, l.last,
+                   AVG(CASE WHEN p.day > l.last - :window THEN p.modal_price END),
+                   AVG(CASE WHEN p.day <= l.last - :lag THEN p.modal_price END)
+            FROM prices p JOIN latest l ON p.crop = l.crop
+            WHERE p.day > l.last - :lag - :window
+            GROUP BY p.crop
+        """
+        snapshot = {}
+        rows = self._connection().execute(query, {'window': CURRENT_WINDOW, 'lag': TREND_LAG})
+        for crop, last, current, previous in rows:
+            change = current / previous - 1 if previous else 0.0
+            trend = 'up' if change > TREND_THRESHOLD else 'down' if change < -TREND_THRESHOLD else 'stable'
+            snapshot[crop] = {
+                'current': round(current, 2),
+                'trend': trend,
+                'as_of': str(from_days(last))
+            }
+        with self._lock:
+            self._snapshot, self._snapshot_at = snapshot, time.monotonic()
+        return snapshot
+
+    def save_models(self, fitted: Iterable[Tuple[str, str, Dict]]):
+        """Persist fitted models as (crop, market, model dict) from price_models.fit_series"""
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO forecast_models VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now'))",
+                [(crop, market, model['model'], json.dumps(model['params']), model['last_day'],
+                  model['observations'], model['mae']) for crop, market, model in fitted]
+            )
+
+    def model_keys(self) -> List[Tuple[str, str]]:
+        return self._connection().execute("SELECT crop, market FROM forecast_models").fetchall()
+
+    def load_models(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Dict]:
+        """Stored models for the given (crop, market) keys; missing keys are absent"""
+        keys = list(dict.fromkeys(keys))
+        models = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 400):
+            batch = keys[start:start + 400]
+            rows = self._connection().execute(
+                "SELECT crop, market, model, params, last_day, observations, mae FROM forecast_models "
+                f"WHERE (crop, market) IN (VALUES {', '.join('(?, ?)' for _ in batch)})",
+                [value for key in batch for value in key]
+            )
+            for crop, market, model, params, last_day, observations, mae in rows:
+                models[(crop, market)] = {'model': model, 'params': json.loads(params), 'last_day': last_day,
+                                          'observations': observations, 'mae': mae}
+        return models
+
+    def load_backtests(self, model_version: str, keys: List[Tuple[str, str]]) -> Dict[Tuple, Tuple[str, Dict]]:
+        """Cached backtest results as (crop, market, cutoff_day) -> (data_hash, results)"""
+        cached = {}
+        for crop, market in keys:
+            rows = self._connection().execute(
+                "SELECT cutoff_day, data_hash, results FROM backtest_cache "
+                "WHERE model_version = ? AND crop = ? AND market = ?", (model_version, crop, market)
+            )
+            for cutoff_day, data_hash, results in rows:
+                cached[(crop, market, cutoff_day)] = (data_hash, json.loads(results))
+        return cached
+
+    def save_backtests(self, model_version: str, rows: Iterable[Tuple[str, str, int, str, Dict]]):
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO backtest_cache VALUES (?, ?, ?, ?, ?, ?)",
+                [(model_version, crop, market, cutoff_day, data_hash, json.dumps(results))
+                 for crop, market, cutoff_day, data_hash, results in rows]
+            )
+
+    def is_ingested(self, path: str, fingerprint: str) -> bool:
+        row = self._connection().execute(
+            "SELECT fingerprint FROM ingested_files WHERE path = ?", (os.path.abspath(path),)
+        ).fetchone()
+        return row is not None and row[0] == fingerprint
+
+    def mark_ingested(self, path: str, fingerprint: str, rows: int):
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO ingested_files VALUES (?, ?, ?, datetime('now'))",
+                (os.path.abspath(path), fingerprint, rows)
+            )
+
+    def has_data(self) -> bool:
+        return self._connection().execute("SELECT 1 FROM prices LIMIT 1").fetchone() is not None
+
+    def status(self) -> Dict:
+        connection = self._connection()
+        rows, first, last = connection.execute("SELECT COUNT(*), MIN(day), MAX(day) FROM prices").fetchone()
+        return {
+            'path': self.path,
+            'rows': rows,
+            'crops': connection.execute("SELECT COUNT(DISTINCT crop) FROM prices").fetchone()[0],
+            'markets': connection.execute("SELECT COUNT(DISTINCT market) FROM prices").fetchone()[0],
+            'first_date': str(from_days(first)) if first is not None else None,
+            'last_date': str(from_days(last)) if last is not None else None
+        }
+
+
+# Shared per worker process; connections open lazily per thread
+price_store = PriceStore()
@@ -10,6 +10,18 @@ profile_bp = Blueprint('profile', __name__)
 
 SECRET_KEY = 'your-secret-key-change-in-production'
 
+def token_user_id():
+    """User id from a valid Authorization bearer token, None without one or when it is invalid"""
+    token = request.headers.get('Authorization')
+    if not token:
+        return None
+    if token.startswith('Bearer '):
+        token = token[7:]
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=['HS256'])['user_id']
+    except Exception:
+        return None
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -0,0 +1,167 @@
+# Prompt Budgeting for AgroMitra
+# Token counting per provider, whitespace compaction, rolling summaries of older
+# chat turns and per-feature prompt budgets
+
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+
+from ai_config import AI_CONFIG
+
+try:
+    import tiktoken
+except ImportError:  # Optional: exact counts for OpenAI models
+    tiktoken = None
+
+# Approximate characters per token when no tokenizer is available. Indic
+# scripts split into far more tokens per character than Latin text.
+CHARS_PER_TOKEN = {
+    'openai': {'latin': 4.0, 'other': 1.5},
+    'gemini': {'latin': 4.0, 'other': 2.0},
+    'local': {'latin': 3.5, 'other': 1.2},
+}
+
+_WHITESPACE = re.compile(r'[ \t]+')
+_SENTENCE_END = re.compile(r'(?<=[.!?।])\s')
+_encoders = {}
+
+
+def count_tokens(text: str, provider: str = 'gemini') -> int:
+    """Count (or estimate) how many tokens a provider will bill for text"""
+    if not text:
+        return 0
+    if provider == 'openai' and tiktoken is not None:
+        model = AI_CONFIG.get('openai', {}).get('model', 'gpt-4')
+        encoder = _encoders.get(model)
+        if encoder is None:
+            try:
+                encoder = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoder = tiktoken.get_encoding('cl100k_base')
+            _encoders[model] = encoder
+        return len(encoder.encode(text))
+
+    ratios = CHARS_PER_TOKEN.get(provider, CHARS_PER_TOKEN['gemini'])
+    latin = sum(1 for ch in text if ord(ch) < 128)
+    other = len(text) - latin
+    return int(math.ceil(latin / ratios['latin'] + other / ratios['other']))
+
+
+def compact(text: str) -> str:
+    """Strip indentation, collapse runs of spaces and drop blank lines"""
+    lines = (_WHITESPACE.sub(' ', line).strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, provider: str = 'gemini', keep_tail: bool = False) -> str:
+    """
+    Cut text so it fits in max_tokens, preferring a line or sentence boundary.
+    keep_tail keeps the end of the text (e.g. the newest chat turns).
+    """
+    if max_tokens <= 0:
+        return ''
+    if count_tokens(text, provider) <= max_tokens:
+        return text
+    if keep_tail:
+        return truncate_to_tokens(text[::-1], max_tokens, provider)[::-1]
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid], provider) <= max_tokens - 1:
+            low = mid
+        else:
+            high = mid - 1
+    cut = text[:low]
+    boundary = max(cut.rfind('. '), cut.rfind('\n'), cut.rfind('। '))
+    if boundary > len(cut) // 2:
+        cut = cut[:boundary + 1]
+    return cut.rstrip() + '…'
+
+
+def _first_sentence(text: str, max_chars: int) -> str:
+    text = ' '.join(str(text).split())
+    sentence = _SENTENCE_END.split(text, maxsplit=1)[0]
+    if len(sentence) > max_chars:
+        sentence = sentence[:max_chars].rstrip() + '…'
+    return sentence
+
+
+def summarize_turns(turns: List[Dict], max_chars: int = 400) -> str:
+    """
+    Extractive rolling summary of older turns: the gist of each question and
+    answer, newest kept when space runs out. Costs no extra LLM call.
+    """
+    if not turns:
+        return ''
+    parts = []
+    used = 0
+    for turn in reversed(turns):
+        part = f"Q: {_first_sentence(turn.get('user', ''), 80)} A: {_first_sentence(turn.get('bot', ''), 120)}"
+        if parts and used + len(part) > max_chars:
+            break
+        parts.append(part)
+        used += len(part) + 1
+    return ' | '.join(reversed(parts))
+
+
+def split_conversation(turns: List[Dict], recent_turns: int) -> Tuple[List[Dict], List[Dict]]:
+    """Split history into (older turns to summarise, recent turns kept verbatim)"""
+    if recent_turns <= 0:
+        return list(turns), []
+    return list(turns[:-recent_turns]), list(turns[-recent_turns:])
+
+
+def build_prompt(sections: List[Tuple], feature: str, provider: str = 'gemini') -> str:
+    """
+    Join compacted prompt sections under the feature's token budget.
+
+    sections is a list of (text, priority) or (text, priority, keep_tail).
+    Priority 0 sections are always kept; when over budget the highest
+    priority-number sections are dropped first, and the last one that would
+    not fit is truncated instead (from the front when keep_tail is set).
+    """
+    budget = get_budget(feature)
+    texts = [compact(section[0]) for section in sections]
+    priorities = [section[1] for section in sections]
+    keep_tails = [len(section) > 2 and section[2] for section in sections]
+    keep = [bool(text) for text in texts]
+
+    def total():
+        return count_tokens('\n'.join(t for t, k in zip(texts, keep) if k), provider)
+
+    if budget:
+        for index in sorted(range(len(texts)), key=lambda i: -priorities[i]):
+            overflow = total() - budget
+            if overflow <= 0 or priorities[index] == 0:
+                break
+            if not keep[index]:
+                continue
+            own = count_tokens(texts[index], provider)
+            if own > overflow + 20:
+                texts[index] = truncate_to_tokens(texts[index], own - overflow, provider, keep_tails[index])
+            else:
+                keep[index] = False
+    return '\n'.join(t for t, k in zip(texts, keep) if k)
+
+
+def get_budget(feature: str) -> Optional[int]:
+    return AI_CONFIG.get('token_budget', {}).get('max_prompt_tokens', {}).get(feature)
+
+
+def usage_report(prompt: str, completion: str, provider: str, reported: Dict = None) -> Dict:
+    """Per-request token usage, from the provider when it reports it, else estimated"""
+    if reported and reported.get('prompt_tokens') is not None:
+        prompt_tokens = reported['prompt_tokens']
+        completion_tokens = reported.get('completion_tokens') or 0
+        estimated = False
+    else:
+        prompt_tokens = count_tokens(prompt, provider)
+        completion_tokens = count_tokens(completion, provider)
+        estimated = True
+    return {
+        'provider': provider,
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens,
+        'estimated': estimated
+    }
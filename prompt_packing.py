@@ -0,0 +1,192 @@
+# Prompt Packing for AgroMitra
+# Collects disease-recommendation requests for a short window and answers them
+# with one LLM call: the shared instruction block is sent once, each case gets
+# an ID, and the JSON array reply is split back to the waiting callers
+
+import json
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from ai_config import AI_CONFIG
+from local_llm import MicroBatcher
+from prompt_budget import build_prompt
+
+_CODE_FENCE = re.compile(r'^```(?:json)?\s*|\s*```$', re.MULTILINE)
+_ARRAY_SEPARATOR = re.compile(r'[\s,]*')
+
+# Completion cap setting per provider in AI_CONFIG
+_COMPLETION_LIMITS = {'openai': 'max_tokens', 'gemini': 'max_output_tokens', 'local': 'max_new_tokens'}
+
+
+def items_per_call(provider: str, config: Dict) -> int:
+    """
+    Cases one packed reply can hold: max_items, fewer when the provider's
+    completion cap cannot fit that many recommendation objects
+    """
+    max_items = config.get('max_items', 8)
+    setting = _COMPLETION_LIMITS.get(provider)
+    limit = AI_CONFIG.get(provider, {}).get(setting) if setting else None
+    if not limit:
+        return max_items
+    return max(1, min(max_items, limit // config.get('item_completion_tokens', 350)))
+
+
+class PackedItem:
+    """One caller's disease request waiting in a batch"""
+
+    def __init__(self, disease_info: Dict, farmer_context: Optional[Dict]):
+        self.disease_info = disease_info
+        self.farmer_context = farmer_context
+
+
+class DiseasePromptPacker:
+    """
+    Batch backend for MicroBatcher: turns N pending requests into one prompt
+    and parses the reply. Complete objects are kept even when the reply was
+    cut off mid-array; only the items it does not cover are retried with
+    ordinary per-item calls.
+    """
+
+    def __init__(self, engine_factory, fallback_concurrency: int = 4):
+        self.engine_factory = engine_factory
+        self.fallback_pool = ThreadPoolExecutor(max_workers=fallback_concurrency,
+                                                thread_name_prefix='packing-fallback')
+        self.stats = {'packed_calls': 0, 'packed_items': 0, 'parse_failures': 0, 'fallback_items': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def generate_batch(self, items: List[PackedItem]) -> List:
+        engine = self.engine_factory()
+        if len(items) == 1:
+            return [self._single(engine, items[0])]
+
+        ids = [f"d{index + 1}" for index in range(len(items))]
+        prompt = self._build_prompt(engine, ids, items)
+        parsed = {}
+        try:
+            parsed = self._parse(engine._generate(prompt), ids)
+        except Exception as e:
+            logging.warning(f"Packed disease prompt failed, falling back per item: {e}")
+        self._count('packed_calls')
+        self._count('packed_items', len(parsed))
+        if len(parsed) < len(items):
+            self._count('parse_failures')
+
+        usage = None
+        if parsed and engine.last_usage:
+            # Attribute the shared call's tokens evenly to the items it answered
+            usage = {key: (round(value / len(parsed), 1) if isinstance(value, (int, float))
+                           and not isinstance(value, bool) else value)
+                     for key, value in engine.last_usage.items()}
+
+        results = [None] * len(items)
+        retries = {}
+        for index, (item_id, item) in enumerate(zip(ids, items)):
+            if item_id in parsed:
+                results[index] = {
+                    **parsed[item_id],
+                    "generated_at": datetime.now().isoformat(),
+                    "source": f"AI_{engine.last_provider}",
+                    "packed_batch_size": len(items),
+                    "usage": usage
+                }
+            else:
+                retries[index] = self.fallback_pool.submit(self._single, self.engine_factory(), item)
+        for index, future in retries.items():
+            self._count('fallback_items')
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                results[index] = e
+        return results
+
+    def _single(self, engine, item: PackedItem) -> Dict:
+        """Ordinary one-request-one-call path"""
+        prompt = engine._build_disease_prompt(item.disease_info, item.farmer_context)
+        result = engine._parse_disease_response(engine._generate(prompt))
+        if isinstance(result, dict):
+            result["usage"] = engine.last_usage
+        return result
+
+    @staticmethod
+    def _build_prompt(engine, ids: List[str], items: List[PackedItem]) -> str:
+        from ai_integration import DISEASE_INSTRUCTIONS
+
+        cases = []
+        for item_id, item in zip(ids, items):
+            # Reuse the single-item prompt's case description, minus the shared blocks
+            case = engine._build_disease_prompt(item.disease_info, item.farmer_context)
+            lines = [line for line in case.splitlines()
+                     if line != DISEASE_INSTRUCTIONS and not line.startswith("As an expert")]
+            cases.append(f"[{item_id}]\n" + "\n".join(lines))
+
+        return build_prompt([
+            ("As an expert plant pathologist, give treatment recommendations for each case below.", 0),
+            (DISEASE_INSTRUCTIONS, 0),
+            ("Respond with a JSON array only: one object per case, in any order, each with an "
+             "\"id\" field set to the case ID in brackets plus the fields above.", 0),
+            ("\n".join(cases), 0),
+        ], "disease_batch", engine.provider)
+
+    @staticmethod
+    def _parse(response: str, ids: List[str]) -> Dict[str, Dict]:
+        """
+        Map case ID -> recommendation object, decoding the array one element
+        at a time so a reply truncated at the completion limit still yields
+        its complete objects; raises if the reply does not open a JSON array
+        """
+        text = _CODE_FENCE.sub('', response.strip())
+        start = text.find('[')
+        if start < 0:
+            raise ValueError("Packed response is not a JSON array")
+        decoder = json.JSONDecoder()
+        wanted = set(ids)
+        parsed = {}
+        position = start + 1
+        while True:
+            position = _ARRAY_SEPARATOR.match(text, position).end()
+            if position >= len(text) or text[position] == ']':
+                break
+            try:
+                entry, position = decoder.raw_decode(text, position)
+            except ValueError:
+                break  # Cut off inside this element
+            if isinstance(entry, dict) and str(entry.get('id')) in wanted:
+                item_id = str(entry.pop('id'))
+                parsed.setdefault(item_id, entry)
+        return parsed
+
+
+class DiseaseRequestBatcher:
+    """Entry point used by AIRecommendationEngine when batching is enabled"""
+
+    def __init__(self, config: Dict = None):
+        from ai_integration import AIRecommendationEngine
+
+        self.config = config or AI_CONFIG.get('batching', {})
+        provider = AI_CONFIG['default_provider']
+        self.packer = DiseasePromptPacker(
+            lambda: AIRecommendationEngine(provider=provider),
+            fallback_concurrency=self.config.get('fallback_concurrency', 4)
+        )
+        self.batcher = MicroBatcher(
+            self.packer,
+            max_batch_size=items_per_call(provider, self.config),
+            batch_window_ms=self.config.get('window_ms', 50),
+            max_concurrency=self.config.get('max_concurrency', 2),
+            name='disease-packing'
+        )
+
+    def recommend(self, disease_info: Dict, farmer_context: Optional[Dict] = None) -> Dict:
+        future = self.batcher.submit(PackedItem(disease_info, farmer_context))
+        return future.result(timeout=self.config.get('timeout', 120))
+
+    def status(self) -> Dict:
+        return {**self.batcher.stats, **self.packer.stats, 'queued': self.batcher.queue.qsize()}
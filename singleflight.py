@@ -0,0 +1,221 @@
+# Single-flight request coalescing for AgroMitra
+# Concurrent callers that share a key wait on one upstream call and share its
+# result, across threads in a worker and (via lock files) across gunicorn workers
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalesce within the worker only
+    fcntl = None
+
+
+class _Call:
+    """One in-flight upstream call that other threads can wait on"""
+
+    def __init__(self):
+        self.started = threading.Event()  # Leader is past the file lock
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one execution.
+
+    Within a process the first caller (the leader) runs the function while
+    followers block on an event. Across processes the leader takes an
+    exclusive flock on <lock_dir>/<hash>.lock and publishes its result to
+    <hash>.json; a worker that waited on the lock reuses that file if it is
+    younger than result_ttl seconds instead of calling upstream again.
+    """
+
+    def __init__(self, lock_dir: str = None, wait_timeout: float = 60.0,
+                 result_ttl: float = 30.0, cross_process: bool = True):
+        self.lock_dir = lock_dir or os.path.join(tempfile.gettempdir(), 'agromitra_singleflight')
+        self.wait_timeout = wait_timeout
+        self.result_ttl = result_ttl
+        self.cross_process = cross_process and fcntl is not None
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._last_sweep = 0.0
+        self.stats = {'leader_calls': 0, 'thread_shared': 0, 'process_shared': 0, 'lock_timeouts': 0}
+        if self.cross_process:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn once for all concurrent callers with the same key.
+        Returns (result, shared) where shared is True when another caller did the work.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            # The leader's lock wait is bounded by wait_timeout on its own, so
+            # only time the call itself
+            call.started.wait()
+            if not call.done.wait(self.wait_timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight request {key[:12]}")
+            if call.error is not None:
+                raise call.error
+            self._count('thread_shared')
+            return copy.deepcopy(call.result), True
+
+        try:
+            call.result, shared = self._run_leader(key, fn, call.started)
+            return call.result, shared
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.started.set()
+            call.done.set()
+
+    def _run_leader(self, key: str, fn: Callable[[], Any],
+                    started: threading.Event) -> Tuple[Any, bool]:
+        if not self.cross_process:
+            started.set()
+            self._count('leader_calls')
+            return fn(), False
+
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        lock_path = os.path.join(self.lock_dir, f"{digest}.lock")
+        result_path = os.path.join(self.lock_dir, f"{digest}.json")
+
+        cached = self._read_fresh(result_path)
+        if cached is not None:
+            self._count('process_shared')
+            return cached, True
+
+        lock_file, locked = self._open_lock(lock_path)
+        with lock_file:
+            try:
+                # Another worker may have finished while we waited for the lock
+                cached = self._read_fresh(result_path)
+                if cached is not None:
+                    self._count('process_shared')
+                    return cached, True
+
+                started.set()
+                self._count('leader_calls')
+                result = fn()
+                self._publish(result_path, result)
+                return result, False
+            finally:
+                if locked:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                self._sweep()
+
+    def _open_lock(self, lock_path: str):
+        """
+        Open and lock lock_path. A sweep may unlink the file between our open and
+        the lock, leaving us locking an orphan while the next caller creates a
+        new one; in that case start over on the file now at the path.
+        """
+        while True:
+            lock_file = open(lock_path, 'a+')
+            locked = self._acquire(lock_file)
+            try:
+                current = os.stat(lock_path)
+                opened = os.fstat(lock_file.fileno())
+                if not locked or (current.st_dev, current.st_ino) == (opened.st_dev, opened.st_ino):
+                    return lock_file, locked
+            except OSError:
+                pass
+            lock_file.close()
+
+    def _acquire(self, lock_file) -> bool:
+        """Poll for the exclusive lock; give up after wait_timeout and run anyway"""
+        deadline = time.monotonic() + self.wait_timeout
+        delay = 0.01
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except OSError:
+                if time.monotonic() >= deadline:
+                    self._count('lock_timeouts')
+                    return False
+                time.sleep(delay)
+                delay = min(delay * 2, 0.25)
+
+    def _read_fresh(self, path: str):
+        try:
+            if time.time() - os.path.getmtime(path) > self.result_ttl:
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _publish(self, path: str, result: Any):
+        """Write the result atomically so readers never see a partial file"""
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.lock_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(result, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logging.warning(f"Single-flight result not shared across workers: {e}")
+
+    def _sweep(self):
+        """
+        Remove stale result/lock files at most once a minute. Holding a lock does
+        not touch its file, so an old lock file is only removed once we can take
+        its lock ourselves; otherwise a leader may be mid-call behind it.
+        """
+        now = time.time()
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        max_age = max(self.result_ttl * 10, 300)
+        try:
+            for name in os.listdir(self.lock_dir):
+                path = os.path.join(self.lock_dir, name)
+                try:
+                    if now - os.path.getmtime(path) <= max_age:
+                        continue
+                    if name.endswith('.lock'):
+                        self._remove_unheld(path)
+                    else:
+                        os.remove(path)
+                except OSError:
+                    pass
+        except OSError:
+            pass
+
+    def _remove_unheld(self, path: str):
+        fd = os.open(path, os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            os.remove(path)
+        finally:
+            os.close(fd)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'cross_process': self.cross_process,
+                **self.stats
+            }